@@ -0,0 +1,22 @@
+-- Script pour ajouter les colonnes email_normalise aux tables utilisateurs, clients et garages (MySQL 5.7+)
+-- Équivalent : py add_email_normalise_columns_script.py (fonctionne aussi avec SQLite)
+
+-- Ajouter les colonnes email_normalise (email en minuscules, sans espaces autour)
+ALTER TABLE utilisateurs 
+ADD COLUMN IF NOT EXISTS email_normalise VARCHAR(150) NULL;
+
+ALTER TABLE clients 
+ADD COLUMN IF NOT EXISTS email_normalise VARCHAR(150) NULL;
+
+ALTER TABLE garages 
+ADD COLUMN IF NOT EXISTS email_normalise VARCHAR(255) NULL;
+
+-- Index pour la résolution d'identité par email (identity.resolve_email)
+CREATE INDEX IF NOT EXISTS ix_utilisateurs_email_normalise ON utilisateurs(email_normalise);
+CREATE INDEX IF NOT EXISTS ix_clients_email_normalise ON clients(email_normalise);
+CREATE INDEX IF NOT EXISTS ix_garages_email_normalise ON garages(email_normalise);
+
+-- Remplir les lignes existantes
+UPDATE utilisateurs SET email_normalise = NULLIF(LOWER(TRIM(email)), '') WHERE email IS NOT NULL AND email_normalise IS NULL;
+UPDATE clients SET email_normalise = NULLIF(LOWER(TRIM(email)), '') WHERE email IS NOT NULL AND email_normalise IS NULL;
+UPDATE garages SET email_normalise = NULLIF(LOWER(TRIM(email)), '') WHERE email IS NOT NULL AND email_normalise IS NULL;
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Script pour ajouter les colonnes email_normalise (email en minuscules, sans espaces autour)
+aux tables utilisateurs, clients et garages, puis remplir les lignes existantes
+(fonctionne avec MySQL et SQLite)
+
+À relancer après un import fait en SQL brut (hors ORM) : seules les lignes dont
+email_normalise est vide sont complétées.
+
+Usage :
+    py add_email_normalise_columns_script.py            # ajoute les colonnes/index et remplit les valeurs manquantes
+    py add_email_normalise_columns_script.py --refresh  # recalcule aussi les valeurs déjà renseignées
+"""
+import sys
+import time
+from sqlalchemy import inspect, text
+from database import engine
+from config import settings
+
+# (table, taille de la colonne, nom de l'index)
+EMAIL_COLUMNS = [
+    ("utilisateurs", 150, "ix_utilisateurs_email_normalise"),
+    ("clients", 150, "ix_clients_email_normalise"),
+    ("garages", 255, "ix_garages_email_normalise"),
+]
+
+
+def add_email_normalise_columns():
+    """Ajoute les colonnes et index email_normalise s'ils n'existent pas encore"""
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table, length, index_name in EMAIL_COLUMNS:
+            if not inspector.has_table(table):
+                print(f"   ⚠️  Table {table} absente (créée avec la colonne au démarrage de l'API)")
+                continue
+            columns = {col["name"] for col in inspector.get_columns(table)}
+            if "email_normalise" in columns:
+                print(f"   ⚠️  {table}.email_normalise existe déjà")
+            else:
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN email_normalise VARCHAR({length}) NULL"))
+                print(f"   ✅ {table}.email_normalise ajoutée")
+
+            indexes = {index["name"] for index in inspector.get_indexes(table)}
+            if index_name in indexes:
+                print(f"   ⚠️  Index {index_name} existe déjà")
+            else:
+                connection.execute(text(f"CREATE INDEX {index_name} ON {table}(email_normalise)"))
+                print(f"   ✅ Index {index_name} créé")
+
+
+def backfill_email_normalise(refresh: bool = False):
+    """Remplit email_normalise en une requête UPDATE par table (même règle que emails.normalize_email)"""
+    condition = "" if refresh else "AND email_normalise IS NULL"
+    inspector = inspect(engine)
+    for table, _, _ in EMAIL_COLUMNS:
+        if not inspector.has_table(table):
+            continue
+        start = time.perf_counter()
+        with engine.begin() as connection:
+            result = connection.execute(text(f"""
+                UPDATE {table}
+                SET email_normalise = NULLIF(LOWER(TRIM(email)), '')
+                WHERE email IS NOT NULL {condition}
+            """))
+        elapsed = time.perf_counter() - start
+        print(f"   ✅ {table}: {result.rowcount} email(s) normalisé(s) en {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    print("🚀 Ajout des colonnes email_normalise...")
+    print(f"📍 Connexion à: {settings.DB_HOST}/{settings.DB_NAME}" if not settings.DATABASE_URL else f"📍 Connexion à: {settings.DATABASE_URL}")
+    print()
+
+    try:
+        add_email_normalise_columns()
+        print("\n🔄 Remplissage des emails normalisés existants...")
+        backfill_email_normalise(refresh="--refresh" in sys.argv)
+        print("\n✅ Colonnes email_normalise prêtes")
+    except Exception as e:
+        print(f"\n❌ Erreur lors de l'ajout des colonnes email_normalise: {e}")
+        sys.exit(1)
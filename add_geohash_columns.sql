@@ -0,0 +1,25 @@
+-- Script pour ajouter les colonnes geohash aux tables garages et demandes_prestations (MySQL 5.7+)
+-- Équivalent : py add_geohash_columns_script.py (fonctionne aussi avec SQLite)
+
+-- Ajouter les colonnes geohash
+ALTER TABLE garages 
+ADD COLUMN IF NOT EXISTS geohash VARCHAR(12) NULL;
+
+ALTER TABLE demandes_prestations 
+ADD COLUMN IF NOT EXISTS client_geohash VARCHAR(12) NULL;
+
+-- Index pour les recherches par préfixe (geohash >= 'prefixe' AND geohash < 'prefixe{')
+CREATE INDEX IF NOT EXISTS ix_garages_geohash ON garages(geohash);
+CREATE INDEX IF NOT EXISTS ix_demandes_prestations_client_geohash ON demandes_prestations(client_geohash);
+
+-- Index couvrant pour la carte de chaleur (GROUP BY préfixe geohash, statut, service)
+CREATE INDEX IF NOT EXISTS idx_demandes_geohash_statut_service ON demandes_prestations(client_geohash, statut, service_id);
+
+-- Remplir les lignes existantes (ST_GeoHash prend la longitude en premier)
+UPDATE garages 
+SET geohash = ST_GeoHash(longitude, latitude, 12)
+WHERE latitude IS NOT NULL AND longitude IS NOT NULL AND geohash IS NULL;
+
+UPDATE demandes_prestations 
+SET client_geohash = ST_GeoHash(client_longitude, client_latitude, 12)
+WHERE client_latitude IS NOT NULL AND client_longitude IS NOT NULL AND client_geohash IS NULL;
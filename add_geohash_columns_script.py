@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Script pour ajouter les colonnes geohash aux tables garages et demandes_prestations
+puis remplir les lignes existantes (fonctionne avec MySQL et SQLite)
+
+Usage :
+    py add_geohash_columns_script.py            # ajoute les colonnes/index et remplit les geohash manquants
+    py add_geohash_columns_script.py --refresh  # recalcule aussi les geohash déjà renseignés
+"""
+import sys
+import time
+from sqlalchemy import inspect, text
+from database import engine
+from config import settings
+from geohash import encode_position
+
+# Nombre de lignes lues et mises à jour par lot
+BATCH_SIZE = 1000
+
+# (table, colonne geohash, colonne latitude, colonne longitude, nom de l'index)
+GEOHASH_COLUMNS = [
+    ("garages", "geohash", "latitude", "longitude", "ix_garages_geohash"),
+    ("demandes_prestations", "client_geohash", "client_latitude", "client_longitude",
+     "ix_demandes_prestations_client_geohash"),
+]
+
+# Index composites supplémentaires : (table, nom de l'index, colonnes)
+EXTRA_INDEXES = [
+    # Carte de chaleur des demandes : GROUP BY préfixe geohash, statut, service
+    ("demandes_prestations", "idx_demandes_geohash_statut_service", "client_geohash, statut, service_id"),
+]
+
+
+def add_geohash_columns():
+    """Ajoute les colonnes et index geohash s'ils n'existent pas encore"""
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table, column, _, _, index_name in GEOHASH_COLUMNS:
+            columns = {col["name"] for col in inspector.get_columns(table)}
+            if column in columns:
+                print(f"   ⚠️  {table}.{column} existe déjà")
+            else:
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} VARCHAR(12) NULL"))
+                print(f"   ✅ {table}.{column} ajoutée")
+
+            indexes = {index["name"] for index in inspector.get_indexes(table)}
+            if index_name in indexes:
+                print(f"   ⚠️  Index {index_name} existe déjà")
+            else:
+                connection.execute(text(f"CREATE INDEX {index_name} ON {table}({column})"))
+                print(f"   ✅ Index {index_name} créé")
+
+        for table, index_name, columns in EXTRA_INDEXES:
+            indexes = {index["name"] for index in inspector.get_indexes(table)}
+            if index_name in indexes:
+                print(f"   ⚠️  Index {index_name} existe déjà")
+            else:
+                connection.execute(text(f"CREATE INDEX {index_name} ON {table}({columns})"))
+                print(f"   ✅ Index {index_name} créé")
+
+
+def backfill_geohash(refresh: bool = False):
+    """Calcule les geohash des lignes existantes par lots (une requête UPDATE groupée par lot)"""
+    for table, column, lat_column, lon_column, _ in GEOHASH_COLUMNS:
+        start = time.perf_counter()
+        updated = 0
+        last_id = 0
+        condition = "" if refresh else f"AND {column} IS NULL"
+        while True:
+            with engine.begin() as connection:
+                rows = connection.execute(
+                    text(f"""
+                        SELECT id, {lat_column}, {lon_column}
+                        FROM {table}
+                        WHERE id > :last_id
+                        AND {lat_column} IS NOT NULL AND {lon_column} IS NOT NULL
+                        {condition}
+                        ORDER BY id
+                        LIMIT :limit
+                    """),
+                    {"last_id": last_id, "limit": BATCH_SIZE}
+                ).fetchall()
+                if not rows:
+                    break
+
+                last_id = rows[-1][0]
+                params = [
+                    {"id": row_id, "geohash": encode_position(latitude, longitude)}
+                    for row_id, latitude, longitude in rows
+                ]
+                connection.execute(text(f"UPDATE {table} SET {column} = :geohash WHERE id = :id"), params)
+                updated += len(params)
+
+        elapsed = time.perf_counter() - start
+        print(f"   ✅ {table}: {updated} geohash calculé(s) en {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    print("🚀 Ajout des colonnes geohash...")
+    print(f"📍 Connexion à: {settings.DB_HOST}/{settings.DB_NAME}" if not settings.DATABASE_URL else f"📍 Connexion à: {settings.DATABASE_URL}")
+    print()
+
+    try:
+        add_geohash_columns()
+        print("\n🔄 Remplissage des geohash existants...")
+        backfill_geohash(refresh="--refresh" in sys.argv)
+        print("\n✅ Colonnes geohash prêtes")
+    except Exception as e:
+        print(f"\n❌ Erreur lors de l'ajout des colonnes geohash: {e}")
+        sys.exit(1)
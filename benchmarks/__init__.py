@@ -0,0 +1 @@
+# Benchmarks de performance de l'API (à lancer depuis la racine du projet : py -m benchmarks.<module>)
@@ -0,0 +1,181 @@
+"""
+Benchmark : débit concurrent des routes de lecture, session synchrone contre AsyncSession
+
+Les routes portées sur get_async_db (listes et détails des garages, services et
+clients) sont comparées à leur équivalent synchrone (mêmes requêtes par get_db,
+exécutées dans le threadpool AnyIO, limité à --threadpool threads). Base SQLite
+locale (aiosqlite) ; pour mesurer MySQL (aiomysql/asyncmy), pointer DATABASE_URL
+vers la base et passer --no-seed.
+
+Quand le threadpool dépasse la capacité du pool de connexions (pool_size + max_overflow),
+les routes synchrones peuvent se bloquer jusqu'au timeout du pool : la session garde sa
+connexion pendant la sérialisation de la réponse, qui attend elle aussi un thread. Ces
+requêtes sont comptées en échecs.
+
+Usage :
+    py -m benchmarks.bench_async_db
+    py -m benchmarks.bench_async_db --requests 2000 --concurrency 1 16 64 256 --threadpool 40
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+if "DATABASE_URL" not in os.environ:
+    from benchmarks.sqlite_db import configure_sqlite
+    configure_sqlite("async_db_bench")
+
+import anyio.to_thread  # noqa: E402
+import httpx  # noqa: E402
+from typing import List  # noqa: E402
+from fastapi import APIRouter, Depends, FastAPI, HTTPException  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from database import engine, async_engine, Base, SessionLocal, get_db  # noqa: E402
+import models_auth  # noqa: E402,F401
+from models import Garage, Service, Client  # noqa: E402
+from schemas import Garage as GarageSchema, Service as ServiceSchema, Client as ClientSchema  # noqa: E402
+from routers import garages, services, clients  # noqa: E402
+from benchmarks.measure import percentile  # noqa: E402
+
+# Équivalents synchrones des routes portées (code d'avant le passage à AsyncSession)
+sync_router = APIRouter(prefix="/sync")
+
+
+@sync_router.get("/garages/", response_model=List[GarageSchema])
+def sync_get_garages(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    return db.query(Garage).offset(skip).limit(limit).all()
+
+
+@sync_router.get("/garages/{garage_id}", response_model=GarageSchema)
+def sync_get_garage(garage_id: int, db: Session = Depends(get_db)):
+    garage = db.query(Garage).filter(Garage.id == garage_id).first()
+    if not garage:
+        raise HTTPException(status_code=404, detail="Garage non trouvé")
+    return garage
+
+
+@sync_router.get("/services/", response_model=List[ServiceSchema])
+def sync_get_services(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    return db.query(Service).offset(skip).limit(limit).all()
+
+
+@sync_router.get("/services/{service_id}", response_model=ServiceSchema)
+def sync_get_service(service_id: int, db: Session = Depends(get_db)):
+    service = db.query(Service).filter(Service.id == service_id).first()
+    if not service:
+        raise HTTPException(status_code=404, detail="Service non trouvé")
+    return service
+
+
+@sync_router.get("/clients/", response_model=List[ClientSchema])
+def sync_get_clients(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    return db.query(Client).offset(skip).limit(limit).all()
+
+
+@sync_router.get("/clients/{client_id}", response_model=ClientSchema)
+def sync_get_client(client_id: int, db: Session = Depends(get_db)):
+    client = db.query(Client).filter(Client.id == client_id).first()
+    if not client:
+        raise HTTPException(status_code=404, detail="Client non trouvé")
+    return client
+
+
+def seed(rows: int) -> None:
+    """Crée les tables et `rows` garages, services et clients"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        for i in range(rows):
+            db.add(Garage(nom_garage=f"Garage {i}", ville="Paris", email=f"garage{i}@example.com", statut="actif"))
+            db.add(Service(nom=f"Service {i}", prix=50 + i % 100, categorie="maintenance"))
+            db.add(Client(nom=f"Client{i}", prenom="Bench", email=f"client{i}@example.com", telephone="0102030405"))
+        db.commit()
+    finally:
+        db.close()
+
+
+def request_paths(prefix: str, count: int, rows: int, seed_value: int) -> List[str]:
+    """Mélange de listes (une sur quatre) et de détails sur les trois ressources"""
+    rng = random.Random(seed_value)
+    paths = []
+    for _ in range(count):
+        resource = rng.choice(["garages", "services", "clients"])
+        if rng.random() < 0.25:
+            paths.append(f"{prefix}/{resource}/?limit=20&skip={rng.randrange(max(1, rows - 20))}")
+        else:
+            paths.append(f"{prefix}/{resource}/{rng.randint(1, rows)}")
+    return paths
+
+
+async def run(app: FastAPI, paths: List[str], concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    durations = []
+    failures = 0
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://bench") as client:
+        async def call(path: str):
+            nonlocal failures
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(path)
+                durations.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    failures += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*[call(path) for path in paths])
+        elapsed = time.perf_counter() - start
+
+    durations.sort()
+    return {
+        "requests_per_second": round(len(paths) / elapsed, 1),
+        "p50_ms": round(percentile(durations, 0.50), 2),
+        "p99_ms": round(percentile(durations, 0.99), 2),
+        "failures": failures
+    }
+
+
+async def bench(app: FastAPI, args) -> None:
+    # Taille du threadpool des routes synchrones (40 par défaut dans AnyIO)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = args.threadpool
+
+    capacity = engine.pool.size() + engine.pool._max_overflow
+    if args.threadpool > capacity:
+        print(f"⚠️  Threadpool ({args.threadpool}) > connexions du pool synchrone ({capacity}) : "
+              f"blocages possibles des routes synchrones")
+    print(f"{'Concurrence':>12} {'Session':>8} {'Req./s':>9} {'p50 (ms)':>10} {'p99 (ms)':>10} {'Échecs':>7}")
+    for concurrency in args.concurrency:
+        for mode, prefix in (("sync", "/sync"), ("async", "")):
+            paths = request_paths(prefix, args.requests, args.rows, args.seed)
+            result = await run(app, paths, concurrency)
+            print(f"{concurrency:>12} {mode:>8} {result['requests_per_second']:>9.1f} {result['p50_ms']:>10.2f} "
+                  f"{result['p99_ms']:>10.2f} {result['failures']:>7}")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Débit des routes de lecture : Session contre AsyncSession")
+    parser.add_argument("--rows", type=int, default=1000, help="Garages, services et clients créés")
+    parser.add_argument("--requests", type=int, default=1000, help="Requêtes par palier et par mode")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64, 256])
+    parser.add_argument("--threadpool", type=int, default=40, help="Threads AnyIO des routes synchrones")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-seed", action="store_true", help="Utiliser les données existantes de DATABASE_URL")
+    args = parser.parse_args()
+
+    if async_engine is None:
+        raise SystemExit("Pilote asynchrone non installé (aiosqlite, aiomysql ou asyncmy)")
+    if not args.no_seed:
+        seed(args.rows)
+
+    app = FastAPI()
+    for router in (garages.router, services.router, clients.router, sync_router):
+        app.include_router(router)
+
+    print(f"⚡ {args.requests} requêtes par palier, {args.rows} lignes par table, threadpool {args.threadpool}")
+    asyncio.run(bench(app, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark de GET /auth/me avec et sans le cache des claims JWT (token_cache)
+
+Usage :
+    py -m benchmarks.bench_auth_me
+    py -m benchmarks.bench_auth_me --requests 5000 --users 50
+
+Les requêtes tournent sur `--users` tokens distincts, comme plusieurs écrans de
+l'application mobile qui rappellent /auth/me avec le même token.
+"""
+import argparse
+import time
+from datetime import timedelta
+
+from benchmarks.sqlite_db import configure_sqlite
+configure_sqlite("auth_bench")
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from database import engine, SessionLocal, Base  # noqa: E402
+# Import pour son effet : enregistre les tables dans Base.metadata (create_all)
+import models  # noqa: E402,F401
+from models_auth import Utilisateur  # noqa: E402
+from routers import auth  # noqa: E402
+from routers.auth import create_access_token, decode_token  # noqa: E402
+from token_cache import token_claims_cache  # noqa: E402
+from benchmarks.measure import time_calls  # noqa: E402
+
+
+def create_users(count: int):
+    """Crée `count` utilisateurs et retourne un token par utilisateur"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        users = [
+            Utilisateur(nom=f"User{i}", prenom="Bench", email=f"user{i}@bench.local", mot_de_passe="x" * 60, role="client")
+            for i in range(count)
+        ]
+        db.add_all(users)
+        db.commit()
+        return [
+            create_access_token(
+                data={"sub": str(user.id), "email": user.email, "role": "client"},
+                expires_delta=timedelta(days=30)
+            )
+            for user in users
+        ]
+    finally:
+        db.close()
+
+
+def run(label: str, tokens, requests: int, http: TestClient) -> dict:
+    token_claims_cache.clear()
+    token_calls = [(tokens[i % len(tokens)],) for i in range(requests)]
+    results = {"decode_token": time_calls(decode_token, token_calls)}
+
+    token_claims_cache.clear()
+
+    def get_me(token):
+        response = http.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+        response.raise_for_status()
+
+    start = time.perf_counter()
+    results["auth_me"] = time_calls(get_me, token_calls)
+    elapsed = time.perf_counter() - start
+    results["auth_me"]["requests_per_second"] = round(requests / elapsed, 1)
+
+    print(f"\n=== {label} ===")
+    for name, metrics in results.items():
+        line = f"   {name:<14} p50={metrics['p50_us']:>9.1f}us  p95={metrics['p95_us']:>9.1f}us  p99={metrics['p99_us']:>9.1f}us"
+        if "requests_per_second" in metrics:
+            line += f"  {metrics['requests_per_second']:.0f} req/s"
+        print(line)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de /auth/me avec et sans cache des tokens")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=20, help="Nombre de tokens distincts")
+    args = parser.parse_args()
+
+    tokens = create_users(args.users)
+    app = FastAPI()
+    app.include_router(auth.router)
+    http = TestClient(app)
+
+    max_size, ttl_seconds = token_claims_cache.max_size, token_claims_cache.ttl_seconds
+    token_claims_cache.max_size = 0
+    without_cache = run("Sans cache", tokens, args.requests, http)
+    token_claims_cache.max_size, token_claims_cache.ttl_seconds = max_size or 10000, ttl_seconds or 300
+    with_cache = run("Avec cache", tokens, args.requests, http)
+
+    print("\n=== Gain du cache ===")
+    for name in ("decode_token", "auth_me"):
+        speedup = without_cache[name]["p50_us"] / with_cache[name]["p50_us"] if with_cache[name]["p50_us"] else 0
+        print(f"   {name:<14} p50 x{speedup:.1f}")
+    print(f"   Débit /auth/me : {without_cache['auth_me']['requests_per_second']:.0f} -> "
+          f"{with_cache['auth_me']['requests_per_second']:.0f} req/s")
+    print(f"   {token_claims_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
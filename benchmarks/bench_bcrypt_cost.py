@@ -0,0 +1,72 @@
+"""
+Benchmark : capacité de connexion par cœur selon le coût bcrypt
+
+Une connexion réussie coûte une vérification bcrypt ; la capacité d'un cœur est donc
+d'environ 1000 / (durée d'une vérification en ms) connexions par seconde.
+
+Usage :
+    py -m benchmarks.bench_bcrypt_cost
+    py -m benchmarks.bench_bcrypt_cost --rounds 10 11 12 13 14 --repeat 5 --target-ms 250
+    py -m benchmarks.bench_bcrypt_cost --pool-logins 64   # mesure aussi le débit réel du pool
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from config import settings
+from password_pool import PasswordWorkerPool, calibrate_rounds, get_password_hash, verify_password
+
+
+def measure_verify_ms(rounds: int, repeat: int) -> float:
+    """Durée médiane (ms) d'une vérification au coût donné"""
+    hashed = get_password_hash("benchmark-password", rounds)
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        verify_password("benchmark-password", hashed)
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations)
+
+
+async def measure_pool(rounds: int, logins: int, mode: str) -> float:
+    """Connexions par seconde du pool (tous les cœurs) au coût donné"""
+    pool = PasswordWorkerPool(mode=mode, rounds=rounds)
+    hashed = get_password_hash("benchmark-password", rounds)
+    await pool.verify("benchmark-password", hashed)  # démarrage des workers
+    start = time.perf_counter()
+    await asyncio.gather(*[pool.verify("benchmark-password", hashed) for _ in range(logins)])
+    elapsed = time.perf_counter() - start
+    pool.shutdown()
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Capacité de connexion par cœur selon le coût bcrypt")
+    parser.add_argument("--rounds", type=int, nargs="+", default=[8, 9, 10, 11, 12, 13, 14])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=250)
+    parser.add_argument("--min-rounds", type=int, default=settings.BCRYPT_MIN_ROUNDS)
+    parser.add_argument("--pool-logins", type=int, default=0, help="Connexions simultanées pour mesurer le pool (0 = non)")
+    parser.add_argument("--pool-mode", default="thread", choices=["thread", "process"])
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    print(f"🔐 bcrypt : {cores} cœur(s)")
+    print(f"{'Coût':>6} {'Vérif. (ms)':>12} {'Connexions/s/cœur':>18} {'Connexions/s (tous)':>20}" +
+          (f" {'Mesuré pool':>12}" if args.pool_logins else ""))
+    for rounds in args.rounds:
+        verify_ms = measure_verify_ms(rounds, args.repeat)
+        per_core = 1000 / verify_ms
+        line = f"{rounds:>6} {verify_ms:>12.1f} {per_core:>18.1f} {per_core * cores:>20.1f}"
+        if args.pool_logins:
+            line += f" {asyncio.run(measure_pool(rounds, args.pool_logins, args.pool_mode)):>12.1f}"
+        print(line)
+
+    rounds, measured_ms = calibrate_rounds(args.target_ms, args.min_rounds)
+    print(f"\n🎯 Calibration pour {args.target_ms:.0f} ms : coût {rounds} "
+          f"(~{measured_ms * 2 ** (rounds - args.min_rounds):.0f} ms, {measured_ms:.1f} ms au coût {args.min_rounds})")
+
+
+if __name__ == "__main__":
+    main()
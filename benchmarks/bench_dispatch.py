@@ -0,0 +1,224 @@
+"""
+Benchmark du chemin d'attribution des demandes (calculate_distance, find_nearest_garage,
+POST /prestations/demandes/) sur une base SQLite locale peuplée de garages synthétiques
+
+Usage :
+    py -m benchmarks.bench_dispatch
+    py -m benchmarks.bench_dispatch --garages 1000 10000 100000 1000000 --requests 500
+    py -m benchmarks.bench_dispatch --modes index bbox geohash --save-baseline benchmarks/baseline.json
+    py -m benchmarks.bench_dispatch --compare benchmarks/baseline.json
+
+Les latences sont mesurées sans tracemalloc ; les allocations dans une passe séparée.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+
+# La base du benchmark doit être configurée avant l'import de database/config
+from benchmarks.sqlite_db import configure_sqlite
+BENCH_DB_PATH = configure_sqlite("garage_bench")
+
+from sqlalchemy import delete  # noqa: E402
+from config import settings  # noqa: E402
+from database import engine, SessionLocal, Base  # noqa: E402
+import models_auth  # noqa: E402,F401
+from models import Garage, Client, Vehicule, Service, DemandePrestation  # noqa: E402
+from geohash import encode  # noqa: E402
+from geo_distance import calculate_distance  # noqa: E402
+from garage_index import garage_index  # noqa: E402
+from garage_load import garage_load  # noqa: E402
+from nearest_cache import nearest_garage_cache  # noqa: E402
+from routers import demandes_prestations  # noqa: E402
+from routers.demandes_prestations import CreateDemandeRequest, create_demande_prestation, find_nearest_garage  # noqa: E402
+from benchmarks.measure import time_calls, measure_allocations  # noqa: E402
+from benchmarks.synthetic import generate_garages, generate_clients  # noqa: E402
+
+INSERT_BATCH_SIZE = 10000
+
+
+def setup_fixtures():
+    """Crée les tables et le client/véhicule/service utilisés par les demandes"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        db.add(Client(id=1, nom="Bench", prenom="Client", email="bench@example.com", telephone="0000000000"))
+        db.add(Service(id=1, nom="Vidange", prix=25))
+        db.commit()
+        db.add(Vehicule(id=1, client_id=1, marque="Toyota", modele="Corolla", immatriculation="BENCH-1"))
+        db.commit()
+    finally:
+        db.close()
+
+
+def populate_garages(count: int, seed: int):
+    """Remplace les garages (et les demandes) par `count` garages synthétiques"""
+    rows = generate_garages(count, seed)
+    for row in rows:
+        row["geohash"] = encode(row["latitude"], row["longitude"])
+    with engine.begin() as connection:
+        connection.execute(delete(DemandePrestation))
+        connection.execute(delete(Garage))
+        for start in range(0, len(rows), INSERT_BATCH_SIZE):
+            connection.execute(Garage.__table__.insert(), rows[start:start + INSERT_BATCH_SIZE])
+    # Repartir à froid : l'index, les compteurs et le cache correspondaient à l'ancien jeu
+    garage_index.invalidate()
+    garage_load.invalidate()
+    nearest_garage_cache.clear()
+
+
+def run_size(count: int, args, clients) -> dict:
+    results = {}
+    print(f"\n=== {count} garages ===")
+    start = time.perf_counter()
+    populate_garages(count, args.seed)
+    print(f"   Insertion : {time.perf_counter() - start:.1f}s")
+
+    garage_pairs = [(row[0], row[1]) for row in generate_clients(len(clients), args.seed + 100)]
+    distance_calls = [
+        (lat, lon, garage_lat, garage_lon)
+        for (lat, lon), (garage_lat, garage_lon) in zip(clients, garage_pairs)
+    ]
+    results["calculate_distance"] = time_calls(calculate_distance, distance_calls)
+
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        garage_index.reload(db)
+        garage_index.nearest(clients[0][0], clients[0][1])
+        results["index_build"] = {"seconds": round(time.perf_counter() - start, 3)}
+
+        for mode in args.modes:
+            settings.GARAGE_SEARCH_MODE = mode
+            find_nearest_garage(clients[0][0], clients[0][1], db)  # préchauffage
+            calls = [(lat, lon, db) for lat, lon in clients]
+            results[f"find_nearest_garage[{mode}]"] = time_calls(find_nearest_garage, calls)
+            if not args.no_allocations:
+                results[f"find_nearest_garage[{mode}]"].update(
+                    measure_allocations(find_nearest_garage, calls[:args.allocation_sample])
+                )
+    finally:
+        db.close()
+
+    settings.GARAGE_SEARCH_MODE = args.modes[0]
+
+    def post_demande(lat, lon):
+        db = SessionLocal()
+        try:
+            create_demande_prestation(CreateDemandeRequest(
+                client_id=1,
+                vehicule_id=1,
+                service_id=1,
+                client_latitude=lat,
+                client_longitude=lon
+            ), db)
+        finally:
+            db.close()
+
+    post_demande(*clients[0])  # préchauffage
+    results["post_demande_handler"] = time_calls(post_demande, clients)
+    if not args.no_allocations:
+        results["post_demande_handler"].update(measure_allocations(post_demande, clients[:args.allocation_sample]))
+
+    try:
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+    except ImportError:
+        print("   (httpx non installé : mesure HTTP ignorée)")
+    else:
+        app = FastAPI()
+        app.include_router(demandes_prestations.router)
+        http = TestClient(app)
+
+        def post_demande_http(lat, lon):
+            response = http.post("/prestations/demandes/", json={
+                "client_id": 1,
+                "vehicule_id": 1,
+                "service_id": 1,
+                "client_latitude": lat,
+                "client_longitude": lon
+            })
+            response.raise_for_status()
+
+        post_demande_http(*clients[0])
+        results["post_demande_http"] = time_calls(post_demande_http, clients)
+
+    for name, metrics in results.items():
+        if "p50_us" in metrics:
+            print(f"   {name:<32} p50={metrics['p50_us']:>10.1f}us  p95={metrics['p95_us']:>10.1f}us  p99={metrics['p99_us']:>10.1f}us"
+                  + (f"  peak={metrics['peak_bytes_mean']:.0f}B" if "peak_bytes_mean" in metrics else ""))
+        else:
+            print(f"   {name:<32} {metrics}")
+    return results
+
+
+def compare(baseline: dict, current: dict):
+    """Affiche l'évolution des percentiles par rapport à la référence"""
+    print("\n=== Comparaison avec la référence ===")
+    for size, metrics in current["results"].items():
+        base_metrics = baseline.get("results", {}).get(size)
+        if not base_metrics:
+            print(f"   {size} garages : absent de la référence")
+            continue
+        for name, values in metrics.items():
+            base_values = base_metrics.get(name)
+            if not base_values or "p50_us" not in values:
+                continue
+            deltas = []
+            for key in ("p50_us", "p95_us", "p99_us"):
+                if base_values.get(key):
+                    deltas.append(f"{key[:3]} {(values[key] / base_values[key] - 1) * 100:+.1f}%")
+            print(f"   {size:>8} {name:<32} " + "  ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'attribution des demandes de prestations")
+    parser.add_argument("--garages", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--requests", type=int, default=300, help="Nombre de positions clients mesurées")
+    parser.add_argument("--modes", nargs="+", default=["index"], choices=["index", "bbox", "geohash"])
+    parser.add_argument("--strategy", default="nearest", choices=["nearest", "load_aware"])
+    parser.add_argument("--cache", action="store_true", help="Activer le cache du garage le plus proche")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-allocations", action="store_true")
+    parser.add_argument("--allocation-sample", type=int, default=100)
+    parser.add_argument("--output", help="Fichier JSON des résultats")
+    parser.add_argument("--save-baseline", help="Enregistrer les résultats comme référence")
+    parser.add_argument("--compare", help="Comparer avec une référence enregistrée")
+    args = parser.parse_args()
+
+    settings.DISPATCH_STRATEGY = args.strategy
+    if not args.cache:
+        nearest_garage_cache.max_size = 0
+
+    setup_fixtures()
+    clients = generate_clients(args.requests, args.seed + 1)
+
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "requests": args.requests,
+            "modes": args.modes,
+            "strategy": args.strategy,
+            "cache": args.cache,
+            "seed": args.seed
+        },
+        "results": {str(count): run_size(count, args, clients) for count in args.garages}
+    }
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"\n💾 Résultats enregistrés dans {path}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
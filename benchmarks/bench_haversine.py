@@ -0,0 +1,69 @@
+"""
+Benchmark : Haversine scalaire (boucle math.sin/cos/atan2) vs Haversine vectorisée NumPy
+
+Usage :
+    py -m benchmarks.bench_haversine
+    py -m benchmarks.bench_haversine --sizes 1000 10000 100000 --clients 200
+"""
+import argparse
+import random
+import time
+from geo_distance import CoordinateArrays, calculate_distance
+
+
+def generate_garages(count: int, seed: int = 42):
+    """Génère des garages aléatoires autour d'Abidjan"""
+    rnd = random.Random(seed)
+    latitudes = [rnd.uniform(5.0, 5.6) for _ in range(count)]
+    longitudes = [rnd.uniform(-4.3, -3.6) for _ in range(count)]
+    return latitudes, longitudes
+
+
+def best_of(func, repeat: int) -> float:
+    """Meilleur temps (secondes) sur plusieurs exécutions"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes, clients: int, repeat: int):
+    client_lat, client_lon = 5.35, -4.0
+    client_lats, client_lons = generate_garages(clients, seed=7)
+
+    print(f"{'garages':>10} | {'scalaire 1xN':>14} | {'NumPy 1xN':>12} | {'gain':>7} | {'NumPy MxN':>12} | {'scalaire MxN (est.)':>20}")
+    print("-" * 92)
+    for size in sizes:
+        latitudes, longitudes = generate_garages(size)
+        arrays = CoordinateArrays(range(size), latitudes, longitudes)
+        pairs = list(zip(latitudes, longitudes))
+
+        def scalar_one():
+            min(calculate_distance(client_lat, client_lon, lat, lon) for lat, lon in pairs)
+
+        def vector_one():
+            arrays.distances_from(client_lat, client_lon).argmin()
+
+        def vector_many():
+            arrays.nearest_many(client_lats, client_lons)
+
+        scalar_time = best_of(scalar_one, repeat)
+        vector_time = best_of(vector_one, repeat)
+        many_time = best_of(vector_many, max(1, repeat // 2))
+        print(
+            f"{size:>10} | {scalar_time * 1000:>11.2f} ms | {vector_time * 1000:>9.3f} ms | "
+            f"{scalar_time / vector_time:>6.1f}x | {many_time * 1000:>9.2f} ms | "
+            f"{scalar_time * clients * 1000:>17.0f} ms"
+        )
+    print(f"\nMxN : {clients} clients vers tous les garages")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Haversine scalaire vs NumPy")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.sizes, args.clients, args.repeat)
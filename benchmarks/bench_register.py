@@ -0,0 +1,102 @@
+"""
+Benchmark : inscriptions par seconde sous concurrence (POST /auth/register)
+
+Compte aussi les requêtes SQL et les commits par inscription. Le coût bcrypt est
+abaissé par défaut (--rounds 4) pour mesurer le chemin base de données ; utiliser
+--rounds 12 pour le coût de production. Nécessite httpx (pip install httpx).
+
+Usage :
+    py -m benchmarks.bench_register
+    py -m benchmarks.bench_register --registrations 500 --concurrency 1 8 32 --rounds 4
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.sqlite_db import configure_sqlite
+configure_sqlite("register_bench")
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from database import engine, Base  # noqa: E402
+# Import pour son effet : enregistre les tables dans Base.metadata (create_all)
+import models  # noqa: E402,F401
+import models_auth  # noqa: E402,F401
+from routers import auth  # noqa: E402
+from password_pool import password_pool  # noqa: E402
+from benchmarks.measure import percentile  # noqa: E402
+
+counters = {"statements": 0, "commits": 0}
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counters["statements"] += 1
+
+
+@event.listens_for(engine, "commit")
+def _count_commit(conn):
+    counters["commits"] += 1
+
+
+async def run(app: FastAPI, registrations: int, concurrency: int, offset: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    durations = []
+    failures = 0
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def register(i: int):
+            nonlocal failures
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/auth/register", json={
+                    "nom_complet": f"Client{i} Bench",
+                    "email": f"client{offset + i}@example.com",
+                    "password": "benchmark-password",
+                    "telephone": "0102030405"
+                })
+                durations.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 201:
+                    failures += 1
+
+        counters.update(statements=0, commits=0)
+        start = time.perf_counter()
+        await asyncio.gather(*[register(i) for i in range(registrations)])
+        elapsed = time.perf_counter() - start
+
+    durations.sort()
+    return {
+        "concurrency": concurrency,
+        "registrations_per_second": round(registrations / elapsed, 1),
+        "p50_ms": round(percentile(durations, 0.50), 2),
+        "p95_ms": round(percentile(durations, 0.95), 2),
+        "statements_per_registration": round(counters["statements"] / registrations, 2),
+        "commits_per_registration": round(counters["commits"] / registrations, 2),
+        "failures": failures
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des inscriptions concurrentes")
+    parser.add_argument("--registrations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--rounds", type=int, default=4, help="Coût bcrypt des hashes")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    password_pool.rounds = args.rounds
+    app = FastAPI()
+    app.include_router(auth.router)
+
+    print(f"📝 {args.registrations} inscriptions par palier, coût bcrypt {args.rounds}")
+    print(f"{'Concurrence':>12} {'Inscr./s':>10} {'p50 (ms)':>10} {'p95 (ms)':>10} {'SQL/inscr.':>11} {'Commits':>8} {'Échecs':>7}")
+    for index, concurrency in enumerate(args.concurrency):
+        result = asyncio.run(run(app, args.registrations, concurrency, index * args.registrations))
+        print(f"{result['concurrency']:>12} {result['registrations_per_second']:>10.1f} {result['p50_ms']:>10.1f} "
+              f"{result['p95_ms']:>10.1f} {result['statements_per_registration']:>11.2f} "
+              f"{result['commits_per_registration']:>8.2f} {result['failures']:>7}")
+
+
+if __name__ == "__main__":
+    main()
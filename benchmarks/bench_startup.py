@@ -0,0 +1,110 @@
+"""
+Benchmark : durée d'import de main.py et démarrage à froid selon DB_STARTUP_MODE
+
+Chaque mesure tourne dans un processus neuf (imports et moteurs non partagés) :
+- import : durée de `import main` (aucun accès à la base) ;
+- service : fin de la phase de démarrage (lifespan), l'API accepte les requêtes ;
+- prête : fin de la préparation de la base (connexion, schéma, préchauffage des pools).
+
+Scénarios : base SQLite vide (tables créées), base SQLite existante (tables vérifiées)
+et serveur MySQL injoignable (DB_STARTUP_RETRIES tentatives espacées de
+DB_STARTUP_RETRY_DELAY secondes). La calibration bcrypt est désactivée pour isoler la base.
+
+Usage :
+    py -m benchmarks.bench_startup
+    py -m benchmarks.bench_startup --repeat 5 --modes blocking background skip
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child() -> None:
+    """Mesure dans le processus courant ; écrit le résultat JSON sur la dernière ligne"""
+    start = time.perf_counter()
+    import main
+    imported = time.perf_counter()
+
+    from fastapi.testclient import TestClient
+    with TestClient(main.app):
+        serving = time.perf_counter()
+        task = getattr(main.app.state, "database_startup", None)
+        while task is not None and not task.done():
+            time.sleep(0.005)
+        ready = time.perf_counter()
+        status = dict(main.app.state.startup)
+
+    print(json.dumps({
+        "import_ms": (imported - start) * 1000,
+        "serving_ms": (serving - start) * 1000,
+        "ready_ms": (ready - start) * 1000,
+        "database": status["database"]
+    }))
+
+
+def measure(env: dict) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def scenarios(args) -> list:
+    sqlite_path = os.path.join(tempfile.gettempdir(), "startup_bench.db")
+    sqlite_url = f"sqlite:///{sqlite_path}"
+    unreachable = {"DB_HOST": "127.0.0.1", "DB_PORT": "1", "DATABASE_URL": ""}
+    return [
+        ("SQLite vide", {"DATABASE_URL": sqlite_url}, sqlite_path),
+        ("SQLite existante", {"DATABASE_URL": sqlite_url}, None),
+        ("MySQL injoignable", unreachable, None)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import et démarrage à froid de l'API")
+    parser.add_argument("--repeat", type=int, default=3, help="Mesures par scénario et par mode (médiane)")
+    parser.add_argument("--modes", nargs="+", default=["blocking", "background", "skip"])
+    parser.add_argument("--retries", type=int, default=3, help="DB_STARTUP_RETRIES")
+    parser.add_argument("--retry-delay", type=float, default=2, help="DB_STARTUP_RETRY_DELAY")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return
+
+    print(f"⚡ Médiane sur {args.repeat} démarrage(s) (processus neufs), durées depuis le début de l'import")
+    print(f"{'Scénario':>18} {'Mode':>11} {'Import (ms)':>12} {'Service (ms)':>13} {'Prête (ms)':>11} {'Base':>12}")
+    for name, overrides, reset_path in scenarios(args):
+        for mode in args.modes:
+            results = []
+            for _ in range(args.repeat):
+                if reset_path and os.path.exists(reset_path):
+                    os.remove(reset_path)
+                env = {
+                    **os.environ,
+                    **overrides,
+                    "DB_STARTUP_MODE": mode,
+                    "DB_STARTUP_RETRIES": str(args.retries),
+                    "DB_STARTUP_RETRY_DELAY": str(args.retry_delay),
+                    "BCRYPT_CALIBRATE": "False"
+                }
+                if not env["DATABASE_URL"]:
+                    del env["DATABASE_URL"]
+                results.append(measure(env))
+            median = {key: statistics.median(result[key] for result in results)
+                      for key in ("import_ms", "serving_ms", "ready_ms")}
+            print(f"{name:>18} {mode:>11} {median['import_ms']:>12.0f} {median['serving_ms']:>13.0f} "
+                  f"{median['ready_ms']:>11.0f} {results[-1]['database']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Outils de mesure communs aux benchmarks : latences (p50/p95/p99) et allocations mémoire
+"""
+import time
+import tracemalloc
+from typing import Callable, Iterable, List
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Percentile (interpolation linéaire) d'une liste déjà triée"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    weight = position - lower
+    return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
+
+
+def time_calls(func: Callable, calls: Iterable[tuple]) -> dict:
+    """Chronomètre chaque appel func(*args) et retourne les latences en microsecondes"""
+    durations = []
+    for args in calls:
+        start = time.perf_counter()
+        func(*args)
+        durations.append((time.perf_counter() - start) * 1e6)
+    durations.sort()
+    return {
+        "calls": len(durations),
+        "mean_us": round(sum(durations) / len(durations), 2) if durations else 0.0,
+        "p50_us": round(percentile(durations, 0.50), 2),
+        "p95_us": round(percentile(durations, 0.95), 2),
+        "p99_us": round(percentile(durations, 0.99), 2)
+    }
+
+
+def measure_allocations(func: Callable, calls: Iterable[tuple]) -> dict:
+    """Allocations Python par appel (passe séparée : tracemalloc ralentit l'exécution)
+
+    peak : mémoire allouée au plus fort de l'appel ; net : mémoire restant allouée après
+    l'appel (croissance des caches, fuites).
+    """
+    peaks = []
+    net = 0
+    tracemalloc.start()
+    try:
+        for args in calls:
+            start, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            func(*args)
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - start)
+            net += current - start
+    finally:
+        tracemalloc.stop()
+    return {
+        "peak_bytes_mean": round(sum(peaks) / len(peaks), 1) if peaks else 0.0,
+        "peak_bytes_max": max(peaks) if peaks else 0,
+        "net_bytes_per_call": round(net / len(peaks), 1) if peaks else 0.0
+    }
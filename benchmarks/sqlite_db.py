@@ -0,0 +1,17 @@
+"""
+Base SQLite jetable pour les benchmarks
+
+configure_sqlite() doit être appelée avant tout import de config/database : l'URL de
+connexion est lue à l'import et le moteur est créé une seule fois.
+"""
+import os
+import tempfile
+
+
+def configure_sqlite(name: str) -> str:
+    """Pointe DATABASE_URL vers une base SQLite vide (BENCH_DB_PATH ou fichier temporaire)"""
+    path = os.environ.get("BENCH_DB_PATH", os.path.join(tempfile.gettempdir(), f"{name}.db"))
+    if os.path.exists(path):
+        os.remove(path)
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    return path
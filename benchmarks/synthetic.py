@@ -0,0 +1,59 @@
+"""
+Génération de données synthétiques pour les benchmarks (garages et positions de clients)
+
+Les positions sont regroupées autour de villes, avec une dispersion proportionnelle à leur
+taille, plus une part de points isolés : c'est ce regroupement qui rend réalistes les
+performances des index spatiaux et des caches par quartier.
+"""
+import random
+from typing import List, Tuple
+
+# (latitude, longitude, poids, dispersion en degrés)
+CITY_CENTERS = [
+    (5.3600, -4.0083, 0.45, 0.08),   # Abidjan
+    (7.6906, -5.0303, 0.12, 0.04),   # Bouaké
+    (6.8276, -5.2893, 0.08, 0.03),   # Yamoussoukro
+    (5.8079, -6.6001, 0.05, 0.02),   # Soubré
+    (4.7485, -6.6363, 0.05, 0.02),   # San-Pédro
+    (9.4580, -5.6296, 0.05, 0.03),   # Korhogo
+    (6.8774, -6.4502, 0.05, 0.02),   # Daloa
+    (14.7167, -17.4677, 0.10, 0.06), # Dakar
+]
+
+# Part des points répartis uniformément sur la région (hors villes)
+BACKGROUND_RATIO = 0.05
+REGION = (4.3, 15.0, -17.6, -2.5)  # lat_min, lat_max, lon_min, lon_max
+
+
+def generate_points(count: int, seed: int = 42) -> List[Tuple[float, float]]:
+    """Génère `count` positions regroupées autour des villes"""
+    rnd = random.Random(seed)
+    weights = [city[2] for city in CITY_CENTERS]
+    lat_min, lat_max, lon_min, lon_max = REGION
+    points = []
+    for _ in range(count):
+        if rnd.random() < BACKGROUND_RATIO:
+            points.append((rnd.uniform(lat_min, lat_max), rnd.uniform(lon_min, lon_max)))
+            continue
+        lat, lon, _, spread = rnd.choices(CITY_CENTERS, weights)[0]
+        points.append((round(lat + rnd.gauss(0, spread), 8), round(lon + rnd.gauss(0, spread), 8)))
+    return points
+
+
+def generate_garages(count: int, seed: int = 42) -> List[dict]:
+    """Lignes de garages prêtes à insérer (90 % actifs)"""
+    rnd = random.Random(seed + 1)
+    garages = []
+    for i, (lat, lon) in enumerate(generate_points(count, seed)):
+        garages.append({
+            "nom_garage": f"Garage {i + 1}",
+            "statut": "actif" if rnd.random() < 0.9 else "inactif",
+            "latitude": lat,
+            "longitude": lon
+        })
+    return garages
+
+
+def generate_clients(count: int, seed: int = 7) -> List[Tuple[float, float]]:
+    """Positions de clients (mêmes villes que les garages, tirage indépendant)"""
+    return generate_points(count, seed)
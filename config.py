@@ -1,3 +1,4 @@
+from pydantic import field_validator
 from pydantic_settings import BaseSettings
 from typing import Optional
 import os
@@ -11,20 +12,210 @@ class Settings(BaseSettings):
     DB_USER: str = os.getenv("DB_USER", "mysql")
     DB_PASSWORD: str = os.getenv("DB_PASSWORD", "gt7yxk0c69yn90rs")
     DB_NAME: str = os.getenv("DB_NAME", "garage_db")
+    # URL SQLAlchemy complète (ex: sqlite:///./garage_local.db pour les tests en local)
+    # Si elle est définie, elle remplace la configuration MySQL ci-dessus
+    DATABASE_URL: Optional[str] = os.getenv("DATABASE_URL")
+    # Pilote asynchrone MySQL des routes AsyncSession : "aiomysql" ou "asyncmy" (SQLite : aiosqlite)
+    DB_ASYNC_DRIVER: str = os.getenv("DB_ASYNC_DRIVER", "aiomysql")
+    # Réplicas en lecture (URLs SQLAlchemy séparées par des virgules, vide = aucun) :
+    # les routes de lecture lourdes y envoient leurs SELECT (voir replicas.py)
+    DB_REPLICA_URLS: str = os.getenv("DB_REPLICA_URLS", "")
+    # Délai avant de re-tester un réplica écarté après une erreur de connexion
+    DB_REPLICA_HEALTH_CHECK_SECONDS: float = float(os.getenv("DB_REPLICA_HEALTH_CHECK_SECONDS", "10"))
+    # Après une écriture, les lectures du même client restent sur le primaire pendant ce délai
+    DB_READ_YOUR_WRITES_SECONDS: float = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
+    # Pool de connexions (par worker et par moteur). Par défaut, dérivé du nombre de workers
+    # uvicorn (WEB_CONCURRENCY, lu aussi par uvicorn) et de la taille du threadpool : chaque
+    # thread peut tenir une connexion, sans dépasser DB_MAX_CONNECTIONS pour l'ensemble des workers
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+    # Threads AnyIO des routes synchrones (40 par défaut dans AnyIO), appliqué au démarrage
+    THREADPOOL_SIZE: int = int(os.getenv("THREADPOOL_SIZE", "40"))
+    # Connexions autorisées à l'API sur le serveur, tous workers confondus (MySQL : max_connections=151)
+    DB_MAX_CONNECTIONS: int = int(os.getenv("DB_MAX_CONNECTIONS", "150"))
+    # Vides = valeurs dérivées (voir pool_size / max_overflow)
+    DB_POOL_SIZE: Optional[int] = int(os.getenv("DB_POOL_SIZE")) if os.getenv("DB_POOL_SIZE") else None
+    DB_MAX_OVERFLOW: Optional[int] = int(os.getenv("DB_MAX_OVERFLOW")) if os.getenv("DB_MAX_OVERFLOW") else None
+    # Part du budget de connexions d'un worker réservée au moteur asynchrone (routes AsyncSession) :
+    # les deux moteurs visent le même serveur et se partagent DB_MAX_CONNECTIONS / WEB_CONCURRENCY
+    DB_ASYNC_POOL_SHARE: float = float(os.getenv("DB_ASYNC_POOL_SHARE", "0.25"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    # Recyclage des connexions (secondes, -1 = jamais) : rester sous le wait_timeout du serveur
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "300"))
+    # Vérifier chaque connexion avant usage (un aller-retour de plus, mais pas d'erreur après une coupure)
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+    # Ouvrir pool_size connexions en arrière-plan au démarrage
+    DB_POOL_WARMUP: bool = os.getenv("DB_POOL_WARMUP", "True").lower() == "true"
+    # Avertissement dans les logs quand l'attente d'une connexion du pool dépasse ce délai
+    DB_POOL_WAIT_WARNING_MS: float = float(os.getenv("DB_POOL_WAIT_WARNING_MS", "100"))
+    # Phase de démarrage de la base (test de connexion, schéma, préchauffage), hors import :
+    # "background" (l'API répond pendant la préparation), "blocking" (l'API attend la fin
+    # de la préparation pour répondre) ou "skip" (aucun accès à la base au démarrage)
+    DB_STARTUP_MODE: str = os.getenv("DB_STARTUP_MODE", "background").lower()
+    DB_STARTUP_RETRIES: int = int(os.getenv("DB_STARTUP_RETRIES", "3"))
+    DB_STARTUP_RETRY_DELAY: float = float(os.getenv("DB_STARTUP_RETRY_DELAY", "2"))
+    # Schéma au démarrage : "create" (crée les tables manquantes), "verify" (les signale) ou "skip"
+    DB_SCHEMA_CHECK: str = os.getenv("DB_SCHEMA_CHECK", "create").lower()
     
     # Configuration de l'API
     API_HOST: str = os.getenv("API_HOST", "0.0.0.0")
     API_PORT: int = int(os.getenv("API_PORT", "8000"))
     DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
     
+    # Index spatial des garages (recherche du garage le plus proche)
+    # Durée de validité de l'index en mémoire avant rechargement depuis la base (0 = jamais)
+    GARAGE_INDEX_TTL_SECONDS: int = int(os.getenv("GARAGE_INDEX_TTL_SECONDS", "300"))
+    # Mode de recherche : "index" (index en mémoire), "bbox" (rectangle SQL sur idx_garages_location)
+    # ou "geohash" (intervalles de préfixes sur garages.geohash)
+    GARAGE_SEARCH_MODE: str = os.getenv("GARAGE_SEARCH_MODE", "index")
+    # Rayon initial de la zone de recherche SQL (bbox/geohash), multiplié à chaque élargissement.
+    # Bornés : un rayon nul ou un facteur <= 1 n'élargirait jamais une zone vide (boucle sans fin)
+    GARAGE_BBOX_INITIAL_RADIUS_KM: float = float(os.getenv("GARAGE_BBOX_INITIAL_RADIUS_KM", "5"))
+    GARAGE_BBOX_GROWTH_FACTOR: float = float(os.getenv("GARAGE_BBOX_GROWTH_FACTOR", "4"))
+    
+    # Cache LRU du garage le plus proche, par position client arrondie (0 = désactivé)
+    NEAREST_CACHE_SIZE: int = int(os.getenv("NEAREST_CACHE_SIZE", "10000"))
+    # Nombre de décimales conservées (3 ≈ 110 m) : les clients d'une même cellule partagent le résultat
+    NEAREST_CACHE_PRECISION: int = int(os.getenv("NEAREST_CACHE_PRECISION", "3"))
+    NEAREST_CACHE_TTL_SECONDS: int = int(os.getenv("NEAREST_CACHE_TTL_SECONDS", "300"))
+    
+    # Attribution des demandes : "nearest" (garage le plus proche) ou "load_aware" (distance + charge)
+    DISPATCH_STRATEGY: str = os.getenv("DISPATCH_STRATEGY", "nearest")
+    # Pénalité en km ajoutée à la distance pour chaque demande ouverte du garage (mode load_aware)
+    DISPATCH_LOAD_PENALTY_KM: float = float(os.getenv("DISPATCH_LOAD_PENALTY_KM", "2"))
+    # Nombre de garages les plus proches comparés en mode load_aware
+    DISPATCH_CANDIDATES: int = int(os.getenv("DISPATCH_CANDIDATES", "10"))
+    # Délai avant resynchronisation des compteurs de charge depuis la base (0 = jamais)
+    GARAGE_LOAD_RESYNC_SECONDS: int = int(os.getenv("GARAGE_LOAD_RESYNC_SECONDS", "60"))
+    
+    # Pool dédié au hachage des mots de passe (bcrypt) : "thread" ou "process"
+    PASSWORD_POOL_MODE: str = os.getenv("PASSWORD_POOL_MODE", "thread")
+    # Nombre de workers du pool (0 = nombre de cœurs)
+    PASSWORD_POOL_WORKERS: int = int(os.getenv("PASSWORD_POOL_WORKERS", "0"))
+    # Coût bcrypt des nouveaux hashes (utilisé tel quel si la calibration est désactivée)
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    # Calibration au démarrage : coût le plus élevé dont un hachage tient dans BCRYPT_TARGET_MS sur un cœur
+    BCRYPT_CALIBRATE: bool = os.getenv("BCRYPT_CALIBRATE", "True").lower() == "true"
+    BCRYPT_TARGET_MS: float = float(os.getenv("BCRYPT_TARGET_MS", "250"))
+    # Coût minimal accepté par la calibration, quelle que soit la machine (BCRYPT_ROUNDS par défaut :
+    # la calibration ne fait que relever le coût)
+    BCRYPT_MIN_ROUNDS: int = int(os.getenv("BCRYPT_MIN_ROUNDS", os.getenv("BCRYPT_ROUNDS", "12")))
+    # Import en masse d'utilisateurs : processus de hachage du script import_utilisateurs.py (0 = nombre de
+    # cœurs ; l'endpoint utilise password_pool), lignes par INSERT/commit
+    IMPORT_HASH_WORKERS: int = int(os.getenv("IMPORT_HASH_WORKERS", "0"))
+    IMPORT_CHUNK_SIZE: int = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+    
+    # Limitation des tentatives de connexion (seaux à jetons par IP et par email, en mémoire)
+    LOGIN_THROTTLE_ENABLED: bool = os.getenv("LOGIN_THROTTLE_ENABLED", "True").lower() == "true"
+    # Tentatives d'affilée autorisées, puis rythme de recharge par minute
+    LOGIN_IP_BURST: int = int(os.getenv("LOGIN_IP_BURST", "20"))
+    LOGIN_IP_PER_MINUTE: float = float(os.getenv("LOGIN_IP_PER_MINUTE", "30"))
+    LOGIN_EMAIL_BURST: int = int(os.getenv("LOGIN_EMAIL_BURST", "5"))
+    LOGIN_EMAIL_PER_MINUTE: float = float(os.getenv("LOGIN_EMAIL_PER_MINUTE", "5"))
+    LOGIN_THROTTLE_SHARDS: int = int(os.getenv("LOGIN_THROTTLE_SHARDS", "16"))
+    # Nombre maximal de clés (IP ou emails) gardées en mémoire par limiteur
+    LOGIN_THROTTLE_MAX_KEYS: int = int(os.getenv("LOGIN_THROTTLE_MAX_KEYS", "100000"))
+    # Lire l'IP du client dans X-Forwarded-For (uniquement derrière un proxy de confiance)
+    LOGIN_THROTTLE_TRUST_PROXY: bool = os.getenv("LOGIN_THROTTLE_TRUST_PROXY", "False").lower() == "true"
+    
+    # Cache des claims JWT vérifiés (taille ou TTL 0 = désactivé), plafonné à l'exp du token
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+    TOKEN_CACHE_TTL_SECONDS: int = int(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+    # Révocation des tokens : délai de lecture des révocations des autres workers, capacité initiale du filtre de Bloom
+    TOKEN_REVOCATION_SYNC_SECONDS: float = float(os.getenv("TOKEN_REVOCATION_SYNC_SECONDS", "5"))
+    TOKEN_REVOCATION_CAPACITY: int = int(os.getenv("TOKEN_REVOCATION_CAPACITY", "100000"))
+    # Cache des utilisateurs authentifiés (get_current_user), taille ou TTL 0 = désactivé
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", "10000"))
+    USER_CACHE_TTL_SECONDS: int = int(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+    # Intervalle de relecture de la version partagée (modifications faites par les autres workers)
+    USER_CACHE_VERSION_CHECK_SECONDS: float = float(os.getenv("USER_CACHE_VERSION_CHECK_SECONDS", "2"))
+    
+    @field_validator("GARAGE_BBOX_INITIAL_RADIUS_KM")
+    @classmethod
+    def _min_bbox_radius(cls, value: float) -> float:
+        return max(0.1, value)
+    
+    @field_validator("GARAGE_BBOX_GROWTH_FACTOR")
+    @classmethod
+    def _min_bbox_growth(cls, value: float) -> float:
+        return max(1.5, value)
+    
     @property
     def database_url(self) -> str:
         """Construit l'URL de connexion à la base de données"""
+        if self.DATABASE_URL:
+            return self.DATABASE_URL
+        
         # Encoder le mot de passe pour les caractères spéciaux dans l'URL
         from urllib.parse import quote_plus
         password_encoded = quote_plus(self.DB_PASSWORD)
         return f"mysql+pymysql://{self.DB_USER}:{password_encoded}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}?charset=utf8mb4"
     
+    @property
+    def worker_connections(self) -> Optional[int]:
+        """Connexions au primaire autorisées par worker, moteurs synchrone et asynchrone confondus"""
+        if self.DB_MAX_CONNECTIONS <= 0:
+            return None
+        return max(2, self.DB_MAX_CONNECTIONS // max(1, self.WEB_CONCURRENCY))
+    
+    @property
+    def async_pool_capacity(self) -> int:
+        """Connexions du moteur asynchrone par worker : DB_ASYNC_POOL_SHARE du budget du worker"""
+        share = min(max(self.DB_ASYNC_POOL_SHARE, 0.0), 1.0)
+        budget = self.worker_connections
+        if budget is None:
+            return max(1, int(self.THREADPOOL_SIZE * share))
+        return min(budget - 1, max(1, int(budget * share)))
+    
+    @property
+    def pool_capacity(self) -> int:
+        """Connexions synchrones par worker (pool_size + max_overflow) : une par thread, dans le reste du budget
+
+        Les réplicas ont le même dimensionnement, compté sur le budget de leur propre serveur.
+        """
+        capacity = self.THREADPOOL_SIZE
+        budget = self.worker_connections
+        if budget is not None:
+            capacity = min(capacity, budget - self.async_pool_capacity)
+        return max(1, capacity)
+    
+    @property
+    def pool_size(self) -> int:
+        """Connexions gardées ouvertes (DB_POOL_SIZE, sinon un quart de la capacité)"""
+        if self.DB_POOL_SIZE is not None:
+            return self.DB_POOL_SIZE
+        return max(1, self.pool_capacity // 4)
+    
+    @property
+    def max_overflow(self) -> int:
+        """Connexions supplémentaires en pointe (DB_MAX_OVERFLOW, sinon le reste de la capacité)"""
+        if self.DB_MAX_OVERFLOW is not None:
+            return self.DB_MAX_OVERFLOW
+        return max(0, self.pool_capacity - self.pool_size)
+    
+    @property
+    def async_pool_size(self) -> int:
+        """Connexions asynchrones gardées ouvertes (un quart de async_pool_capacity)"""
+        return max(1, self.async_pool_capacity // 4)
+    
+    @property
+    def async_max_overflow(self) -> int:
+        return max(0, self.async_pool_capacity - self.async_pool_size)
+    
+    @property
+    def replica_urls(self) -> list:
+        """URLs des réplicas en lecture (DB_REPLICA_URLS)"""
+        return [url.strip() for url in self.DB_REPLICA_URLS.split(",") if url.strip()]
+    
+    @property
+    def async_database_url(self) -> str:
+        """URL de database_url avec le pilote asynchrone (aiomysql/asyncmy, aiosqlite)"""
+        url = self.database_url
+        if url.startswith("sqlite:"):
+            return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+        if url.startswith("mysql"):
+            return f"mysql+{self.DB_ASYNC_DRIVER}:" + url.split(":", 1)[1]
+        return url
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
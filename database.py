@@ -1,27 +1,88 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.exc import OperationalError, SQLAlchemyError
 from config import settings
+from replicas import ReplicaPool, ReadYourWrites, RoutingSession, client_key
+from pool_metrics import TimedQueuePool, TimedAsyncAdaptedQueuePool, monitor_engine
+import asyncio
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-# Création du moteur de base de données avec meilleure gestion des erreurs
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,  # Vérifie la connexion avant utilisation
-    pool_recycle=300,     # Recycle les connexions après 5 minutes
-    pool_size=5,          # Nombre de connexions dans le pool
-    max_overflow=10,      # Nombre maximum de connexions supplémentaires
-    echo=settings.DEBUG,
-    connect_args={
+
+def _connect_args(url: str) -> dict:
+    """Options du pilote : MySQL en production, SQLite possible en local (DATABASE_URL)"""
+    if url.startswith("sqlite"):
+        return {"check_same_thread": False}
+    return {
         "connect_timeout": 10,  # Timeout de connexion de 10 secondes
         "charset": "utf8mb4"
     }
-)
+
+
+def _create_engine(url: str, name: str):
+    """Moteur synchrone (primaire ou réplica) avec meilleure gestion des erreurs
+
+    Le pool est mesuré (attente, connexions empruntées, âge) : GET /metrics/db-pool.
+    """
+    new_engine = create_engine(
+        url,
+        poolclass=TimedQueuePool,
+        # Taille dérivée des workers et du threadpool (config.Settings.pool_size / max_overflow)
+        pool_size=settings.pool_size,
+        max_overflow=settings.max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        echo=settings.DEBUG,
+        connect_args=_connect_args(url)
+    )
+    monitor_engine(new_engine, name, settings.DB_POOL_WAIT_WARNING_MS)
+    return new_engine
+
+
+# Création du moteur de base de données (primaire : toutes les écritures)
+engine = _create_engine(settings.database_url, "primary")
 
 # Session locale
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Réplicas en lecture (DB_REPLICA_URLS, optionnels) et sessions des routes de lecture (get_read_db)
+replica_pool = ReplicaPool(
+    [_create_engine(url, f"replica{index + 1}") for index, url in enumerate(settings.replica_urls)],
+    health_check_seconds=settings.DB_REPLICA_HEALTH_CHECK_SECONDS
+)
+read_your_writes = ReadYourWrites(window_seconds=settings.DB_READ_YOUR_WRITES_SECONDS)
+ReadSessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, bind=engine,
+    info={"replicas": replica_pool}
+)
+
+# Moteur asynchrone (aiomysql/asyncmy, aiosqlite en local) pour les routes AsyncSession :
+# une requête en attente de la base ne bloque pas de thread du threadpool
+try:
+    async_engine = create_async_engine(
+        settings.async_database_url,
+        poolclass=TimedAsyncAdaptedQueuePool,
+        # Part asynchrone du budget du worker (DB_ASYNC_POOL_SHARE), le reste va au moteur synchrone
+        pool_size=settings.async_pool_size,
+        max_overflow=settings.async_max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        echo=settings.DEBUG,
+        connect_args={} if settings.database_url.startswith("sqlite") else _connect_args(settings.database_url)
+    )
+    monitor_engine(async_engine.sync_engine, "async", settings.DB_POOL_WAIT_WARNING_MS)
+    # expire_on_commit=False : les objets restent lisibles après commit (pas de chargement implicite en async)
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+except ImportError as e:
+    async_engine = None
+    AsyncSessionLocal = None
+    print(f"⚠️  Pilote asynchrone indisponible ({e}) : installer {settings.DB_ASYNC_DRIVER} / aiosqlite (requirements.txt)")
+
 # Base pour les modèles
 Base = declarative_base()
 
@@ -42,7 +103,7 @@ def test_connection(max_retries=3, retry_delay=2):
                 time.sleep(retry_delay)
             else:
                 print(f"❌ Impossible de se connecter à la base de données après {max_retries} tentatives")
-                print(f"   URL: {settings.database_url.replace(settings.DB_PASSWORD, '***')}")
+                print(f"   URL: {settings.database_url.replace(settings.DB_PASSWORD, '***') if settings.DB_PASSWORD else settings.database_url}")
                 return False
         except Exception as e:
             print(f"❌ Erreur inattendue lors de la connexion: {e}")
@@ -50,16 +111,92 @@ def test_connection(max_retries=3, retry_delay=2):
     return False
 
 
-# Tester la connexion au démarrage
-print("🔄 Test de connexion à la base de données...")
-if not test_connection():
-    print("⚠️  L'API démarrera mais la connexion à la base de données pourrait échouer")
-    print("   Vérifiez les variables d'environnement dans Dokploy")
+def warm_up_pool(target_engine, count: int) -> int:
+    """Ouvre `count` connexions en parallèle et les rend au pool ; retourne le nombre ouvert
+
+    Les premières requêtes après un déploiement trouvent ainsi des connexions prêtes au
+    lieu de payer chacune la connexion TCP/TLS et l'authentification.
+    """
+    def open_connection():
+        try:
+            return target_engine.connect()
+        except Exception as e:
+            print(f"⚠️  Préchauffage du pool : connexion impossible ({e})")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, count), thread_name_prefix="pool-warmup") as executor:
+        connections = [c for c in executor.map(lambda _: open_connection(), range(count)) if c is not None]
+    for connection in connections:
+        connection.close()
+    return len(connections)
+
+
+async def warm_up_async_pool(count: int) -> int:
+    """Équivalent de warm_up_pool pour le moteur asynchrone"""
+    if async_engine is None:
+        return 0
+
+    async def open_connection():
+        try:
+            return await async_engine.connect()
+        except Exception as e:
+            print(f"⚠️  Préchauffage du pool asynchrone : connexion impossible ({e})")
+            return None
+
+    connections = [c for c in await asyncio.gather(*[open_connection() for _ in range(count)]) if c is not None]
+    for connection in connections:
+        await connection.close()
+    return len(connections)
+
+
+# Pas de test de connexion à l'import : l'import reste instantané et sans accès réseau
+# (tests, outils, scripts). L'API teste la connexion et le schéma dans sa phase de
+# démarrage (main.lifespan, DB_STARTUP_MODE).
+
+
+def ensure_schema(create: bool = True) -> list:
+    """Vérifie que les tables des modèles existent (une requête) et crée les manquantes si `create`
 
+    Remplace Base.metadata.create_all, qui interroge la base table par table.
+    Retourne les noms des tables manquantes (créées si `create`).
+    """
+    existing = set(inspect(engine).get_table_names())
+    missing = [table for table in Base.metadata.sorted_tables if table.name not in existing]
+    if missing and create:
+        Base.metadata.create_all(bind=engine, tables=missing)
+    return [table.name for table in missing]
 
-def get_db():
+
+@event.listens_for(SessionLocal, "after_commit")
+def _mark_committed(session):
+    session.info["committed"] = True
+
+
+def get_db(request: Request):
     """Dépendance pour obtenir une session de base de données"""
     db = SessionLocal()
+    try:
+        yield db
+    except SQLAlchemyError as e:
+        print(f"❌ Erreur SQLAlchemy: {e}")
+        db.rollback()
+        raise
+    finally:
+        # Le client vient d'écrire : ses prochaines lectures (get_read_db) restent sur le primaire
+        if replica_pool.engines and db.info.get("committed"):
+            key = client_key(request)
+            if key:
+                read_your_writes.record(key)
+        db.close()
+
+
+def get_read_db(request: Request):
+    """Dépendance des routes en lecture seule : SELECT sur un réplica s'il y en a (voir replicas.py)"""
+    db = ReadSessionLocal()
+    if replica_pool.engines:
+        key = client_key(request)
+        if key and read_your_writes.is_recent(key):
+            db.info["primary"] = True
     try:
         yield db
     except SQLAlchemyError as e:
@@ -69,3 +206,15 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db():
+    """Dépendance pour obtenir une session asynchrone (routes async def)"""
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Moteur asynchrone indisponible : pilote asynchrone non installé")
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except SQLAlchemyError as e:
+            print(f"❌ Erreur SQLAlchemy: {e}")
+            await db.rollback()
+            raise
@@ -0,0 +1,17 @@
+"""
+Normalisation des emails (utilisateurs, clients, garages)
+
+L'identité d'une personne est rapprochée par email entre les tables utilisateurs,
+clients et garages. Chaque table porte une colonne indexée email_normalise (email en
+minuscules, sans espaces autour) maintenue par l'ORM : les rapprochements ne dépendent
+plus de la casse saisie et passent par un index au lieu d'un parcours de table.
+"""
+from typing import Optional
+
+
+def normalize_email(email) -> Optional[str]:
+    """Email en minuscules sans espaces autour, ou None s'il est vide"""
+    if email is None:
+        return None
+    normalized = str(email).strip().lower()
+    return normalized or None
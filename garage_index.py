@@ -0,0 +1,292 @@
+"""
+Index spatial en mémoire des garages actifs
+
+Les garages sont projetés sur la sphère unité (x, y, z) et rangés dans un k-d tree :
+la distance euclidienne (corde) entre deux points de la sphère est une fonction
+croissante de la distance de Haversine, donc le plus proche voisin au sens de la
+corde est exactement le garage le plus proche au sens de Haversine.
+L'arbre est construit avec NumPy et garde les coordonnées dans des `CoordinateArrays`
+(ordre des feuilles) pour les calculs en masse ; les feuilles, petites, sont
+parcourues en Python pur, plus rapide que NumPy pour une seule recherche.
+L'index est construit paresseusement à la première recherche, puis mis à jour
+par les routes de création/modification des garages.
+"""
+import heapq
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from config import settings
+from geo_distance import EARTH_RADIUS_KM, CoordinateArrays
+from models import Garage, StatutGarageEnum
+
+# Nombre maximum de garages dans une feuille du k-d tree
+LEAF_SIZE = 16
+
+# Au-delà de ce nombre de garages, les recherches en masse passent par l'arbre
+# plutôt que par la matrice de distances complète (clients x garages)
+VECTORIZED_MAX_GARAGES = 2000
+
+
+def _to_unit_vector(latitude: float, longitude: float) -> Tuple[float, float, float]:
+    """Convertit une position (degrés) en vecteur de la sphère unité"""
+    lat_rad = math.radians(latitude)
+    lon_rad = math.radians(longitude)
+    cos_lat = math.cos(lat_rad)
+    return (cos_lat * math.cos(lon_rad), cos_lat * math.sin(lon_rad), math.sin(lat_rad))
+
+
+def _chord_sq_to_km(chord_sq: float) -> float:
+    """Convertit une corde (au carré) de la sphère unité en distance en kilomètres"""
+    half_chord = min(1.0, math.sqrt(chord_sq) / 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(half_chord)
+
+
+def _km_to_chord_sq(distance_km: float) -> float:
+    """Convertit une distance en kilomètres en corde (au carré) de la sphère unité"""
+    angle = distance_km / EARTH_RADIUS_KM
+    if angle >= math.pi:
+        return float('inf')
+    chord = 2 * math.sin(angle / 2)
+    return chord * chord
+
+
+def _parse_position(latitude, longitude) -> Optional[Tuple[float, float]]:
+    """Retourne (lat, lon) en float, ou None si les coordonnées sont absentes ou invalides"""
+    if latitude is None or longitude is None:
+        return None
+    try:
+        lat = float(latitude)
+        lon = float(longitude)
+    except (ValueError, TypeError):
+        return None
+    if math.isnan(lat) or math.isnan(lon):
+        return None
+    return (lat, lon)
+
+
+class _KDTree:
+    """k-d tree immuable sur les vecteurs unitaires des garages"""
+
+    def __init__(self, positions: Dict[int, Tuple[float, float]]):
+        # Trier par ID pour que les égalités de distance soient départagées comme en base
+        garage_ids = sorted(positions)
+        arrays = CoordinateArrays(
+            garage_ids,
+            (positions[garage_id][0] for garage_id in garage_ids),
+            (positions[garage_id][1] for garage_id in garage_ids)
+        )
+        xyz = np.column_stack((
+            arrays.cos_lat * np.cos(arrays.lon_rad),
+            arrays.cos_lat * np.sin(arrays.lon_rad),
+            np.sin(arrays.lat_rad)
+        ))
+
+        self._order: List[np.ndarray] = []
+        self._size = 0
+        self.root = self._build(xyz, np.arange(len(garage_ids))) if garage_ids else None
+        # Les feuilles deviennent des tranches contiguës des tableaux de coordonnées
+        order = np.concatenate(self._order) if self._order else np.arange(0)
+        del self._order
+        self.arrays = arrays.take(order)
+        # Ordre des IDs pour les passes vectorisées : argmin retient alors l'ID le plus petit
+        self.arrays_by_id = arrays
+        self.ids: List[int] = self.arrays.ids.tolist()
+        self.coords: List[Tuple[float, float, float]] = [tuple(point) for point in xyz[order].tolist()]
+
+    def _build(self, xyz: np.ndarray, indices: np.ndarray):
+        if len(indices) <= LEAF_SIZE:
+            start = self._size
+            self._order.append(indices)
+            self._size += len(indices)
+            return (-1, 0.0, None, None, start, self._size)
+
+        # Couper selon l'axe de plus grande étendue (tri stable pour conserver l'ordre des IDs)
+        points = xyz[indices]
+        axis = int(np.argmax(points.max(axis=0) - points.min(axis=0)))
+        order = np.argsort(points[:, axis], kind="stable")
+        middle = len(indices) // 2
+        split = float(points[order[middle], axis])
+        left = self._build(xyz, indices[order[:middle]])
+        right = self._build(xyz, indices[order[middle:]])
+        return (axis, split, left, right, 0, 0)
+
+    def search(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int,
+        max_distance_km: float
+    ) -> List[Tuple[float, int]]:
+        """Retourne les k plus proches voisins sous forme de (distance_km, garage_id) triés"""
+        # Tas max des k meilleurs candidats : (-corde², -id) pour garder le pire en tête
+        heap: List[Tuple[float, int]] = []
+        query = _to_unit_vector(latitude, longitude)
+        qx, qy, qz = query
+        max_chord_sq = _km_to_chord_sq(max_distance_km)
+        ids = self.ids
+        coords = self.coords
+
+        def visit(node):
+            axis, split, left, right, start, end = node
+            if axis < 0:
+                for i in range(start, end):
+                    x, y, z = coords[i]
+                    d2 = (x - qx) ** 2 + (y - qy) ** 2 + (z - qz) ** 2
+                    if d2 > max_chord_sq:
+                        continue
+                    candidate = (-d2, -ids[i])
+                    if len(heap) < k:
+                        heapq.heappush(heap, candidate)
+                    elif candidate > heap[0]:
+                        heapq.heapreplace(heap, candidate)
+                return
+
+            diff = query[axis] - split
+            near, far = (left, right) if diff < 0 else (right, left)
+            visit(near)
+            # L'écart sur un axe minore la corde vers tout point situé de l'autre côté
+            diff_sq = diff * diff
+            if diff_sq <= max_chord_sq and (len(heap) < k or diff_sq <= -heap[0][0]):
+                visit(far)
+
+        if self.root is not None:
+            visit(self.root)
+        return sorted((_chord_sq_to_km(-neg_d2), -neg_id) for neg_d2, neg_id in heap)
+
+
+class GarageSpatialIndex:
+    """Index des garages actifs géolocalisés, partagé par les requêtes d'un worker"""
+
+    def __init__(self, ttl_seconds: int = 300):
+        # Au-delà de ce délai, l'index est rechargé depuis la base (modifications faites par d'autres workers)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._positions: Optional[Dict[int, Tuple[float, float]]] = None
+        self._tree: Optional[_KDTree] = None
+        self._loaded_at = 0.0
+
+    def __len__(self) -> int:
+        positions = self._positions
+        return len(positions) if positions else 0
+
+    def is_loaded(self) -> bool:
+        """Indique si l'index est chargé et encore frais"""
+        if self._positions is None:
+            return False
+        return self.ttl_seconds <= 0 or time.monotonic() - self._loaded_at < self.ttl_seconds
+
+    def ensure_loaded(self, db: Session) -> None:
+        """Charge l'index depuis la base s'il est vide ou expiré"""
+        if not self.is_loaded():
+            self.reload(db)
+
+    def reload(self, db: Session) -> None:
+        """Recharge les positions des garages actifs (uniquement id, latitude, longitude)"""
+        rows = db.query(Garage.id, Garage.latitude, Garage.longitude).filter(
+            Garage.latitude.isnot(None),
+            Garage.longitude.isnot(None),
+            Garage.statut == StatutGarageEnum.actif
+        ).all()
+
+        positions = {}
+        for garage_id, latitude, longitude in rows:
+            position = _parse_position(latitude, longitude)
+            if position is not None:
+                positions[garage_id] = position
+
+        with self._lock:
+            self._positions = positions
+            self._tree = None
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        """Vide l'index : il sera rechargé à la prochaine recherche"""
+        with self._lock:
+            self._positions = None
+            self._tree = None
+
+    def upsert(self, garage_id: int, latitude, longitude, actif: bool) -> bool:
+        """Ajoute, déplace ou retire un garage de l'index
+
+        Retourne True si l'index était déjà à jour pour ce garage.
+        """
+        position = _parse_position(latitude, longitude) if actif else None
+        with self._lock:
+            if self._positions is None:
+                # Index pas encore chargé : il lira l'état à jour depuis la base
+                return True
+            if self._positions.get(garage_id) == position:
+                return True
+            if position is None:
+                self._positions.pop(garage_id, None)
+            else:
+                self._positions[garage_id] = position
+            self._tree = None
+            return False
+
+    def sync_garage(self, garage: Garage) -> bool:
+        """Met l'index en cohérence avec un garage lu en base"""
+        return self.upsert(
+            garage.id,
+            garage.latitude,
+            garage.longitude,
+            garage.statut == StatutGarageEnum.actif
+        )
+
+    def remove(self, garage_id: int) -> None:
+        """Retire un garage de l'index"""
+        self.upsert(garage_id, None, None, False)
+
+    def _get_tree(self) -> Optional[_KDTree]:
+        tree = self._tree
+        if tree is not None:
+            return tree
+        with self._lock:
+            if self._tree is None and self._positions is not None:
+                self._tree = _KDTree(self._positions)
+            return self._tree
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int = 1,
+        max_distance_km: Optional[float] = None
+    ) -> List[Tuple[float, int]]:
+        """Retourne les k garages les plus proches sous forme de (distance_km, garage_id) triés"""
+        tree = self._get_tree()
+        if tree is None or k <= 0:
+            return []
+        if max_distance_km is None:
+            max_distance_km = float('inf')
+        return tree.search(latitude, longitude, k, max_distance_km)
+
+    def nearest_many(self, latitudes, longitudes) -> Tuple[np.ndarray, np.ndarray]:
+        """Garage le plus proche (IDs, distances en km) pour plusieurs clients
+
+        Passe vectorisée sur tous les garages quand ils sont peu nombreux, sinon une
+        recherche dans l'arbre par client ; dans les deux cas, une égalité de distance
+        retient l'ID le plus petit. Les clients sans garage retournent l'ID -1
+        et une distance infinie.
+        """
+        tree = self._get_tree()
+        count = len(latitudes)
+        if tree is None or len(tree.arrays) == 0:
+            return np.full(count, -1, dtype=np.int64), np.full(count, np.inf)
+
+        if len(tree.arrays) <= VECTORIZED_MAX_GARAGES:
+            positions, distances = tree.arrays_by_id.nearest_many(latitudes, longitudes)
+            return tree.arrays_by_id.ids[positions], distances
+
+        garage_ids = np.empty(count, dtype=np.int64)
+        distances = np.empty(count, dtype=np.float64)
+        for i, (latitude, longitude) in enumerate(zip(latitudes, longitudes)):
+            distances[i], garage_ids[i] = tree.search(float(latitude), float(longitude), 1, float('inf'))[0]
+        return garage_ids, distances
+
+
+# Index partagé par les routes du worker
+garage_index = GarageSpatialIndex(ttl_seconds=settings.GARAGE_INDEX_TTL_SECONDS)
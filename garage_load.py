@@ -0,0 +1,91 @@
+"""
+Compteurs en mémoire de la charge des garages
+
+La charge d'un garage est le nombre de demandes de prestations ouvertes qui lui sont
+assignées (statuts en_attente, acceptee, en_cours). Les compteurs sont initialisés par
+une seule requête GROUP BY, puis tenus à jour par les routes des demandes à chaque
+création, acceptation, changement de statut ou suppression. Une resynchronisation
+périodique rattrape les modifications faites par les autres workers.
+"""
+import threading
+import time
+from typing import Dict, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from config import settings
+from models import DemandePrestation
+
+# Statuts pour lesquels une demande occupe le garage
+OPEN_STATUTS = ('en_attente', 'acceptee', 'en_cours')
+
+
+class GarageLoadCounters:
+    """Nombre de demandes ouvertes par garage, partagé par les requêtes d'un worker"""
+
+    def __init__(self, resync_seconds: int = 60):
+        self.resync_seconds = resync_seconds
+        self._lock = threading.Lock()
+        self._counts: Optional[Dict[int, int]] = None
+        self._loaded_at = 0.0
+
+    def is_loaded(self) -> bool:
+        """Indique si les compteurs sont chargés et encore frais"""
+        if self._counts is None:
+            return False
+        return self.resync_seconds <= 0 or time.monotonic() - self._loaded_at < self.resync_seconds
+
+    def ensure_loaded(self, db: Session) -> None:
+        """Charge les compteurs depuis la base s'ils sont vides ou à resynchroniser"""
+        if not self.is_loaded():
+            self.reload(db)
+
+    def reload(self, db: Session) -> None:
+        """Recalcule tous les compteurs en une seule requête"""
+        rows = db.query(DemandePrestation.garage_id, func.count(DemandePrestation.id)).filter(
+            DemandePrestation.garage_id.isnot(None),
+            DemandePrestation.statut.in_(OPEN_STATUTS)
+        ).group_by(DemandePrestation.garage_id).all()
+
+        with self._lock:
+            self._counts = {garage_id: count for garage_id, count in rows}
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        """Vide les compteurs : ils seront recalculés au prochain besoin"""
+        with self._lock:
+            self._counts = None
+
+    def get(self, garage_id: int) -> int:
+        """Nombre de demandes ouvertes du garage"""
+        counts = self._counts
+        return counts.get(garage_id, 0) if counts else 0
+
+    def transition(
+        self,
+        old_garage_id: Optional[int],
+        old_statut: Optional[str],
+        new_garage_id: Optional[int],
+        new_statut: Optional[str]
+    ) -> None:
+        """Répercute le changement d'une demande (None/None pour une création ou une suppression)"""
+        was_open = old_garage_id is not None and old_statut in OPEN_STATUTS
+        is_open = new_garage_id is not None and new_statut in OPEN_STATUTS
+        if was_open and is_open and old_garage_id == new_garage_id:
+            return
+
+        with self._lock:
+            if self._counts is None:
+                # Pas encore chargés : ils seront lus à jour depuis la base
+                return
+            if was_open:
+                remaining = self._counts.get(old_garage_id, 0) - 1
+                if remaining > 0:
+                    self._counts[old_garage_id] = remaining
+                else:
+                    self._counts.pop(old_garage_id, None)
+            if is_open:
+                self._counts[new_garage_id] = self._counts.get(new_garage_id, 0) + 1
+
+
+# Compteurs partagés par les routes du worker
+garage_load = GarageLoadCounters(resync_seconds=settings.GARAGE_LOAD_RESYNC_SECONDS)
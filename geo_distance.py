@@ -0,0 +1,147 @@
+"""
+Calcul des distances géographiques (formule de Haversine)
+
+`calculate_distance` traite un couple de points ; `CoordinateArrays` garde les
+coordonnées des garages dans des tableaux NumPy float64 contigus (radians
+précalculés) pour calculer en une seule passe vectorisée les distances d'un
+client vers tous les garages, ou de plusieurs clients vers plusieurs garages.
+"""
+import math
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+
+# Rayon de la Terre en kilomètres
+EARTH_RADIUS_KM = 6371.0
+
+# Demi-circonférence terrestre : aucune distance ne la dépasse
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+
+# Nombre maximum de distances calculées par bloc dans les calculs plusieurs-vers-plusieurs
+# (borne la mémoire de la matrice intermédiaire : 1 million de float64 = 8 Mo)
+PAIRWISE_MAX_ELEMENTS = 1_000_000
+
+
+def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Calcule la distance en kilomètres entre deux points géographiques (formule de Haversine)"""
+    # Rayon de la Terre en kilomètres
+    R = EARTH_RADIUS_KM
+
+    # Convertir en radians
+    lat1_rad = math.radians(lat1)
+    lon1_rad = math.radians(lon1)
+    lat2_rad = math.radians(lat2)
+    lon2_rad = math.radians(lon2)
+
+    # Différences
+    dlat = lat2_rad - lat1_rad
+    dlon = lon2_rad - lon1_rad
+
+    # Formule de Haversine
+    a = math.sin(dlat / 2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+    distance = R * c
+    return distance
+
+
+def bounding_box(
+    latitude: float,
+    longitude: float,
+    radius_km: float
+) -> Tuple[float, float, List[Tuple[float, float]]]:
+    """Rectangle (lat_min, lat_max, plages de longitudes) contenant tous les points à moins de radius_km
+
+    Plusieurs plages de longitudes sont retournées quand le rectangle traverse l'antiméridien.
+    """
+    angle = math.degrees(radius_km / EARTH_RADIUS_KM)
+    lat_min = latitude - angle
+    lat_max = latitude + angle
+    if angle >= 180 or lat_min <= -90 or lat_max >= 90:
+        # Le cercle contient un pôle : toutes les longitudes sont concernées
+        return max(lat_min, -90.0), min(lat_max, 90.0), [(-180.0, 180.0)]
+
+    delta_lon = math.degrees(math.asin(
+        min(1.0, math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(latitude)))
+    ))
+    lon_min = longitude - delta_lon
+    lon_max = longitude + delta_lon
+    if lon_min < -180:
+        return lat_min, lat_max, [(lon_min + 360, 180.0), (-180.0, lon_max)]
+    if lon_max > 180:
+        return lat_min, lat_max, [(lon_min, 180.0), (-180.0, lon_max - 360)]
+    return lat_min, lat_max, [(lon_min, lon_max)]
+
+
+def _haversine(lat1_rad, lon1_rad, cos_lat1, lat2_rad, lon2_rad, cos_lat2) -> np.ndarray:
+    """Haversine vectorisée sur des tableaux (ou scalaires) déjà convertis en radians"""
+    sin_dlat = np.sin((lat2_rad - lat1_rad) / 2)
+    sin_dlon = np.sin((lon2_rad - lon1_rad) / 2)
+    a = sin_dlat * sin_dlat + cos_lat1 * cos_lat2 * sin_dlon * sin_dlon
+    # Les erreurs d'arrondi peuvent donner a légèrement hors de [0, 1]
+    np.clip(a, 0.0, 1.0, out=a)
+    return 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+class CoordinateArrays:
+    """Coordonnées d'un ensemble de garages en tableaux float64 contigus"""
+
+    def __init__(self, ids: Iterable[int], latitudes: Iterable[float], longitudes: Iterable[float]):
+        self.ids = np.ascontiguousarray(np.fromiter(ids, dtype=np.int64))
+        self.latitudes = np.ascontiguousarray(np.fromiter(latitudes, dtype=np.float64))
+        self.longitudes = np.ascontiguousarray(np.fromiter(longitudes, dtype=np.float64))
+        self.lat_rad = np.radians(self.latitudes)
+        self.lon_rad = np.radians(self.longitudes)
+        self.cos_lat = np.cos(self.lat_rad)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def take(self, order: np.ndarray) -> "CoordinateArrays":
+        """Retourne une copie réordonnée (tableaux toujours contigus)"""
+        subset = CoordinateArrays.__new__(CoordinateArrays)
+        for name in ("ids", "latitudes", "longitudes", "lat_rad", "lon_rad", "cos_lat"):
+            setattr(subset, name, np.ascontiguousarray(getattr(self, name)[order]))
+        return subset
+
+    def distances_from(
+        self,
+        latitude: float,
+        longitude: float,
+        start: int = 0,
+        end: Optional[int] = None
+    ) -> np.ndarray:
+        """Distances (km) d'un point vers les garages [start:end] en une passe vectorisée"""
+        lat_rad = math.radians(latitude)
+        return _haversine(
+            lat_rad, math.radians(longitude), math.cos(lat_rad),
+            self.lat_rad[start:end], self.lon_rad[start:end], self.cos_lat[start:end]
+        )
+
+    def distance_matrix(self, latitudes, longitudes) -> np.ndarray:
+        """Matrice (clients x garages) des distances en kilomètres"""
+        lat_rad = np.radians(np.asarray(latitudes, dtype=np.float64))[:, np.newaxis]
+        lon_rad = np.radians(np.asarray(longitudes, dtype=np.float64))[:, np.newaxis]
+        return _haversine(lat_rad, lon_rad, np.cos(lat_rad), self.lat_rad, self.lon_rad, self.cos_lat)
+
+    def nearest_many(self, latitudes, longitudes) -> Tuple[np.ndarray, np.ndarray]:
+        """Pour chaque client, position du garage le plus proche et distance en kilomètres
+
+        En cas d'égalité, le premier garage dans l'ordre des tableaux est retenu.
+        """
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        positions = np.empty(len(latitudes), dtype=np.int64)
+        distances = np.empty(len(latitudes), dtype=np.float64)
+        if len(self) == 0:
+            positions.fill(-1)
+            distances.fill(np.inf)
+            return positions, distances
+
+        chunk_size = max(1, PAIRWISE_MAX_ELEMENTS // len(self))
+        for start in range(0, len(latitudes), chunk_size):
+            end = start + chunk_size
+            matrix = self.distance_matrix(latitudes[start:end], longitudes[start:end])
+            best = np.argmin(matrix, axis=1)
+            positions[start:end] = best
+            distances[start:end] = matrix[np.arange(len(best)), best]
+        return positions, distances
@@ -0,0 +1,142 @@
+"""
+Encodage geohash des positions (garages, demandes de prestations)
+
+Un geohash découpe le globe en cellules désignées par une chaîne base32 : deux points
+proches partagent un même préfixe, ce qui transforme une recherche de proximité en
+quelques balayages d'intervalle sur une colonne indexée (geohash >= préfixe AND
+geohash < préfixe + '{'), aussi bien sous MySQL que sous SQLite.
+"""
+import math
+from typing import List, Optional, Tuple
+from sqlalchemy import and_, or_, true
+from geo_distance import bounding_box
+
+# Alphabet base32 du geohash (sans a, i, l, o)
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Précision stockée en base (cellules d'environ 4 cm x 2 cm)
+GEOHASH_PRECISION = 12
+
+# Caractère suivant 'z' : borne haute exclusive d'un intervalle de préfixe
+_PREFIX_END = "{"
+
+
+def encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Encode une position en geohash de la précision demandée"""
+    lat_min, lat_max = -90.0, 90.0
+    lon_min, lon_max = -180.0, 180.0
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            middle = (lon_min + lon_max) / 2
+            if longitude >= middle:
+                value = (value << 1) | 1
+                lon_min = middle
+            else:
+                value <<= 1
+                lon_max = middle
+        else:
+            middle = (lat_min + lat_max) / 2
+            if latitude >= middle:
+                value = (value << 1) | 1
+                lat_min = middle
+            else:
+                value <<= 1
+                lat_max = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def encode_position(latitude, longitude, precision: int = GEOHASH_PRECISION) -> Optional[str]:
+    """Geohash d'une position lue en base (Decimal, None...), ou None si elle est absente ou invalide"""
+    if latitude is None or longitude is None:
+        return None
+    try:
+        lat = float(latitude)
+        lon = float(longitude)
+    except (ValueError, TypeError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return encode(lat, lon, precision)
+
+
+def decode_bbox(geohash: str) -> Tuple[float, float, float, float]:
+    """Retourne le rectangle (lat_min, lat_max, lon_min, lon_max) d'une cellule"""
+    lat_min, lat_max = -90.0, 90.0
+    lon_min, lon_max = -180.0, 180.0
+    even = True
+    for char in geohash:
+        value = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                middle = (lon_min + lon_max) / 2
+                if bit:
+                    lon_min = middle
+                else:
+                    lon_max = middle
+            else:
+                middle = (lat_min + lat_max) / 2
+                if bit:
+                    lat_min = middle
+                else:
+                    lat_max = middle
+            even = not even
+    return lat_min, lat_max, lon_min, lon_max
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """Dimensions (hauteur en degrés de latitude, largeur en degrés de longitude) d'une cellule"""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = (5 * precision) // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+
+def covering_prefixes(latitude: float, longitude: float, radius_km: float) -> List[str]:
+    """Préfixes geohash dont les cellules recouvrent tout le cercle de rayon radius_km
+
+    La précision est choisie pour que le cercle tienne dans au plus 3 x 3 cellules.
+    Retourne [""] (aucun filtre) quand le cercle est trop grand ou contient un pôle.
+    """
+    lat_min, lat_max, lon_ranges = bounding_box(latitude, longitude, radius_km)
+    lat_span = lat_max - lat_min
+    lon_span = max(lon_max - lon_min for lon_min, lon_max in lon_ranges)
+    if lon_ranges == [(-180.0, 180.0)]:
+        return [""]
+
+    precision = 0
+    while precision < GEOHASH_PRECISION:
+        height, width = cell_size(precision + 1)
+        if height < lat_span / 2 or width < lon_span / 2:
+            break
+        precision += 1
+    if precision == 0:
+        return [""]
+
+    height, width = cell_size(precision)
+    prefixes = set()
+    for lon_min, lon_max in lon_ranges:
+        lat_steps = int(math.ceil((lat_max - lat_min) / height)) + 1
+        lon_steps = int(math.ceil((lon_max - lon_min) / width)) + 1
+        for i in range(lat_steps):
+            lat = min(lat_min + i * height, lat_max)
+            for j in range(lon_steps):
+                lon = min(lon_min + j * width, lon_max)
+                prefixes.add(encode(lat, lon, precision))
+    return sorted(prefixes)
+
+
+def prefix_filter(column, prefixes: List[str]):
+    """Condition SQLAlchemy « la colonne commence par l'un des préfixes » sous forme d'intervalles indexables"""
+    if "" in prefixes:
+        return true()
+    return or_(*[and_(column >= prefix, column < prefix + _PREFIX_END) for prefix in prefixes])
@@ -0,0 +1,57 @@
+"""
+Résolution d'une identité par email : utilisateur, client et garage associés
+
+Remplace les recherches séparées (utilisateurs puis clients puis garages par email)
+par une seule requête, dont chaque partie passe par l'index email_normalise de sa table.
+"""
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from emails import normalize_email
+from models_auth import Utilisateur
+
+# Une ligne est toujours retournée (jointure externe sur une table d'une ligne), même
+# sans utilisateur : le client et le garage de l'email sont alors tout de même trouvés.
+# En cas de doublons : l'utilisateur le plus récent, le client et le garage les plus anciens.
+_RESOLVE_SQL = text("""
+    SELECT u.id, u.nom, u.prenom, u.email, u.mot_de_passe, u.role, u.telephone, u.garage_id, u.created_at,
+           (SELECT MIN(c.id) FROM clients c WHERE c.email_normalise = :email) AS client_id,
+           (SELECT MIN(g.id) FROM garages g WHERE g.email_normalise = :email) AS email_garage_id
+    FROM (SELECT 1 AS seed) AS one
+    LEFT JOIN utilisateurs u
+        ON u.id = (SELECT MAX(u2.id) FROM utilisateurs u2 WHERE u2.email_normalise = :email)
+""")
+
+
+@dataclass
+class EmailIdentity:
+    """Résultat de resolve_email"""
+    email: Optional[str]
+    user: Optional[Utilisateur]
+    client_id: Optional[int]
+    # Garage dont l'email est celui-ci (peut différer de user.garage_id avant réconciliation)
+    garage_id: Optional[int]
+
+
+def resolve_email(db: Session, email: str) -> EmailIdentity:
+    """Utilisateur (non attaché à la session), client_id et garage_id d'un email en un aller-retour"""
+    normalized = normalize_email(email)
+    if normalized is None:
+        return EmailIdentity(email=None, user=None, client_id=None, garage_id=None)
+
+    row = db.execute(_RESOLVE_SQL, {"email": normalized}).fetchone()
+    user = None
+    if row[0] is not None:
+        user = Utilisateur(
+            id=row[0],
+            nom=row[1],
+            prenom=row[2],
+            email=row[3],
+            mot_de_passe=row[4],
+            role=row[5] or 'client',  # Valeur par défaut si NULL
+            telephone=row[6],
+            garage_id=row[7],
+            created_at=str(row[8]) if row[8] else None
+        )
+    return EmailIdentity(email=normalized, user=user, client_id=row[9], garage_id=row[10])
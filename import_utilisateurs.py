@@ -0,0 +1,67 @@
+"""
+Script d'import en masse d'utilisateurs depuis un fichier CSV ou NDJSON
+(même traitement que POST /admin/utilisateurs/import, voir user_import.py)
+
+Usage :
+    py import_utilisateurs.py utilisateurs.csv
+    py import_utilisateurs.py utilisateurs.ndjson --workers 8 --chunk-size 500 --report rapport.json
+"""
+import argparse
+import json
+import sys
+import time
+from config import settings
+from database import SessionLocal
+from password_pool import shared_rounds
+from user_import import IMPORT_FORMATS, detect_format, read_rows, import_users
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import en masse d'utilisateurs (CSV ou NDJSON)")
+    parser.add_argument("file", help="Fichier à importer (colonnes nom_complet, email, password, role, telephone)")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="Par défaut d'après l'extension du fichier")
+    parser.add_argument("--workers", type=int, default=settings.IMPORT_HASH_WORKERS, help="Processus de hachage (0 = nombre de cœurs)")
+    parser.add_argument("--chunk-size", type=int, default=settings.IMPORT_CHUNK_SIZE, help="Lignes par INSERT et par commit")
+    parser.add_argument("--rounds", type=int, help="Coût bcrypt (par défaut celui de l'API, partagé si BCRYPT_CALIBRATE)")
+    parser.add_argument("--report", help="Fichier JSON où écrire le rapport ligne par ligne")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    rounds = args.rounds
+    if rounds is None:
+        # Coût partagé par les workers de l'API s'il a été calibré, sinon BCRYPT_ROUNDS
+        rounds = settings.BCRYPT_ROUNDS
+        if settings.BCRYPT_CALIBRATE:
+            rounds = shared_rounds(db) or rounds
+
+    with open(args.file, encoding="utf-8-sig") as f:
+        content = f.read()
+    rows = read_rows(content, args.format or detect_format(args.file, content))
+    print(f"📥 {len(rows)} ligne(s) à importer (coût bcrypt {rounds})")
+
+    try:
+        start = time.perf_counter()
+        report = import_users(db, rows, rounds, args.workers, args.chunk_size)
+        elapsed = time.perf_counter() - start
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Erreur: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        db.close()
+
+    for row in report["rows"]:
+        if row["status"] != "created":
+            print(f"   ligne {row['line']} ({row['email'] or '-'}) : {row['status']} - {row['detail']}")
+    print(f"✅ {report['created']} créé(s), {report['skipped']} ignoré(s), {report['errors']} en erreur en {elapsed:.1f} s")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📝 Rapport écrit dans {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Limitation en mémoire des tentatives de connexion (/auth/login)
+
+Chaque tentative, même ratée, coûte une vérification bcrypt complète : une rafale de
+credential stuffing suffit à saturer le CPU de l'API. Les tentatives sont limitées par
+des seaux à jetons, par email et par adresse IP, vérifiés avant toute requête en base
+et tout calcul de hash : une tentative refusée ne coûte que quelques microsecondes.
+
+Les seaux sont répartis en shards (un verrou chacun) pour limiter la contention entre
+threads. Chaque shard garde ses clés dans l'ordre du dernier accès : les seaux inactifs
+(donc pleins à nouveau) sont retirés au fil de l'eau, et le nombre de clés est borné.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from config import settings
+
+
+class TokenBucketLimiter:
+    """Seaux à jetons par clé : `burst` tentatives d'affilée, puis `per_minute` par minute"""
+
+    def __init__(self, burst: int, per_minute: float, shards: int = 16, max_keys: int = 100000):
+        self.burst = burst
+        self.rate = per_minute / 60.0
+        self.max_keys_per_shard = max(1, max_keys // shards)
+        # Au-delà de ce délai sans tentative, le seau est plein : l'oublier ne change rien
+        self.idle_seconds = burst / self.rate if self.rate > 0 else float('inf')
+        self._shards = [(threading.Lock(), OrderedDict()) for _ in range(shards)]
+        # Refus comptés par shard, sous le verrou du shard (sommés dans `rejected`)
+        self._rejected = [0] * shards
+
+    def acquire(self, key: str) -> Tuple[bool, float]:
+        """Consomme un jeton pour cette clé ; retourne (autorisé, secondes avant le prochain jeton)"""
+        index = hash(key) % len(self._shards)
+        lock, buckets = self._shards[index]
+        now = time.monotonic()
+        with lock:
+            # Retirer les seaux inactifs (les plus anciens sont en tête)
+            while buckets:
+                oldest_key, (_, last) = next(iter(buckets.items()))
+                if now - last < self.idle_seconds and len(buckets) < self.max_keys_per_shard:
+                    break
+                del buckets[oldest_key]
+
+            tokens, last = buckets.pop(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            else:
+                self._rejected[index] += 1
+            buckets[key] = (tokens, now)
+
+        if allowed:
+            return True, 0.0
+        retry_after = (1.0 - tokens) / self.rate if self.rate > 0 else float('inf')
+        return False, retry_after
+
+    @property
+    def rejected(self) -> int:
+        return sum(self._rejected)
+
+    def size(self) -> int:
+        return sum(len(buckets) for _, buckets in self._shards)
+
+
+class LoginThrottle:
+    """Limiteurs par adresse IP et par email pour /auth/login"""
+
+    def __init__(self, enabled: bool, ip_limiter: TokenBucketLimiter, email_limiter: TokenBucketLimiter):
+        self.enabled = enabled
+        self.ip_limiter = ip_limiter
+        self.email_limiter = email_limiter
+
+    def check(self, ip: Optional[str], email: Optional[str]) -> Optional[int]:
+        """None si la tentative est autorisée, sinon le délai d'attente (Retry-After, en secondes)"""
+        if not self.enabled:
+            return None
+        if ip:
+            allowed, retry_after = self.ip_limiter.acquire(ip)
+            if not allowed:
+                return max(1, math.ceil(retry_after))
+        if email:
+            allowed, retry_after = self.email_limiter.acquire(email)
+            if not allowed:
+                return max(1, math.ceil(retry_after))
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "ip_keys": self.ip_limiter.size(),
+            "email_keys": self.email_limiter.size(),
+            "ip_rejected": self.ip_limiter.rejected,
+            "email_rejected": self.email_limiter.rejected
+        }
+
+
+def client_ip(request) -> Optional[str]:
+    """Adresse IP du client (premier X-Forwarded-For si l'API est derrière un proxy de confiance)"""
+    if settings.LOGIN_THROTTLE_TRUST_PROXY:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else None
+
+
+# Limiteur partagé par les requêtes du worker
+login_throttle = LoginThrottle(
+    enabled=settings.LOGIN_THROTTLE_ENABLED,
+    ip_limiter=TokenBucketLimiter(
+        burst=settings.LOGIN_IP_BURST,
+        per_minute=settings.LOGIN_IP_PER_MINUTE,
+        shards=settings.LOGIN_THROTTLE_SHARDS,
+        max_keys=settings.LOGIN_THROTTLE_MAX_KEYS
+    ),
+    email_limiter=TokenBucketLimiter(
+        burst=settings.LOGIN_EMAIL_BURST,
+        per_minute=settings.LOGIN_EMAIL_PER_MINUTE,
+        shards=settings.LOGIN_THROTTLE_SHARDS,
+        max_keys=settings.LOGIN_THROTTLE_MAX_KEYS
+    )
+)
@@ -1,8 +1,11 @@
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+import anyio.to_thread
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import text
 from config import settings
-from database import engine, Base
 from routers import (
     clients,
     vehicules,
@@ -14,28 +17,129 @@ from routers import (
     rendez_vous,
     garages,
     demandes_prestations,
-    admin
+    admin,
+    metrics
 )
 from routers import auth
+from password_pool import password_pool, shared_rounds
 
-# Créer les tables si elles n'existent pas
-from database import Base, test_connection
-try:
-    from models_auth import Utilisateur
-    print("🔄 Création/vérification des tables de la base de données...")
-    
-    # Tester la connexion avant de créer les tables
-    if test_connection():
-        Base.metadata.create_all(bind=engine)
-        print("✅ Tables créées/vérifiées avec succès")
-    else:
-        print("⚠️  Impossible de se connecter à la base de données")
-        print("   Les tables ne seront pas créées automatiquement")
+
+def _shared_bcrypt_rounds(calibrated=None):
+    """Lit (ou enregistre, si `calibrated`) le coût bcrypt partagé, dans une session dédiée"""
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        return shared_rounds(db, calibrated)
+    finally:
+        db.close()
+
+
+async def _calibrate_bcrypt():
+    """Coût bcrypt commun aux workers : celui déjà enregistré, sinon calibré ici et enregistré"""
+    try:
+        rounds = await asyncio.to_thread(_shared_bcrypt_rounds)
+        if rounds is None:
+            calibrated = await password_pool.calibrate(settings.BCRYPT_TARGET_MS, settings.BCRYPT_MIN_ROUNDS)
+            rounds = await asyncio.to_thread(_shared_bcrypt_rounds, calibrated)
+            print(f"🔐 Coût bcrypt calibré: {calibrated} (~{password_pool.calibration['estimated_ms']} ms par hachage)")
+        password_pool.rounds = rounds
+        print(f"🔐 Coût bcrypt partagé par les workers: {rounds}")
+    except Exception as e:
+        # Sans la base, pas de calibration locale : chaque worker garderait un coût différent
+        print(f"⚠️  Calibration bcrypt impossible, coût {password_pool.rounds} conservé: {e}")
+
+
+async def _warm_up_pools():
+    from database import engine, replica_pool, warm_up_pool, warm_up_async_pool
+    try:
+        opened = await asyncio.gather(
+            *[asyncio.to_thread(warm_up_pool, target, settings.pool_size) for target in [engine, *replica_pool.engines]],
+            warm_up_async_pool(settings.async_pool_size)
+        )
+        print(f"🔌 Pools de connexions préchauffés: {opened} connexion(s) (pool_size={settings.pool_size}, "
+              f"max_overflow={settings.max_overflow}, asynchrone {settings.async_pool_size}+{settings.async_max_overflow})")
+    except Exception as e:
+        print(f"⚠️  Préchauffage des pools impossible: {e}")
+
+
+async def _check_schema(status: dict):
+    from database import ensure_schema
+    create = settings.DB_SCHEMA_CHECK == "create"
+    try:
+        missing = await asyncio.to_thread(ensure_schema, create)
+        status["missing_tables"] = missing
+        if not missing:
+            print("✅ Tables vérifiées")
+        elif create:
+            print(f"✅ Tables créées: {', '.join(missing)}")
+        else:
+            print(f"⚠️  Tables manquantes (DB_SCHEMA_CHECK=verify): {', '.join(missing)}")
+    except Exception as e:
+        print(f"❌ Erreur lors de la vérification des tables: {e}")
+        print("   Assurez-vous que la base de données est accessible et que les tables existent")
+
+
+async def _prepare_database(status: dict) -> bool:
+    """Test de connexion, puis vérification du schéma et préchauffage des pools en parallèle
+
+    Retourne False si la base est injoignable.
+    """
+    from database import test_connection
+    start = time.perf_counter()
+    print("🔄 Test de connexion à la base de données...")
+    status["database"] = "connecting"
+    if not await asyncio.to_thread(test_connection, settings.DB_STARTUP_RETRIES, settings.DB_STARTUP_RETRY_DELAY):
+        status["database"] = "unavailable"
+        print("⚠️  L'API fonctionne mais la connexion à la base de données pourrait échouer")
         print("   Vérifiez les variables d'environnement dans Dokploy")
-except Exception as e:
-    print(f"❌ Erreur lors de la création des tables: {e}")
-    print("   Assurez-vous que la base de données est accessible et que les tables existent")
-    print("   Vérifiez les logs pour plus de détails")
+        return False
+    steps = []
+    if settings.DB_SCHEMA_CHECK in ("create", "verify"):
+        steps.append(_check_schema(status))
+    if settings.DB_POOL_WARMUP:
+        steps.append(_warm_up_pools())
+    await asyncio.gather(*steps)
+    status["database"] = "ready"
+    status["ready_seconds"] = round(time.perf_counter() - start, 3)
+    return True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Démarrage de l'API : rien n'accède à la base à l'import, tout se fait ici (DB_STARTUP_MODE)
+
+    - threadpool aligné sur la configuration du pool de connexions ;
+    - préparation de la base (_prepare_database), attendue en mode "blocking", en
+      arrière-plan en mode "background", ignorée en mode "skip" ;
+    - une fois la base prête (tables comprises), calibration du coût bcrypt partagé en
+      arrière-plan. Sans base (skip, injoignable), BCRYPT_ROUNDS est gardé.
+    """
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    tasks = []
+
+    async def prepare_database():
+        if await _prepare_database(app.state.startup) and settings.BCRYPT_CALIBRATE:
+            app.state.bcrypt_calibration = asyncio.create_task(_calibrate_bcrypt())
+            tasks.append(app.state.bcrypt_calibration)
+
+    app.state.startup = {"mode": settings.DB_STARTUP_MODE, "database": "skipped"}
+    if settings.DB_STARTUP_MODE != "skip":
+        app.state.database_startup = asyncio.create_task(prepare_database())
+        tasks.append(app.state.database_startup)
+        if settings.DB_STARTUP_MODE == "blocking":
+            await app.state.database_startup
+
+    yield
+
+    # Arrêt : abandonner les tâches de démarrage encore en cours, fermer le moteur asynchrone
+    # (ses connexions appartiennent à la boucle d'événements)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    from database import async_engine
+    if async_engine is not None:
+        await async_engine.dispose()
+
 
 # Créer l'application FastAPI
 app = FastAPI(
@@ -43,7 +147,8 @@ app = FastAPI(
     description="API REST pour la gestion d'un garage automobile",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Configuration CORS
@@ -68,6 +173,7 @@ app.include_router(rendez_vous.router)
 app.include_router(garages.router)
 app.include_router(demandes_prestations.router)
 app.include_router(admin.router)
+app.include_router(metrics.router)
 
 
 @app.get("/")
@@ -82,7 +188,7 @@ def root():
 
 
 @app.get("/health")
-def health_check():
+def health_check(request: Request):
     """Vérification de l'état de l'API et de la base de données"""
     from database import engine
     from config import settings
@@ -97,7 +203,8 @@ def health_check():
             "database": "connected",
             "db_host": settings.DB_HOST,
             "db_name": settings.DB_NAME,
-            "api_version": "1.0.0"
+            "api_version": "1.0.0",
+            "startup": getattr(request.app.state, "startup", None)
         }
     except Exception as e:
         return {
@@ -105,7 +212,8 @@ def health_check():
             "database": "disconnected",
             "error": str(e),
             "db_host": settings.DB_HOST,
-            "db_name": settings.DB_NAME
+            "db_name": settings.DB_NAME,
+            "startup": getattr(request.app.state, "startup", None)
         }
 
 
@@ -1,8 +1,10 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Date, Enum, DECIMAL, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Date, Enum, DECIMAL, ForeignKey, Index, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
 from database import Base
+from geohash import encode_position
+from emails import normalize_email
 
 
 # Enums
@@ -66,6 +68,8 @@ class Client(Base):
     nom = Column(String(100), nullable=False)
     prenom = Column(String(100), nullable=True)
     email = Column(String(150), nullable=True)
+    # Email normalisé (emails.normalize_email) pour le rapprochement avec les utilisateurs
+    email_normalise = Column(String(150), nullable=True, index=True)
     telephone = Column(String(20), nullable=False)
     adresse = Column(Text, nullable=True)
     ville = Column(String(100), nullable=True)
@@ -246,6 +250,10 @@ class RendezVous(Base):
 
 class DemandePrestation(Base):
     __tablename__ = "demandes_prestations"
+    __table_args__ = (
+        # Index couvrant pour l'agrégation par cellule geohash (carte de chaleur)
+        Index("idx_demandes_geohash_statut_service", "client_geohash", "statut", "service_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     client_id = Column(Integer, ForeignKey("clients.id"), nullable=False)
@@ -261,6 +269,8 @@ class DemandePrestation(Base):
     # Localisation du client
     client_latitude = Column(DECIMAL(10, 8), nullable=True)
     client_longitude = Column(DECIMAL(11, 8), nullable=True)
+    # Geohash de la localisation du client (recherches de proximité par préfixe)
+    client_geohash = Column(String(12), nullable=True, index=True)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
@@ -281,12 +291,16 @@ class Garage(Base):
     code_postal = Column(String(10), nullable=True)
     telephone = Column(String(20), nullable=True)
     email = Column(String(255), nullable=True)
+    # Email normalisé (emails.normalize_email) pour le rapprochement avec les utilisateurs
+    email_normalise = Column(String(255), nullable=True, index=True)
     siret = Column(String(14), nullable=True)
     specialites = Column(Text, nullable=True)
     statut = Column(Enum(StatutGarageEnum), default=StatutGarageEnum.en_attente)
     # Localisation du garage
     latitude = Column(DECIMAL(10, 8), nullable=True)
     longitude = Column(DECIMAL(11, 8), nullable=True)
+    # Geohash de la localisation du garage (recherches de proximité par préfixe)
+    geohash = Column(String(12), nullable=True, index=True)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
@@ -303,3 +317,24 @@ class Fournisseur(Base):
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
+
+# Maintenir les geohash à jour à chaque écriture par l'ORM
+@event.listens_for(Garage, "before_insert")
+@event.listens_for(Garage, "before_update")
+def _update_garage_geohash(mapper, connection, target):
+    target.geohash = encode_position(target.latitude, target.longitude)
+
+
+@event.listens_for(DemandePrestation, "before_insert")
+@event.listens_for(DemandePrestation, "before_update")
+def _update_demande_geohash(mapper, connection, target):
+    target.client_geohash = encode_position(target.client_latitude, target.client_longitude)
+
+
+# Maintenir les emails normalisés à jour à chaque écriture par l'ORM
+@event.listens_for(Client, "before_insert")
+@event.listens_for(Client, "before_update")
+@event.listens_for(Garage, "before_insert")
+@event.listens_for(Garage, "before_update")
+def _update_email_normalise(mapper, connection, target):
+    target.email_normalise = normalize_email(target.email)
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, Enum
+from sqlalchemy import BigInteger, Column, Integer, String, Enum, event
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
 from database import Base
+from emails import normalize_email
 
 
 class RoleEnum(str, enum.Enum):
@@ -30,6 +31,8 @@ class Utilisateur(Base):
     # NE PAS définir nom_complet comme colonne - elle n'existe pas dans la base
     # On la construira uniquement via la propriété full_name
     email = Column(String(150), nullable=False, unique=True, index=True)
+    # Email normalisé (emails.normalize_email) : recherche par email insensible à la casse
+    email_normalise = Column(String(150), nullable=True, index=True)
     # Utiliser uniquement mot_de_passe (nom réel dans la base)
     mot_de_passe = Column(String(255), nullable=True)  # Nom réel dans la base
     # NE PAS définir password_hash comme colonne - utiliser uniquement mot_de_passe
@@ -66,3 +69,52 @@ class Utilisateur(Base):
     
     # Relations possibles
     # clients = relationship("Client", back_populates="utilisateur")
+
+
+# Maintenir l'email normalisé à jour à chaque écriture par l'ORM
+@event.listens_for(Utilisateur, "before_insert")
+@event.listens_for(Utilisateur, "before_update")
+def _update_utilisateur_email_normalise(mapper, connection, target):
+    target.email_normalise = normalize_email(target.email)
+
+
+class CacheVersion(Base):
+    """Numéro de version d'un cache en mémoire, partagé par tous les workers
+
+    Chaque écriture qui rend un cache obsolète incrémente la version (dans la même
+    transaction) ; les workers relisent ce numéro périodiquement et vident leur cache
+    quand il a changé.
+    """
+    __tablename__ = "cache_versions"
+    
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class ParametrePartage(Base):
+    """Paramètre de fonctionnement commun à tous les workers (ex. coût bcrypt calibré)
+
+    Écrit une fois par le premier worker qui le détermine, puis lu par les autres.
+    """
+    __tablename__ = "parametres_partages"
+    
+    nom = Column(String(50), primary_key=True)
+    valeur = Column(Integer, nullable=False)
+
+
+class TokenRevoque(Base):
+    """Révocation d'un token (jti) ou de tous les tokens d'un utilisateur émis avant une date
+
+    Table de synchronisation des listes de révocation en mémoire des workers
+    (token_revocation.py), lue de façon incrémentale par id.
+    """
+    __tablename__ = "tokens_revoques"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    # jti du token révoqué, ou NULL pour révoquer tous les tokens de user_id émis avant revoked_before
+    jti = Column(String(64), nullable=True, index=True)
+    user_id = Column(Integer, nullable=True)
+    # Instant (millisecondes epoch) avant lequel les tokens de user_id sont révoqués (iat à la milliseconde)
+    revoked_before = Column(BigInteger, nullable=True)
+    # Fin de validité (secondes epoch) : au-delà, la ligne peut être purgée
+    expires_at = Column(Integer, nullable=False, index=True)
@@ -0,0 +1,120 @@
+"""
+Cache LRU des résultats de recherche du garage le plus proche
+
+Les positions des clients sont arrondies à NEAREST_CACHE_PRECISION décimales : toutes les
+demandes d'un même quartier partagent la même entrée. Quand un garage est créé, déplacé
+ou change de statut, seules les entrées qu'il peut affecter sont retirées (celles qui
+pointaient vers lui, et celles dont il devient plus proche que le garage en cache).
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from config import settings
+from geo_distance import EARTH_RADIUS_KM, calculate_distance
+
+
+class NearestGarageCache:
+    """Cache borné (clé : position arrondie) -> (garage_id, distance_km)"""
+
+    def __init__(self, max_size: int = 10000, precision: int = 3, ttl_seconds: int = 300):
+        self.max_size = max_size
+        self.precision = precision
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[float, float], Tuple[int, float, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # Distance maximale entre une position et sa clé arrondie (demi-diagonale d'une cellule)
+        self._rounding_km = math.radians(0.5 * 10 ** -precision) * math.sqrt(2) * EARTH_RADIUS_KM
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def _key(self, latitude: float, longitude: float) -> Tuple[float, float]:
+        return (round(latitude, self.precision), round(longitude, self.precision))
+
+    def get(self, latitude: float, longitude: float) -> Optional[int]:
+        """Retourne l'ID du garage en cache pour cette position, ou None"""
+        if not self.enabled:
+            return None
+        key = self._key(latitude, longitude)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds > 0 and time.monotonic() - entry[2] >= self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, latitude: float, longitude: float, garage_id: int, garage_latitude: float, garage_longitude: float) -> None:
+        """Mémorise le garage le plus proche d'une position"""
+        if not self.enabled:
+            return
+        key = self._key(latitude, longitude)
+        distance = calculate_distance(key[0], key[1], garage_latitude, garage_longitude)
+        with self._lock:
+            self._entries[key] = (garage_id, distance, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Vide tout le cache"""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def invalidate_garage(self, garage_id: int, latitude=None, longitude=None, actif: bool = False) -> None:
+        """Retire les entrées affectées par la modification d'un garage
+
+        Sont retirées les entrées qui pointaient vers ce garage, et, si le garage est actif
+        et localisé, celles pour lesquelles sa nouvelle position est plus proche que le
+        garage en cache (à l'arrondi de la clé près).
+        """
+        position = None
+        if actif and latitude is not None and longitude is not None:
+            position = (float(latitude), float(longitude))
+
+        with self._lock:
+            stale = []
+            for key, (cached_id, distance, _) in self._entries.items():
+                if cached_id == garage_id:
+                    stale.append(key)
+                elif position is not None:
+                    # Borne haute de l'erreur due à l'arrondi, des deux côtés de la comparaison
+                    if calculate_distance(key[0], key[1], position[0], position[1]) <= distance + 2 * self._rounding_km:
+                        stale.append(key)
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def stats(self) -> dict:
+        """Compteurs du cache (pour ajuster la précision et la taille)"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "precision": self.precision,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations
+        }
+
+
+# Cache partagé par les routes du worker
+nearest_garage_cache = NearestGarageCache(
+    max_size=settings.NEAREST_CACHE_SIZE,
+    precision=settings.NEAREST_CACHE_PRECISION,
+    ttl_seconds=settings.NEAREST_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,284 @@
+"""
+Hachage et vérification des mots de passe (bcrypt) dans un pool de workers dédié
+
+Un hachage bcrypt coûte plusieurs centaines de millisecondes de CPU. Exécuté dans les
+routes synchrones, il occupe les threads du threadpool AnyIO partagé par toutes les
+routes : une rafale de connexions suffit à bloquer le reste de l'API. Les routes
+asynchrones (/auth/login, /auth/register) attendent donc ce pool de taille bornée,
+en mode "thread" (bcrypt libère le GIL) ou "process" (processus séparés).
+
+Les fonctions de hachage restent au niveau du module, sans dépendance vers la base :
+elles doivent pouvoir être importées et sérialisées par les processus du pool.
+
+Coût bcrypt : les hashes existants ont été produits par plusieurs scripts avec des coûts
+différents. Le coût cible (BCRYPT_ROUNDS) peut être relevé au démarrage pour qu'un
+hachage prenne au plus BCRYPT_TARGET_MS sur un cœur, sans descendre sous
+BCRYPT_MIN_ROUNDS. Le premier worker qui calibre enregistre le coût dans
+parametres_partages (shared_rounds) : tous les workers utilisent le même. Après une connexion réussie, un
+hash d'un coût inférieur est recalculé en arrière-plan (needs_rehash) ; un hash plus
+coûteux est gardé.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import bcrypt
+from passlib.context import CryptContext
+from config import settings
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Nombre de mesures conservées pour les percentiles d'attente et d'exécution
+STATS_WINDOW = 1000
+
+# Coût maximal envisagé par la calibration (chaque +1 double le temps de hachage)
+BCRYPT_MAX_ROUNDS = 16
+
+# Paramètre partagé (table parametres_partages) qui porte le coût bcrypt calibré
+BCRYPT_ROUNDS_PARAMETER = "bcrypt_rounds"
+
+
+def _password_bytes(password) -> bytes:
+    """Convertit le mot de passe en bytes, tronqué à 72 bytes (limite bcrypt)"""
+    password_bytes = password.encode('utf-8') if isinstance(password, str) else password
+    return password_bytes[:72]
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Vérifie un mot de passe"""
+    try:
+        # Vérifier que le hash est valide
+        if not hashed_password or len(hashed_password) < 10:
+            return False
+
+        # Utiliser directement bcrypt au lieu de passlib pour éviter les problèmes de compatibilité
+        try:
+            hash_bytes = hashed_password.encode('utf-8') if isinstance(hashed_password, str) else hashed_password
+            return bcrypt.checkpw(_password_bytes(plain_password), hash_bytes)
+        except (ValueError, TypeError) as e:
+            # Si bcrypt échoue, essayer avec passlib en dernier recours
+            try:
+                return pwd_context.verify(plain_password, hashed_password)
+            except Exception as e2:
+                print(f"Erreur de vérification (bcrypt et passlib): {e}, {e2}")
+                return False
+    except Exception as e:
+        print(f"Erreur lors de la vérification du mot de passe: {e}")
+        return False
+
+
+def get_password_hash(password: str, rounds: Optional[int] = None) -> str:
+    """Hash un mot de passe (coût bcrypt `rounds`, BCRYPT_ROUNDS par défaut)"""
+    salt = bcrypt.gensalt(rounds or settings.BCRYPT_ROUNDS)
+    return bcrypt.hashpw(_password_bytes(password), salt).decode('utf-8')
+
+
+def hash_rounds(hashed_password) -> Optional[int]:
+    """Coût d'un hash bcrypt ($2a$/$2b$/$2y$), ou None si ce n'est pas un hash bcrypt"""
+    if isinstance(hashed_password, bytes):
+        hashed_password = hashed_password.decode('utf-8', 'replace')
+    parts = (hashed_password or "").split("$")
+    if len(parts) < 4 or parts[1] not in ("2a", "2b", "2y") or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def calibrate_rounds(target_ms: float, min_rounds: int, max_rounds: int = BCRYPT_MAX_ROUNDS) -> Tuple[int, float]:
+    """Coût bcrypt le plus élevé dont un hachage tient dans target_ms sur ce cœur
+
+    Mesure un hachage au coût minimal (meilleur de deux) puis extrapole : le temps double
+    à chaque coût supplémentaire. Retourne (coût, durée mesurée au coût minimal en ms).
+    """
+    password = _password_bytes("calibration")
+    measured_ms = float('inf')
+    for _ in range(2):
+        start = time.perf_counter()
+        bcrypt.hashpw(password, bcrypt.gensalt(min_rounds))
+        measured_ms = min(measured_ms, (time.perf_counter() - start) * 1000)
+
+    rounds = min_rounds
+    while rounds < max_rounds and measured_ms * 2 ** (rounds + 1 - min_rounds) <= target_ms:
+        rounds += 1
+    return rounds, measured_ms
+
+
+def shared_rounds(db, calibrated: Optional[int] = None) -> Optional[int]:
+    """Coût bcrypt commun à tous les workers (table parametres_partages)
+
+    Retourne le coût enregistré ; sinon enregistre `calibrated` (le premier worker qui
+    calibre l'emporte) et retourne le coût retenu. Supprimer l'entrée pour recalibrer
+    (nouvelle machine). Import différé : les processus du pool n'accèdent pas à la base.
+    """
+    from sqlalchemy import select
+    from sqlalchemy.exc import IntegrityError
+    from models_auth import ParametrePartage
+
+    query = select(ParametrePartage.valeur).where(ParametrePartage.nom == BCRYPT_ROUNDS_PARAMETER)
+    rounds = db.execute(query).scalar()
+    if rounds is not None or calibrated is None:
+        return rounds
+    try:
+        db.add(ParametrePartage(nom=BCRYPT_ROUNDS_PARAMETER, valeur=calibrated))
+        db.commit()
+        return calibrated
+    except IntegrityError:
+        # Un autre worker a enregistré son coût entre-temps
+        db.rollback()
+        return db.execute(query).scalar()
+
+
+def _timed_call(func, *args):
+    """Exécute func dans le worker et retourne (heure de début, résultat)"""
+    # time.time() et non time.monotonic() : l'heure doit être comparable entre processus
+    return time.time(), func(*args)
+
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class PasswordWorkerPool:
+    """Pool borné pour le travail bcrypt, avec mesure de la file d'attente"""
+
+    def __init__(self, mode: str = "thread", max_workers: int = 0, rounds: int = 12):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Mode de pool inconnu: {mode} (thread ou process)")
+        self.mode = mode
+        # Coût bcrypt cible des nouveaux hashes (ajusté par calibrate)
+        self.rounds = rounds
+        self.calibration = None
+        self.max_workers = max_workers if max_workers > 0 else (os.cpu_count() or 2)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._in_flight = 0
+        self._max_in_flight = 0
+        self.completed = 0
+        self._wait_ms = deque(maxlen=STATS_WINDOW)
+        self._run_ms = deque(maxlen=STATS_WINDOW)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.mode == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+            return self._executor
+
+    async def run(self, func, *args):
+        """Exécute func(*args) dans le pool sans bloquer la boucle d'événements"""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        submitted_at = time.time()
+        with self._lock:
+            self._in_flight += 1
+            self._max_in_flight = max(self._max_in_flight, self._in_flight)
+        try:
+            started_at, result = await loop.run_in_executor(executor, _timed_call, func, *args)
+        except BrokenProcessPool:
+            # Un processus du pool est mort : le pool sera recréé à la prochaine demande
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        finished_at = time.time()
+
+        with self._lock:
+            self.completed += 1
+            self._wait_ms.append(max(0.0, started_at - submitted_at) * 1000)
+            self._run_ms.append(max(0.0, finished_at - started_at) * 1000)
+        return result
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        # Le coût est passé explicitement : les processus du pool ne voient pas la calibration
+        return await self.run(get_password_hash, password, self.rounds)
+
+    async def hash_many(self, passwords, rounds: int) -> list:
+        """Hache une liste de mots de passe (import en masse) par lots de max_workers
+
+        Un lot à la fois : les connexions et inscriptions concurrentes attendent au plus un
+        lot derrière l'import, et plusieurs imports se partagent les mêmes workers.
+        """
+        hashes = []
+        for start in range(0, len(passwords), self.max_workers):
+            batch = passwords[start:start + self.max_workers]
+            hashes.extend(await asyncio.gather(*[self.run(get_password_hash, password, rounds) for password in batch]))
+        return hashes
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Indique si le hash est moins coûteux que la cible (à recalculer après une connexion réussie)
+
+        Jamais de baisse : un hash plus coûteux que la cible est gardé.
+        """
+        rounds = hash_rounds(hashed_password)
+        return rounds is None or rounds < self.rounds
+
+    async def calibrate(self, target_ms: float, min_rounds: int) -> int:
+        """Mesure sur un worker du pool le coût qui tient dans le budget de latence (sans l'appliquer)"""
+        rounds, measured_ms = await self.run(calibrate_rounds, target_ms, min_rounds)
+        self.calibration = {
+            "target_ms": target_ms,
+            "min_rounds": min_rounds,
+            "measured_ms_at_min_rounds": round(measured_ms, 2),
+            "estimated_ms": round(measured_ms * 2 ** (rounds - min_rounds), 2)
+        }
+        return rounds
+
+    def shutdown(self) -> None:
+        """Arrête les workers (ils seront recréés au prochain appel)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        """Profondeur de file et temps d'attente, pour dimensionner le pool par cœur"""
+        with self._lock:
+            in_flight = self._in_flight
+            wait_ms = list(self._wait_ms)
+            run_ms = list(self._run_ms)
+            max_in_flight = self._max_in_flight
+            completed = self.completed
+
+        def summary(values):
+            if not values:
+                return None
+            return {
+                "mean": round(sum(values) / len(values), 2),
+                "p50": round(_percentile(values, 0.50), 2),
+                "p95": round(_percentile(values, 0.95), 2),
+                "max": round(max(values), 2)
+            }
+
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "bcrypt_rounds": self.rounds,
+            "calibration": self.calibration,
+            "cpu_count": os.cpu_count(),
+            "in_flight": in_flight,
+            "queue_depth": max(0, in_flight - self.max_workers),
+            "max_in_flight": max_in_flight,
+            "completed": completed,
+            "wait_ms": summary(wait_ms),
+            "run_ms": summary(run_ms)
+        }
+
+
+# Pool partagé par les routes d'authentification du worker
+password_pool = PasswordWorkerPool(
+    mode=settings.PASSWORD_POOL_MODE,
+    max_workers=settings.PASSWORD_POOL_WORKERS,
+    rounds=settings.BCRYPT_ROUNDS
+)
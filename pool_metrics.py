@@ -0,0 +1,185 @@
+"""
+Mesures des pools de connexions SQLAlchemy (primaire, réplicas, moteur asynchrone)
+
+Sans mesure, un pool sous-dimensionné ne se voit qu'aux timeouts de 30 secondes. Pour
+chaque moteur, on relève :
+- l'attente pour obtenir une connexion (les événements du pool ne couvrent pas
+  l'attente : les classes de pool ci-dessous chronomètrent _do_get) ;
+- le nombre de connexions empruntées et le débordement (max_overflow) utilisé, en
+  courant et au maximum ;
+- l'âge des connexions au moment de l'emprunt, et les connexions ouvertes/fermées.
+
+Une attente supérieure à DB_POOL_WAIT_WARNING_MS est signalée dans les logs (au plus
+une fois toutes les WARNING_INTERVAL_SECONDS par pool). Les valeurs sont exposées par
+GET /metrics/db-pool, pour dimensionner le pool de chaque worker.
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Nombre de mesures conservées pour les percentiles
+STATS_WINDOW = 1000
+
+# Intervalle minimal entre deux avertissements d'attente pour un même pool
+WARNING_INTERVAL_SECONDS = 10
+
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _summary(values) -> Optional[dict]:
+    if not values:
+        return None
+    return {
+        "mean": round(sum(values) / len(values), 2),
+        "p50": round(_percentile(values, 0.50), 2),
+        "p95": round(_percentile(values, 0.95), 2),
+        "p99": round(_percentile(values, 0.99), 2),
+        "max": round(max(values), 2)
+    }
+
+
+class PoolMonitor:
+    """Mesures d'un pool de connexions"""
+
+    def __init__(self, name: str, warn_wait_ms: float):
+        self.name = name
+        self.warn_wait_ms = warn_wait_ms
+        self.pool = None
+        self._lock = threading.Lock()
+        self._wait_ms = deque(maxlen=STATS_WINDOW)
+        self._age_seconds = deque(maxlen=STATS_WINDOW)
+        self.checkouts = 0
+        self.slow_checkouts = 0
+        self.timeouts = 0
+        self.connections_opened = 0
+        self.connections_closed = 0
+        self.max_checked_out = 0
+        self.max_overflow_used = 0
+        self._last_warning = 0.0
+        self._suppressed_warnings = 0
+
+    def record_wait(self, wait_ms: float, timed_out: bool = False) -> None:
+        now = time.monotonic()
+        warn = None
+        with self._lock:
+            self._wait_ms.append(wait_ms)
+            if timed_out:
+                self.timeouts += 1
+            if wait_ms >= self.warn_wait_ms or timed_out:
+                self.slow_checkouts += 1
+                if now - self._last_warning >= WARNING_INTERVAL_SECONDS:
+                    warn, self._suppressed_warnings = self._suppressed_warnings, 0
+                    self._last_warning = now
+                else:
+                    self._suppressed_warnings += 1
+        if warn is not None:
+            status = self.pool.status() if self.pool is not None else ""
+            suppressed = f" ({warn} autre(s) depuis le dernier avertissement)" if warn else ""
+            outcome = "timeout" if timed_out else f"{wait_ms:.0f} ms"
+            print(f"⚠️  Pool de connexions '{self.name}' : attente {outcome} pour une connexion{suppressed} - {status}")
+
+    def on_connect(self, dbapi_connection, connection_record) -> None:
+        connection_record.info["connected_at"] = time.monotonic()
+        with self._lock:
+            self.connections_opened += 1
+
+    def on_close(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.connections_closed += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        connected_at = connection_record.info.get("connected_at")
+        pool = self.pool
+        with self._lock:
+            self.checkouts += 1
+            if connected_at is not None:
+                self._age_seconds.append(time.monotonic() - connected_at)
+            if pool is not None:
+                self.max_checked_out = max(self.max_checked_out, pool.checkedout())
+                self.max_overflow_used = max(self.max_overflow_used, pool.overflow())
+
+    def stats(self) -> dict:
+        pool = self.pool
+        with self._lock:
+            wait_ms = list(self._wait_ms)
+            age_seconds = list(self._age_seconds)
+            counters = {
+                "checkouts": self.checkouts,
+                "slow_checkouts": self.slow_checkouts,
+                "timeouts": self.timeouts,
+                "connections_opened": self.connections_opened,
+                "connections_closed": self.connections_closed,
+                "max_checked_out": self.max_checked_out,
+                "max_overflow_used": self.max_overflow_used
+            }
+        return {
+            "pool_size": pool.size() if pool is not None else None,
+            "max_overflow": getattr(pool, "_max_overflow", None),
+            "checked_out": pool.checkedout() if pool is not None else None,
+            "checked_in": pool.checkedin() if pool is not None else None,
+            # Négatif tant que le pool n'a pas ouvert pool_size connexions
+            "overflow": pool.overflow() if pool is not None else None,
+            "timeout_seconds": pool.timeout() if pool is not None else None,
+            "warn_wait_ms": self.warn_wait_ms,
+            **counters,
+            "wait_ms": _summary(wait_ms),
+            "connection_age_seconds": _summary(age_seconds)
+        }
+
+
+class _TimedPoolMixin:
+    """Chronomètre l'obtention d'une connexion (attente incluse) pour le PoolMonitor du pool"""
+
+    monitor: Optional[PoolMonitor] = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if self.monitor is not None:
+                self.monitor.record_wait((time.perf_counter() - start) * 1000, timed_out=True)
+            raise
+        if self.monitor is not None:
+            self.monitor.record_wait((time.perf_counter() - start) * 1000)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() remplace le pool : le nouveau garde le même monitor
+        pool = super().recreate()
+        pool.monitor = self.monitor
+        if self.monitor is not None:
+            self.monitor.pool = pool
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    """QueuePool mesuré (moteurs synchrones)"""
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool mesuré (moteur asynchrone)"""
+
+
+# Mesures de chaque moteur surveillé, par nom
+pool_monitors: Dict[str, PoolMonitor] = {}
+
+
+def monitor_engine(engine, name: str, warn_wait_ms: float) -> PoolMonitor:
+    """Attache un PoolMonitor au pool d'un moteur créé avec un pool mesuré"""
+    pool = engine.pool
+    monitor = PoolMonitor(name, warn_wait_ms)
+    monitor.pool = pool
+    pool.monitor = monitor
+    event.listen(pool, "connect", monitor.on_connect)
+    event.listen(pool, "close", monitor.on_close)
+    event.listen(pool, "checkout", monitor.on_checkout)
+    pool_monitors[name] = monitor
+    return monitor
@@ -0,0 +1,178 @@
+"""
+Répartition des lectures sur des réplicas de la base (DB_REPLICA_URLS)
+
+Les lectures lourdes (listes jointes des demandes, véhicules d'un garage) passent par
+get_read_db : leur session (RoutingSession) envoie les SELECT à un réplica choisi à tour
+de rôle parmi ceux en bonne santé, et tout le reste au primaire :
+- écritures (INSERT/UPDATE/DELETE, flush) et SELECT ... FOR UPDATE ;
+- toute requête de la session après une écriture (lecture de ses propres écritures) ;
+- les requêtes d'un client qui vient d'écrire (ReadYourWrites), le temps que les
+  réplicas rattrapent leur retard.
+
+Chaque réplica est testé (SELECT 1) au plus toutes les DB_REPLICA_HEALTH_CHECK_SECONDS,
+au moment où il est choisi ; un réplica en échec de test ou en erreur de connexion est
+écarté jusqu'au test suivant. Sans réplica disponible, tout va au primaire.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.elements import TextClause
+
+
+class ReplicaPool:
+    """Réplicas en lecture : tour de rôle sur ceux en bonne santé"""
+
+    def __init__(self, engines: List[Engine], health_check_seconds: float = 10):
+        self.engines = engines
+        self.health_check_seconds = health_check_seconds
+        self._lock = threading.Lock()
+        self._next = 0
+        # Réplicas écartés, et instant (monotonic) du prochain test de chaque réplica
+        self._down = set()
+        self._check_at = {engine: 0.0 for engine in engines}
+        self.failovers = 0
+        self.reads = [0] * len(engines)
+        for engine in engines:
+            event.listen(engine, "handle_error", self._on_error)
+
+    def _on_error(self, context) -> None:
+        """Écarte le réplica sur une erreur de connexion (coupure, serveur arrêté)"""
+        if context.is_disconnect or isinstance(context.sqlalchemy_exception, OperationalError):
+            self.mark_down(context.engine)
+
+    def mark_down(self, engine: Engine) -> None:
+        with self._lock:
+            if engine not in self._down:
+                self.failovers += 1
+                self._down.add(engine)
+            self._check_at[engine] = time.monotonic() + self.health_check_seconds
+
+    def _check(self, engine: Engine) -> bool:
+        """Test de santé (SELECT 1), au plus toutes les health_check_seconds par réplica"""
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        except Exception:
+            self.mark_down(engine)
+            return False
+        with self._lock:
+            self._down.discard(engine)
+            self._check_at[engine] = time.monotonic() + self.health_check_seconds
+        return True
+
+    def choose(self) -> Optional[Engine]:
+        """Prochain réplica disponible, ou None (lecture sur le primaire)"""
+        count = len(self.engines)
+        for _ in range(count):
+            with self._lock:
+                index = self._next
+                self._next = (self._next + 1) % count
+                engine = self.engines[index]
+                down = engine in self._down
+                due = time.monotonic() >= self._check_at[engine]
+            if due:
+                down = not self._check(engine)
+            if not down:
+                self.reads[index] += 1
+                return engine
+        return None
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            down = set(self._down)
+            check_at = dict(self._check_at)
+        return {
+            "replicas": [
+                {
+                    "url": engine.url.render_as_string(hide_password=True),
+                    "healthy": engine not in down,
+                    "next_check_in_seconds": round(max(0.0, check_at[engine] - now), 1),
+                    "sessions": self.reads[index]
+                }
+                for index, engine in enumerate(self.engines)
+            ],
+            "failovers": self.failovers,
+            "health_check_seconds": self.health_check_seconds
+        }
+
+
+class ReadYourWrites:
+    """Clients ayant écrit récemment : leurs lectures restent sur le primaire pendant window_seconds"""
+
+    def __init__(self, window_seconds: float = 5, max_keys: int = 100000):
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._writes = OrderedDict()
+
+    def record(self, key: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._writes.pop(key, None)
+            self._writes[key] = now
+            # Les plus anciennes écritures sont en tête : retirer celles hors fenêtre
+            while self._writes:
+                oldest_key, written_at = next(iter(self._writes.items()))
+                if now - written_at < self.window_seconds and len(self._writes) <= self.max_keys:
+                    break
+                del self._writes[oldest_key]
+
+    def is_recent(self, key: str) -> bool:
+        with self._lock:
+            written_at = self._writes.get(key)
+        return written_at is not None and time.monotonic() - written_at < self.window_seconds
+
+    def size(self) -> int:
+        return len(self._writes)
+
+
+def client_key(request) -> Optional[str]:
+    """Identité du client pour ReadYourWrites : token d'authentification, sinon adresse IP"""
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return hashlib.sha256(authorization.encode("utf-8")).hexdigest()
+    return request.client.host if request.client else None
+
+
+def _is_read(clause) -> bool:
+    """SELECT sans verrou (construit ou en SQL texte)"""
+    if isinstance(clause, Select):
+        return clause._for_update_arg is None
+    if isinstance(clause, TextClause):
+        sql = clause.text.lstrip().lower()
+        return sql.startswith(("select", "with")) and "for update" not in sql
+    return False
+
+
+class RoutingSession(Session):
+    """Session des routes de lecture : SELECT sur un réplica, le reste sur le primaire
+
+    info["replicas"] (ReplicaPool) est fourni par la fabrique de sessions ;
+    info["primary"] force le primaire (écriture faite, client qui vient d'écrire).
+    Le réplica est choisi une fois par session : ses lectures sont cohérentes entre elles.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or self.info.get("primary") or not _is_read(clause):
+            if clause is not None and not self._flushing:
+                # Écriture en SQL direct (sans flush) : la suite de la session reste sur le primaire
+                self.info["primary"] = True
+            return super().get_bind(mapper, clause=clause, **kw)
+        if "replica" not in self.info:
+            replicas = self.info.get("replicas")
+            self.info["replica"] = replicas.choose() if replicas is not None else None
+        return self.info["replica"] or super().get_bind(mapper, clause=clause, **kw)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _stick_to_primary(session, flush_context):
+    # Après une écriture, la session lit sur le primaire (ses propres écritures)
+    session.info["primary"] = True
@@ -1,9 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from starlette.concurrency import run_in_threadpool
+import anyio.from_thread
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import text, select, update, case, and_, or_, false, func
+from datetime import datetime, timedelta
+from typing import Optional
+import time
 from database import get_db
 from models_auth import Utilisateur
-from models import Service, Piece
+from models import Service, Piece, DemandePrestation, Garage, StatutGarageEnum
+from garage_index import garage_index
+from garage_load import garage_load
+from user_cache import CurrentUser, current_user_cache
+from user_roles import reconcile_user_roles
+from token_revocation import token_revocation
+from password_pool import password_pool
+from user_import import IMPORT_FORMATS, detect_format, read_rows, import_users
+from config import settings
+from routers.auth import ACCESS_TOKEN_EXPIRE_MINUTES, get_current_admin
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -16,6 +30,7 @@ def delete_all_users(db: Session = Depends(get_db)):
         result = db.execute(
             text("DELETE FROM utilisateurs WHERE role != 'admin'")
         )
+        current_user_cache.invalidate(db)
         db.commit()
         deleted_count = result.rowcount
         return {
@@ -82,3 +97,283 @@ def delete_all_pieces(db: Session = Depends(get_db)):
             detail=f"Erreur lors de la suppression des pièces: {error_str}"
         )
 
+
+@router.post("/utilisateurs/reconcile-roles")
+def reconcile_utilisateurs_roles(
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_admin)
+):
+    """Corrige en une passe le rôle/garage_id de tous les utilisateurs incohérents avec les garages"""
+    try:
+        start = time.perf_counter()
+        corrected = reconcile_user_roles(db)
+        db.commit()
+        return {
+            "success": True,
+            "message": f"{corrected} utilisateur(s) corrigé(s)",
+            "corrected_count": corrected,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)
+        }
+    except Exception as e:
+        db.rollback()
+        import traceback
+        error_str = str(e)
+        print(f"Erreur lors de la réconciliation des rôles: {error_str}")
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la réconciliation des rôles: {error_str}"
+        )
+
+
+@router.post("/utilisateurs/import")
+async def import_utilisateurs(
+    file: UploadFile = File(..., description="Fichier CSV ou NDJSON (nom_complet, email, password, role, telephone)"),
+    format: Optional[str] = Query(None, description="csv ou ndjson (par défaut d'après l'extension du fichier)"),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_admin)
+):
+    """Crée des utilisateurs en masse (et les clients associés) ; rapport ligne par ligne
+
+    Les mots de passe sont hachés sur le pool borné des authentifications (password_pool,
+    partagé par les imports concurrents) et les lignes insérées par INSERT multi-lignes
+    (voir user_import).
+    """
+    if format is not None and format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Format invalide. Formats disponibles: csv, ndjson")
+    try:
+        content = (await file.read()).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Le fichier doit être encodé en UTF-8")
+
+    try:
+        start = time.perf_counter()
+        rows = read_rows(content, format or detect_format(file.filename, content))
+        # Même coût bcrypt que les inscriptions (calibré au démarrage)
+        report = await run_in_threadpool(
+            import_users, db, rows, password_pool.rounds,
+            chunk_size=settings.IMPORT_CHUNK_SIZE,
+            hash_func=lambda passwords, rounds: anyio.from_thread.run(password_pool.hash_many, passwords, rounds)
+        )
+        report["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return {
+            "success": True,
+            "message": f"{report['created']} utilisateur(s) créé(s), {report['skipped']} ignoré(s), {report['errors']} en erreur",
+            **report
+        }
+    except Exception as e:
+        db.rollback()
+        import traceback
+        error_str = str(e)
+        print(f"Erreur lors de l'import des utilisateurs: {error_str}")
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de l'import des utilisateurs: {error_str}"
+        )
+
+
+@router.post("/tokens/revoke")
+def revoke_tokens(
+    jti: Optional[str] = Query(None, description="Identifiant (jti) du token à révoquer"),
+    exp: Optional[int] = Query(None, description="Expiration du token (epoch) ; par défaut la durée de vie maximale"),
+    user_id: Optional[int] = Query(None, description="Révoque tous les tokens déjà émis pour cet utilisateur"),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_admin)
+):
+    """Révoque un token (jti) ou tous les tokens d'un utilisateur (user_id)"""
+    if not jti and user_id is None:
+        raise HTTPException(status_code=400, detail="Indiquer jti ou user_id")
+    try:
+        token_lifetime_seconds = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        if jti:
+            expires_at = exp if exp is not None else int(time.time()) + token_lifetime_seconds
+            token_revocation.revoke_token(db, jti, expires_at, user_id)
+            message = f"Token {jti} révoqué"
+        else:
+            token_revocation.revoke_user_tokens(db, user_id, token_lifetime_seconds)
+            message = f"Tous les tokens de l'utilisateur {user_id} sont révoqués"
+        db.commit()
+        return {"success": True, "message": message}
+    except Exception as e:
+        db.rollback()
+        import traceback
+        error_str = str(e)
+        print(f"Erreur lors de la révocation des tokens: {error_str}")
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la révocation des tokens: {error_str}"
+        )
+
+
+def _next_nearest_garage(latitude: float, longitude: float, current_garage_id: Optional[int]) -> int:
+    """Garage suivant le garage actuel par ordre de distance (le plus proche s'il n'est pas indexé)
+
+    Une demande restée sans réponse avance d'un rang à chaque réassignation et ne revient
+    jamais à un garage qu'elle a quitté. Retourne le garage actuel s'il est le plus éloigné,
+    -1 sans garage.
+    """
+    k = 2
+    while True:
+        garage_ids = [garage_id for _, garage_id in garage_index.nearest(latitude, longitude, k=k)]
+        if current_garage_id in garage_ids:
+            rank = garage_ids.index(current_garage_id)
+            if rank + 1 < len(garage_ids):
+                return garage_ids[rank + 1]
+        if len(garage_ids) < k:
+            # Tous les garages parcourus
+            if current_garage_id in garage_ids:
+                return current_garage_id
+            return garage_ids[0] if garage_ids else -1
+        k *= 2
+
+
+@router.post("/demandes/redispatch")
+def redispatch_demandes(
+    stale_hours: Optional[float] = Query(None, gt=0),
+    chunk_size: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_admin)
+):
+    """Réassigne en masse les demandes en attente sans garage actif au garage le plus proche
+
+    Sont concernées les demandes en_attente localisées sans garage, ou dont le garage n'est
+    plus actif. Avec stale_hours, les demandes sans réponse depuis plus longtemps (ni créées
+    ni modifiées, réassignation comprise) passent au garage suivant le leur par ordre de
+    distance : la réassignation relance le délai, et une demande ne revient pas en arrière.
+    """
+    try:
+        start = time.perf_counter()
+        garage_index.reload(db)
+        
+        active_garages = select(Garage.id).where(Garage.statut == StatutGarageEnum.actif)
+        to_dispatch = or_(
+            DemandePrestation.garage_id.is_(None),
+            DemandePrestation.garage_id.not_in(active_garages)
+        )
+        stale = None
+        if stale_hours is not None:
+            cutoff = datetime.now() - timedelta(hours=stale_hours)
+            stale = and_(
+                DemandePrestation.date_demande < cutoff,
+                func.coalesce(DemandePrestation.updated_at, DemandePrestation.date_demande) < cutoff
+            )
+            to_dispatch = or_(to_dispatch, stale)
+        
+        examined = 0
+        assigned = 0
+        unassignable = 0
+        chunks = 0
+        last_id = 0
+        while True:
+            # Parcours par lots sur la clé primaire
+            rows = db.query(
+                DemandePrestation.id,
+                DemandePrestation.garage_id,
+                DemandePrestation.client_latitude,
+                DemandePrestation.client_longitude,
+                (stale if stale is not None else false()).label("is_stale")
+            ).filter(
+                DemandePrestation.id > last_id,
+                DemandePrestation.statut == 'en_attente',
+                DemandePrestation.client_latitude.isnot(None),
+                DemandePrestation.client_longitude.isnot(None),
+                to_dispatch
+            ).order_by(DemandePrestation.id).limit(chunk_size).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            examined += len(rows)
+            
+            # Garage le plus proche de toutes les demandes du lot en une passe
+            nearest_ids, _ = garage_index.nearest_many(
+                [float(row[2]) for row in rows],
+                [float(row[3]) for row in rows]
+            )
+            
+            assignments = {}
+            for row, nearest_id in zip(rows, nearest_ids.tolist()):
+                demande_id, current_garage_id, latitude, longitude, is_stale = row
+                if is_stale:
+                    # Demande restée sans réponse : le garage suivant le sien par ordre de distance
+                    nearest_id = _next_nearest_garage(float(latitude), float(longitude), current_garage_id)
+                if nearest_id < 0:
+                    unassignable += 1
+                elif nearest_id != current_garage_id:
+                    assignments[demande_id] = (current_garage_id, nearest_id)
+            
+            if assignments:
+                # Demandes acceptées, annulées ou réassignées par une autre requête depuis la
+                # lecture du lot : écartées. Les lignes restantes sont verrouillées jusqu'au commit
+                current = dict(db.execute(
+                    select(DemandePrestation.id, DemandePrestation.garage_id)
+                    .where(DemandePrestation.id.in_(list(assignments)), DemandePrestation.statut == 'en_attente')
+                    .with_for_update()
+                ).all())
+                assignments = {
+                    demande_id: (old_id, new_id) for demande_id, (old_id, new_id) in assignments.items()
+                    if demande_id in current and current[demande_id] == old_id
+                }
+            if assignments:
+                ids = list(assignments)
+                # Une seule requête UPDATE ... CASE id WHEN ... par lot, limitée aux demandes
+                # encore en attente sur le garage lu (bases sans verrou de ligne, comme SQLite)
+                result = db.execute(
+                    update(DemandePrestation)
+                    .where(
+                        DemandePrestation.id.in_(ids),
+                        DemandePrestation.statut == 'en_attente',
+                        func.coalesce(DemandePrestation.garage_id, -1) == case(
+                            {demande_id: -1 if old_id is None else old_id
+                             for demande_id, (old_id, _) in assignments.items()},
+                            value=DemandePrestation.id
+                        )
+                    )
+                    .values(
+                        garage_id=case(
+                            {demande_id: new_id for demande_id, (_, new_id) in assignments.items()},
+                            value=DemandePrestation.id
+                        ),
+                        # Relance le délai stale_hours des demandes réassignées
+                        updated_at=func.now()
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount != len(assignments):
+                    # Certaines lignes ont changé malgré tout : ne garder que celles réassignées ici
+                    changed = set(db.execute(
+                        select(DemandePrestation.id, DemandePrestation.garage_id)
+                        .where(DemandePrestation.id.in_(ids), DemandePrestation.statut == 'en_attente')
+                    ).all())
+                    assignments = {
+                        demande_id: (old_id, new_id) for demande_id, (old_id, new_id) in assignments.items()
+                        if (demande_id, new_id) in changed
+                    }
+                db.commit()
+                for old_id, new_id in assignments.values():
+                    garage_load.transition(old_id, 'en_attente', new_id, 'en_attente')
+                assigned += len(assignments)
+            chunks += 1
+        
+        elapsed = time.perf_counter() - start
+        return {
+            "success": True,
+            "message": f"{assigned} demande(s) réassignée(s)",
+            "examined_count": examined,
+            "assigned_count": assigned,
+            "unassignable_count": unassignable,
+            "chunks": chunks,
+            "elapsed_seconds": round(elapsed, 3),
+            "demandes_per_second": round(examined / elapsed, 1) if elapsed > 0 else None
+        }
+    except Exception as e:
+        db.rollback()
+        import traceback
+        error_str = str(e)
+        print(f"Erreur lors de la réassignation des demandes: {error_str}")
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la réassignation des demandes: {error_str}"
+        )
@@ -1,16 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-import bcrypt
+from starlette.concurrency import run_in_threadpool
 from typing import Optional
-from database import get_db
+import time
+import uuid
+from database import get_db, SessionLocal
+from password_pool import password_pool
+from token_cache import token_claims_cache
+from user_cache import CurrentUser, current_user_cache
+from user_roles import reconcile_user_roles
+from identity import EmailIdentity, resolve_email
+from emails import normalize_email
+from login_throttle import login_throttle, client_ip
+from token_revocation import token_revocation
 from models_auth import Utilisateur, RoleEnum
 from models import Client
-from sqlalchemy import or_
+from sqlalchemy import or_, text
+from sqlalchemy.exc import IntegrityError
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
@@ -19,7 +29,6 @@ SECRET_KEY = "your-secret-key-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30 * 24 * 60  # 30 jours
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 
@@ -62,110 +71,43 @@ def get_user_full_name(user) -> str:
         nom_parts.append(user.nom)
     return ' '.join(nom_parts) if nom_parts else (user.email if hasattr(user, 'email') else '')
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Vérifie un mot de passe"""
-    try:
-        # Vérifier que le hash est valide
-        if not hashed_password or len(hashed_password) < 10:
-            return False
-        
-        # Utiliser directement bcrypt au lieu de passlib pour éviter les problèmes de compatibilité
-        try:
-            # Convertir le hash en bytes si c'est une string
-            if isinstance(hashed_password, str):
-                hash_bytes = hashed_password.encode('utf-8')
-            else:
-                hash_bytes = hashed_password
-            
-            # Convertir le mot de passe en bytes
-            if isinstance(plain_password, str):
-                password_bytes = plain_password.encode('utf-8')
-            else:
-                password_bytes = plain_password
-            
-            # Tronquer le mot de passe à 72 bytes (limite bcrypt)
-            if len(password_bytes) > 72:
-                password_bytes = password_bytes[:72]
-            
-            # Vérifier avec bcrypt directement
-            return bcrypt.checkpw(password_bytes, hash_bytes)
-        except (ValueError, TypeError) as e:
-            # Si bcrypt échoue, essayer avec passlib en dernier recours
-            try:
-                return pwd_context.verify(plain_password, hashed_password)
-            except Exception as e2:
-                print(f"Erreur de vérification (bcrypt et passlib): {e}, {e2}")
-                return False
-    except Exception as e:
-        error_str = str(e)
-        print(f"Erreur lors de la vérification du mot de passe: {error_str}")
-        return False
-
-
-def get_password_hash(password: str) -> str:
-    """Hash un mot de passe"""
-    # Convertir en bytes
-    if isinstance(password, str):
-        password_bytes = password.encode('utf-8')
-    else:
-        password_bytes = password
-    
-    # Tronquer le mot de passe à 72 bytes (limite bcrypt)
-    if len(password_bytes) > 72:
-        password_bytes = password_bytes[:72]
-    
-    # Utiliser bcrypt directement pour éviter les problèmes de compatibilité
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password_bytes, salt)
-    return hashed.decode('utf-8')
-
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    """Crée un token JWT"""
+    """Crée un token JWT (jti unique pour pouvoir le révoquer, iat pour les révocations par utilisateur)
+
+    iat est à la milliseconde (NumericDate non entier) : une révocation de tous les tokens
+    d'un utilisateur n'atteint pas un token émis dans la même seconde, juste après.
+    """
     to_encode = data.copy()
+    issued_at = datetime.utcnow()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = issued_at + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+        expire = issued_at + timedelta(minutes=15)
+    to_encode.update({"exp": expire, "iat": round(time.time(), 3), "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def get_user_by_email(db: Session, email: str):
-    """Récupère un utilisateur par email (le plus récent en cas de doublons)"""
+def decode_token(token: str) -> dict:
+    """Vérifie et décode un token JWT (lève JWTError s'il est invalide ou expiré)
+
+    Les claims d'un token déjà vérifié sont servis par token_claims_cache, sans
+    nouvelle vérification de signature. La révocation est contrôlée à chaque appel,
+    en mémoire (token_revocation).
+    """
+    payload = token_claims_cache.get(token)
+    if payload is None:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        token_claims_cache.put(token, payload)
+    if token_revocation.is_revoked(payload):
+        raise JWTError("Token révoqué")
+    return payload
+
+
+def get_identity_by_email(db: Session, email: str) -> EmailIdentity:
+    """Utilisateur (le plus récent en cas de doublons), client_id et garage_id d'un email, en une requête"""
     try:
-        # Utiliser une requête SQL brute pour charger uniquement les colonnes qui existent
-        from sqlalchemy import text
-        result = db.execute(
-            text("""
-                SELECT id, nom, prenom, email, mot_de_passe, role, telephone, garage_id, created_at
-                FROM utilisateurs 
-                WHERE email = :email 
-                ORDER BY id DESC 
-                LIMIT 1
-            """),
-            {"email": email}
-        )
-        row = result.fetchone()
-        
-        if not row:
-            return None
-        
-        # Construire l'objet Utilisateur depuis la ligne
-        user = Utilisateur(
-            id=row[0],
-            nom=row[1],
-            prenom=row[2],
-            email=row[3],
-            mot_de_passe=row[4],
-            role=row[5] or 'client',  # Valeur par défaut si NULL
-            telephone=row[6],
-            garage_id=row[7],
-            created_at=str(row[8]) if row[8] else None
-        )
-        
-        return user
+        return resolve_email(db, email)
     except Exception as e:
         error_str = str(e)
         print(f"Erreur lors de la récupération de l'utilisateur: {error_str}")
@@ -178,13 +120,112 @@ def get_user_by_email(db: Session, email: str):
         raise
 
 
+def get_user_by_email(db: Session, email: str):
+    """Récupère un utilisateur par email (le plus récent en cas de doublons, sans tenir compte de la casse)"""
+    return get_identity_by_email(db, email).user
+
+
+def _create_user_records(db: Session, user_data: UserRegister, hashed_password: str, identity: EmailIdentity):
+    """Crée l'utilisateur (et le client associé pour le rôle client) en une seule transaction
+
+    Les identifiants sont obtenus par flush, et le garage/client existants de l'email
+    viennent de get_identity_by_email : une inscription coûte les INSERT et un commit.
+    Retourne (instantané de l'utilisateur, client_id).
+    """
+    # Séparer nom et prénom si possible
+    nom_parts = user_data.nom_complet.split(" ", 1)
+    nom = nom_parts[0]
+    prenom = nom_parts[1] if len(nom_parts) > 1 else None
+    
+    # Créer l'utilisateur avec la structure réelle de la base (nom/prenom, mot_de_passe)
+    new_user = Utilisateur(
+        email=user_data.email,
+        mot_de_passe=hashed_password,  # Utiliser mot_de_passe (nom réel dans la base)
+        role=user_data.role,  # Utiliser directement le string
+        telephone=user_data.telephone,
+        nom=nom,
+        prenom=prenom
+    )
+    # Un garage existe déjà avec cet email : le compte est un compte garage (règle de user_roles)
+    if identity.garage_id is not None:
+        new_user.role = 'garage'
+        new_user.garage_id = identity.garage_id
+    
+    try:
+        db.add(new_user)
+        db.flush()
+        
+        # Si l'utilisateur est un client, créer automatiquement un enregistrement dans la table clients
+        client_id = None
+        if new_user.role == RoleEnum.client:
+            if identity.client_id is not None:
+                # Un client avec cet email existe déjà
+                client_id = identity.client_id
+            else:
+                new_client = Client(
+                    nom=nom,
+                    prenom=prenom,
+                    email=new_user.email,
+                    telephone=new_user.telephone or "0000000000"  # Téléphone obligatoire dans Client
+                )
+                db.add(new_client)
+                db.flush()
+                client_id = new_client.id
+        
+        # Lire les valeurs avant le commit, qui expire les objets de la session
+        created_user = CurrentUser.from_model(new_user)
+        db.commit()
+    except IntegrityError:
+        # Inscription concurrente avec le même email (contrainte unique sur utilisateurs.email)
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Un utilisateur avec cet email existe déjà"
+        )
+    
+    return created_user, client_id
+
+
+# Utilisateurs dont le hash est en cours de recalcul (évite les doublons sur rafale de connexions)
+_rehash_in_progress = set()
+
+
+async def _rehash_password(user_id: int, plain_password: str, old_hash: str):
+    """Recalcule en arrière-plan un hash qui n'a pas le coût bcrypt cible"""
+    if user_id in _rehash_in_progress:
+        return
+    _rehash_in_progress.add(user_id)
+    try:
+        new_hash = await password_pool.hash(plain_password)
+
+        def save():
+            db = SessionLocal()
+            try:
+                # Ne remplace que l'ancien hash : un changement de mot de passe entre-temps l'emporte
+                db.execute(
+                    text("UPDATE utilisateurs SET mot_de_passe = :new_hash WHERE id = :id AND mot_de_passe = :old_hash"),
+                    {"new_hash": new_hash, "id": user_id, "old_hash": old_hash}
+                )
+                db.commit()
+            finally:
+                db.close()
+
+        await run_in_threadpool(save)
+    except Exception as e:
+        print(f"Erreur lors du recalcul du hash de l'utilisateur {user_id}: {e}")
+    finally:
+        _rehash_in_progress.discard(user_id)
+
+
 # Routes
+# /register et /login sont asynchrones : le travail bcrypt passe par password_pool et
+# les accès à la base par le threadpool, sans bloquer les autres routes
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register(user_data: UserRegister, db: Session = Depends(get_db)):
     """Inscription d'un nouvel utilisateur"""
     # Vérifier si l'email existe déjà
-    existing_user = get_user_by_email(db, user_data.email)
-    if existing_user:
+    identity = await run_in_threadpool(get_identity_by_email, db, user_data.email)
+    if identity.user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Un utilisateur avec cet email existe déjà"
@@ -198,52 +239,11 @@ def register(user_data: UserRegister, db: Session = Depends(get_db)):
         )
     
     # Créer le nouvel utilisateur
-    hashed_password = get_password_hash(user_data.password)
-    
-    # Séparer nom et prénom si possible
-    nom_parts = user_data.nom_complet.split(" ", 1)
-    nom = nom_parts[0]
-    prenom = nom_parts[1] if len(nom_parts) > 1 else None
-    
-    # Créer l'utilisateur avec la structure réelle de la base (nom/prenom)
-    # Créer l'utilisateur avec la structure réelle de la base (nom/prenom, mot_de_passe)
-    new_user = Utilisateur(
-        email=user_data.email,
-        mot_de_passe=hashed_password,  # Utiliser mot_de_passe (nom réel dans la base)
-        role=user_data.role,  # Utiliser directement le string
-        telephone=user_data.telephone,
-        nom=nom,
-        prenom=prenom
+    hashed_password = await password_pool.hash(user_data.password)
+    new_user, client_id = await run_in_threadpool(
+        _create_user_records, db, user_data, hashed_password, identity
     )
     
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    
-    # Si l'utilisateur est un client, créer automatiquement un enregistrement dans la table clients
-    client_id = None
-    if new_user.role == RoleEnum.client:
-        # Vérifier si un client avec cet email existe déjà
-        existing_client = db.query(Client).filter(Client.email == new_user.email).first()
-        if existing_client:
-            client_id = existing_client.id
-        else:
-            # Créer un nouveau client
-            # Utiliser nom/prenom du new_user ou construire depuis nom_complet
-            client_nom = new_user.nom or (nom_parts[0] if nom_parts else '')
-            client_prenom = new_user.prenom or (nom_parts[1] if len(nom_parts) > 1 else None)
-            
-            new_client = Client(
-                nom=client_nom,
-                prenom=client_prenom,
-                email=new_user.email,
-                telephone=new_user.telephone or "0000000000"  # Téléphone obligatoire dans Client
-            )
-            db.add(new_client)
-            db.commit()
-            db.refresh(new_client)
-            client_id = new_client.id
-    
     # Créer un token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -263,10 +263,24 @@ def register(user_data: UserRegister, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=UserResponse)
-def login(login_data: UserLogin, db: Session = Depends(get_db)):
+async def login(
+    login_data: UserLogin,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
     """Connexion d'un utilisateur"""
+    # Limiter les tentatives avant toute requête en base et tout calcul bcrypt
+    retry_after = login_throttle.check(client_ip(request), normalize_email(login_data.email))
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Trop de tentatives de connexion. Réessayez dans {retry_after} secondes.",
+            headers={"Retry-After": str(retry_after)}
+        )
+    
     try:
-        user = get_user_by_email(db, login_data.email)
+        user = await run_in_threadpool(get_user_by_email, db, login_data.email)
         
         if not user:
             raise HTTPException(
@@ -284,7 +298,7 @@ def login(login_data: UserLogin, db: Session = Depends(get_db)):
         
         # Vérifier si le hash est un hash bcrypt valide
         try:
-            password_valid = verify_password(login_data.password, password_hash)
+            password_valid = await password_pool.verify(login_data.password, password_hash)
         except Exception as e:
             error_str = str(e)
             print(f"Erreur lors de la vérification du mot de passe: {error_str}")
@@ -308,6 +322,10 @@ def login(login_data: UserLogin, db: Session = Depends(get_db)):
                 detail="Email ou mot de passe incorrect"
             )
         
+        # Hash produit avec un autre coût bcrypt que la cible : le recalculer après la réponse
+        if password_pool.needs_rehash(password_hash):
+            background_tasks.add_task(_rehash_password, user.id, login_data.password, password_hash)
+        
         # Vérifier que le rôle existe
         if not user.role:
             raise HTTPException(
@@ -315,39 +333,9 @@ def login(login_data: UserLogin, db: Session = Depends(get_db)):
                 detail="Rôle utilisateur non défini"
             )
         
-        # Normaliser le rôle (convertir en string)
-        role_str = str(user.role) if user.role else 'client'
-        
-        # IMPORTANT: Vérifier d'abord si un garage existe avec cet email
-        # Si oui, l'utilisateur DOIT être un garage, peu importe son rôle dans la base
-        from models import Garage
-        garage = db.query(Garage).filter(Garage.email == user.email).first()
-        
-        if garage:
-            # Un garage existe avec cet email, l'utilisateur DOIT être un garage
-            if role_str != 'garage' or user.garage_id != garage.id:
-                print(f"⚠️  Garage trouvé pour {user.email} (ID: {garage.id})")
-                print(f"   Correction: rôle={role_str} → 'garage', garage_id={user.garage_id} → {garage.id}")
-                user.role = 'garage'
-                user.garage_id = garage.id
-                db.commit()
-                db.refresh(user)
-                role_str = 'garage'
-        else:
-            # Pas de garage avec cet email
-            # Cohérence rôle/garage_id : si l'utilisateur a un garage_id, son rôle doit être "garage"
-            if user.garage_id and role_str != 'garage':
-                print(f"⚠️  Incohérence détectée: utilisateur {user.email} a garage_id={user.garage_id} mais rôle={role_str}")
-                print(f"   Correction automatique: rôle changé en 'garage'")
-                user.role = 'garage'
-                db.commit()
-                db.refresh(user)
-                role_str = 'garage'
-            
-            # Si l'utilisateur est un garage mais n'a pas de garage_id, c'est une incohérence
-            if role_str == 'garage' and not user.garage_id:
-                print(f"⚠️  ATTENTION: Utilisateur {user.email} a le rôle 'garage' mais pas de garage_id et aucun garage trouvé avec cet email")
-                print(f"   Le rôle sera retourné tel quel, mais l'utilisateur n'a pas de garage associé")
+        # Rôle et garage_id sont tenus cohérents avec la table garages par user_roles
+        # (création/modification de garage, job de réconciliation) : simple lecture ici
+        role_str = str(user.role)
         
         # Créer un token
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -389,45 +377,73 @@ def login(login_data: UserLogin, db: Session = Depends(get_db)):
         )
 
 
-@router.get("/client-id")
-def get_client_id_from_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """Récupère ou crée le client_id associé à l'utilisateur connecté"""
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> CurrentUser:
+    """Dépendance : utilisateur authentifié par le token Bearer
+
+    Utilisable par n'importe quel router (Depends(get_current_user)). FastAPI ne l'évalue
+    qu'une fois par requête ; le token est servi par token_claims_cache et l'utilisateur
+    par current_user_cache, sans décodage ni requête par clé primaire dans le cas courant.
+    Retourne un instantané en lecture seule : relire le modèle pour le modifier.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Impossible de valider les identifiants"
+    )
+    
+    # Révocations faites par les autres workers (lecture de la table au plus toutes les N secondes)
+    token_revocation.ensure_synced(db)
     try:
-        # Décoder le token pour obtenir l'ID de l'utilisateur
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         user_id = int(payload.get("sub"))
-        user_email = payload.get("email")
-        user_role = payload.get("role")
-        
-        # Vérifier que l'utilisateur est un client
-        if user_role != "client":
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Cette fonctionnalité est réservée aux clients"
-            )
-        
-        # Récupérer l'utilisateur
+    except (JWTError, TypeError, ValueError):
+        raise credentials_exception
+    
+    current_user = current_user_cache.get(db, user_id)
+    if current_user is None:
         user = db.query(Utilisateur).filter(Utilisateur.id == user_id).first()
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Utilisateur non trouvé"
-            )
-        
+        if user is None:
+            raise credentials_exception
+        current_user = current_user_cache.put(user)
+    return current_user
+
+
+def get_current_admin(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
+    """Dépendance : utilisateur authentifié avec le rôle admin (routes d'administration)"""
+    if current_user.role != RoleEnum.admin.value:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Accès réservé aux administrateurs"
+        )
+    return current_user
+
+
+@router.get("/client-id")
+def get_client_id_from_user(current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Récupère ou crée le client_id associé à l'utilisateur connecté"""
+    # Vérifier que l'utilisateur est un client
+    if current_user.role != "client":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Cette fonctionnalité est réservée aux clients"
+        )
+    
+    try:
         # Chercher le client par email
-        client = db.query(Client).filter(Client.email == user.email).first()
+        client = db.query(Client).filter(
+            Client.email_normalise == normalize_email(current_user.email)
+        ).order_by(Client.id).first()
         
         if not client:
             # Créer le client s'il n'existe pas
             # Utiliser directement nom et prenom depuis l'utilisateur
-            nom = user.nom or ''
-            prenom = user.prenom or None
+            nom = current_user.nom or ''
+            prenom = current_user.prenom or None
             
             new_client = Client(
                 nom=nom,
                 prenom=prenom,
-                email=user.email,
-                telephone=user.telephone or "0000000000"
+                email=current_user.email,
+                telephone=current_user.telephone or "0000000000"
             )
             db.add(new_client)
             db.commit()
@@ -435,11 +451,6 @@ def get_client_id_from_user(token: str = Depends(oauth2_scheme), db: Session = D
             return {"client_id": new_client.id}
         
         return {"client_id": client.id}
-    except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token invalide"
-        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -450,27 +461,10 @@ def get_client_id_from_user(token: str = Depends(oauth2_scheme), db: Session = D
 @router.put("/update-garage-id", response_model=UserResponse)
 def update_user_garage_id(
     garage_id: int,
-    token: str = Depends(oauth2_scheme),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Met à jour le garage_id de l'utilisateur connecté"""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Impossible de valider les identifiants"
-    )
-    
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    user = db.query(Utilisateur).filter(Utilisateur.id == int(user_id)).first()
-    if user is None:
-        raise credentials_exception
-    
     # Vérifier que le garage existe
     from models import Garage
     garage = db.query(Garage).filter(Garage.id == garage_id).first()
@@ -480,8 +474,18 @@ def update_user_garage_id(
             detail="Garage non trouvé"
         )
     
+    user = db.query(Utilisateur).filter(Utilisateur.id == current_user.id).first()
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Impossible de valider les identifiants"
+        )
+    
     # Mettre à jour le garage_id de l'utilisateur
     user.garage_id = garage_id
+    db.flush()
+    reconcile_user_roles(db, email=user.email)
+    current_user_cache.invalidate(db, user.id)
     db.commit()
     db.refresh(user)
     
@@ -496,53 +500,36 @@ def update_user_garage_id(
 
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def read_current_user(current_user: CurrentUser = Depends(get_current_user)):
     """Récupère l'utilisateur actuellement connecté"""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Impossible de valider les identifiants"
+    return UserResponse(
+        id=current_user.id,
+        nom_complet=get_user_full_name(current_user),
+        email=current_user.email,
+        role=current_user.role or 'client',
+        telephone=current_user.telephone,
+        garage_id=current_user.garage_id
     )
-    
+
+
+@router.post("/logout")
+def logout(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """Déconnexion : révoque le token utilisé pour la requête"""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
+        payload = decode_token(token)
     except JWTError:
-        raise credentials_exception
-    
-    user = db.query(Utilisateur).filter(Utilisateur.id == int(user_id)).first()
-    if user is None:
-        raise credentials_exception
-    
-    # Appliquer la même logique de cohérence que dans login
-    from models import Garage
-    garage = db.query(Garage).filter(Garage.email == user.email).first()
-    
-    # Normaliser le rôle
-    role_str = str(user.role) if user.role else 'client'
-    
-    if garage:
-        # Un garage existe avec cet email, l'utilisateur DOIT être un garage
-        if role_str != 'garage' or user.garage_id != garage.id:
-            user.role = 'garage'
-            user.garage_id = garage.id
-            db.commit()
-            db.refresh(user)
-            role_str = 'garage'
-    else:
-        # Cohérence rôle/garage_id
-        if user.garage_id and role_str != 'garage':
-            user.role = 'garage'
-            db.commit()
-            db.refresh(user)
-            role_str = 'garage'
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Impossible de valider les identifiants"
+        )
     
-    return UserResponse(
-        id=user.id,
-        nom_complet=get_user_full_name(user),
-        email=user.email,
-        role=role_str,
-        telephone=user.telephone,
-        garage_id=user.garage_id
-    )
+    sub = payload.get("sub")
+    user_id = int(sub) if sub and str(sub).isdigit() else None
+    jti = payload.get("jti")
+    if jti:
+        token_revocation.revoke_token(db, jti, int(payload["exp"]), user_id)
+    elif user_id is not None:
+        # Token émis avant l'ajout du jti : seule la révocation de tous les tokens de l'utilisateur est possible
+        token_revocation.revoke_user_tokens(db, user_id, ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+    db.commit()
+    return {"success": True, "message": "Déconnexion effectuée"}
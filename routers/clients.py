@@ -1,27 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from database import get_db
+from database import get_db, get_async_db
 from models import Client
 from schemas import ClientCreate, ClientUpdate, Client as ClientSchema
-from sqlalchemy import or_
+from sqlalchemy import or_, select
 
 router = APIRouter(prefix="/clients", tags=["clients"])
 
 
 @router.get("/", response_model=List[ClientSchema])
-def get_clients(
+async def get_clients(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     search: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Récupère la liste des clients avec pagination et recherche"""
     try:
-        query = db.query(Client)
+        query = select(Client)
         
         if search:
-            query = query.filter(
+            query = query.where(
                 or_(
                     Client.nom.ilike(f"%{search}%"),
                     Client.prenom.ilike(f"%{search}%"),
@@ -30,16 +31,16 @@ def get_clients(
                 )
             )
         
-        clients = query.offset(skip).limit(limit).all()
-        return clients
+        result = await db.execute(query.offset(skip).limit(limit))
+        return result.scalars().all()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur serveur: {str(e)}")
 
 
 @router.get("/{client_id}", response_model=ClientSchema)
-def get_client(client_id: int, db: Session = Depends(get_db)):
+async def get_client(client_id: int, db: AsyncSession = Depends(get_async_db)):
     """Récupère un client par son ID"""
-    client = db.query(Client).filter(Client.id == client_id).first()
+    client = await db.get(Client, client_id)
     if not client:
         raise HTTPException(status_code=404, detail="Client non trouvé")
     return client
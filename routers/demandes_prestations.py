@@ -1,12 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
+import numpy as np
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import text, and_, or_, func
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
-import math
-from database import get_db
+from database import get_db, get_read_db
+from config import settings
 from models import DemandePrestation, Client, Vehicule, Service, Garage, StatutGarageEnum
+from garage_index import garage_index
+from garage_load import garage_load
+from nearest_cache import nearest_garage_cache
+from geo_distance import CoordinateArrays, bounding_box, MAX_DISTANCE_KM
+from geohash import covering_prefixes, prefix_filter, decode_bbox
 
 
 class AcceptDemandeRequest(BaseModel):
@@ -29,58 +35,157 @@ class CreateDemandeRequest(BaseModel):
     client_longitude: float
 
 
-def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Calcule la distance en kilomètres entre deux points géographiques (formule de Haversine)"""
-    # Rayon de la Terre en kilomètres
-    R = 6371.0
-    
-    # Convertir en radians
-    lat1_rad = math.radians(lat1)
-    lon1_rad = math.radians(lon1)
-    lat2_rad = math.radians(lat2)
-    lon2_rad = math.radians(lon2)
+def find_nearest_garage(client_latitude: float, client_longitude: float, db: Session) -> Optional[Garage]:
+    """Trouve le garage le plus proche du client (cache LRU par position arrondie, puis recherche)"""
+    cached_id = nearest_garage_cache.get(client_latitude, client_longitude)
+    if cached_id is not None:
+        garage = db.query(Garage).filter(Garage.id == cached_id).first()
+        if (garage is not None and garage.statut == StatutGarageEnum.actif
+                and garage.latitude is not None and garage.longitude is not None):
+            return garage
+        # Garage modifié par un autre worker depuis sa mise en cache
+        nearest_garage_cache.invalidate_garage(cached_id)
     
-    # Différences
-    dlat = lat2_rad - lat1_rad
-    dlon = lon2_rad - lon1_rad
+    garage = _search_nearest_garage(client_latitude, client_longitude, db)
+    if garage is not None:
+        nearest_garage_cache.put(
+            client_latitude, client_longitude,
+            garage.id, float(garage.latitude), float(garage.longitude)
+        )
+    return garage
+
+
+def _search_nearest_garage(client_latitude: float, client_longitude: float, db: Session) -> Optional[Garage]:
+    """Recherche le garage le plus proche selon le mode configuré (GARAGE_SEARCH_MODE)"""
+    if settings.GARAGE_SEARCH_MODE == "bbox":
+        return find_nearest_garage_bbox(client_latitude, client_longitude, db)
+    if settings.GARAGE_SEARCH_MODE == "geohash":
+        return find_nearest_garage_geohash(client_latitude, client_longitude, db)
+    return find_nearest_garage_index(client_latitude, client_longitude, db)
+
+
+def find_nearest_garage_index(client_latitude: float, client_longitude: float, db: Session) -> Optional[Garage]:
+    """Trouve le garage le plus proche du client via l'index spatial en mémoire des garages actifs"""
+    garage_index.ensure_loaded(db)
     
-    # Formule de Haversine
-    a = math.sin(dlat / 2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    while True:
+        nearest = garage_index.nearest(client_latitude, client_longitude, k=1)
+        if not nearest:
+            return None
+        
+        _, garage_id = nearest[0]
+        garage = db.query(Garage).filter(Garage.id == garage_id).first()
+        if garage is None:
+            garage_index.remove(garage_id)
+            continue
+        
+        # L'index peut être en retard sur un autre worker : s'il ne correspondait pas
+        # à la base pour ce garage, il vient d'être corrigé et on relance la recherche
+        if garage_index.sync_garage(garage):
+            return garage
+
+def find_least_loaded_garage(client_latitude: float, client_longitude: float, db: Session) -> Optional[Garage]:
+    """Choisit parmi les garages les plus proches celui qui minimise distance + pénalité de charge"""
+    garage_index.ensure_loaded(db)
+    garage_load.ensure_loaded(db)
+    penalty_km = settings.DISPATCH_LOAD_PENALTY_KM
     
-    distance = R * c
-    return distance
+    while True:
+        candidates = garage_index.nearest(client_latitude, client_longitude, k=settings.DISPATCH_CANDIDATES)
+        if not candidates:
+            return None
+        
+        _, garage_id = min(
+            candidates,
+            key=lambda candidate: (candidate[0] + penalty_km * garage_load.get(candidate[1]), candidate[0], candidate[1])
+        )
+        garage = db.query(Garage).filter(Garage.id == garage_id).first()
+        if garage is None:
+            garage_index.remove(garage_id)
+            continue
+        if garage_index.sync_garage(garage):
+            return garage
 
 
-def find_nearest_garage(client_latitude: float, client_longitude: float, db: Session) -> Optional[Garage]:
-    """Trouve le garage le plus proche du client"""
-    # Récupérer tous les garages avec leur localisation
-    garages = db.query(Garage).filter(
+def select_garage_for_demande(client_latitude: float, client_longitude: float, db: Session) -> Optional[Garage]:
+    """Choisit le garage à assigner à une nouvelle demande selon la stratégie configurée (DISPATCH_STRATEGY)"""
+    if settings.DISPATCH_STRATEGY == "load_aware":
+        return find_least_loaded_garage(client_latitude, client_longitude, db)
+    return find_nearest_garage(client_latitude, client_longitude, db)
+
+
+def _bbox_filter(client_latitude: float, client_longitude: float, radius_km: float):
+    """Rectangle sur (latitude, longitude) : utilise l'index idx_garages_location"""
+    lat_min, lat_max, lon_ranges = bounding_box(client_latitude, client_longitude, radius_km)
+    return and_(
+        Garage.latitude.between(lat_min, lat_max),
+        or_(*[Garage.longitude.between(lon_min, lon_max) for lon_min, lon_max in lon_ranges])
+    )
+
+
+def _geohash_filter(client_latitude: float, client_longitude: float, radius_km: float):
+    """Intervalles de préfixes sur garages.geohash (index ix_garages_geohash)"""
+    return prefix_filter(Garage.geohash, covering_prefixes(client_latitude, client_longitude, radius_km))
+
+
+def _nearest_in_area(client_latitude: float, client_longitude: float, radius_km: float, area_filter, db: Session):
+    """Retourne (distance, garage_id) du garage actif le plus proche dans la zone filtrée, ou None"""
+    candidates = db.query(Garage.id, Garage.latitude, Garage.longitude).filter(
+        area_filter(client_latitude, client_longitude, radius_km),
         Garage.latitude.isnot(None),
         Garage.longitude.isnot(None),
-        Garage.statut == StatutGarageEnum.actif  # Seulement les garages actifs
+        Garage.statut == StatutGarageEnum.actif
     ).all()
     
-    if not garages:
+    if not candidates:
         return None
     
-    # Calculer la distance pour chaque garage et trouver le plus proche
-    nearest_garage = None
-    min_distance = float('inf')
-    
-    for garage in garages:
-        try:
-            garage_lat = float(garage.latitude)
-            garage_lon = float(garage.longitude)
-            distance = calculate_distance(client_latitude, client_longitude, garage_lat, garage_lon)
-            
-            if distance < min_distance:
-                min_distance = distance
-                nearest_garage = garage
-        except (ValueError, TypeError):
-            continue  # Ignorer les garages avec coordonnées invalides
-    
-    return nearest_garage
+    # Distances de tous les candidats en une passe vectorisée ; à égalité, le plus petit id
+    arrays = CoordinateArrays(
+        (row[0] for row in candidates),
+        (float(row[1]) for row in candidates),
+        (float(row[2]) for row in candidates)
+    )
+    distances = arrays.distances_from(client_latitude, client_longitude)
+    best = np.lexsort((arrays.ids, distances))[0]
+    return float(distances[best]), int(arrays.ids[best])
+
+
+def _find_nearest_garage_by_area(client_latitude: float, client_longitude: float, area_filter, db: Session) -> Optional[Garage]:
+    """Interroge la base par zones successives de plus en plus larges autour du client
+
+    La zone filtrée doit contenir tout le cercle du rayon demandé. Ne dépend d'aucun cache
+    en mémoire : seuls les garages de la zone sont lus, et la Haversine exacte n'est
+    calculée que sur eux.
+    """
+    radius_km = settings.GARAGE_BBOX_INITIAL_RADIUS_KM
+    while True:
+        best = _nearest_in_area(client_latitude, client_longitude, radius_km, area_filter, db)
+        if best is None:
+            if radius_km >= MAX_DISTANCE_KM:
+                return None
+            # Zone vide : l'élargir
+            radius_km = min(radius_km * settings.GARAGE_BBOX_GROWTH_FACTOR, MAX_DISTANCE_KM)
+            continue
+        
+        distance, garage_id = best
+        if distance > radius_km:
+            # Trouvé dans un coin de la zone : un garage hors de la zone peut être plus proche,
+            # la zone de rayon `distance` (+1 m contre les arrondis) contient forcément le vrai plus proche
+            best = _nearest_in_area(client_latitude, client_longitude, distance + 0.001, area_filter, db) or best
+            distance, garage_id = best
+        return db.query(Garage).filter(Garage.id == garage_id).first()
+
+
+def find_nearest_garage_bbox(client_latitude: float, client_longitude: float, db: Session) -> Optional[Garage]:
+    """Trouve le garage le plus proche du client en interrogeant la base par rectangles successifs"""
+    return _find_nearest_garage_by_area(client_latitude, client_longitude, _bbox_filter, db)
+
+
+def find_nearest_garage_geohash(client_latitude: float, client_longitude: float, db: Session) -> Optional[Garage]:
+    """Trouve le garage le plus proche du client par balayages de préfixes geohash successifs"""
+    return _find_nearest_garage_by_area(client_latitude, client_longitude, _geohash_filter, db)
+
 
 router = APIRouter(prefix="/prestations/demandes", tags=["demandes-prestations"])
 
@@ -92,7 +197,7 @@ def get_demandes_prestations(
     statut: Optional[str] = Query(None),
     garage_id: Optional[int] = Query(None),
     client_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Récupère toutes les demandes de prestations avec les informations des clients, véhicules et services"""
     try:
@@ -228,7 +333,7 @@ def create_demande_prestation(
     demande_data: CreateDemandeRequest,
     db: Session = Depends(get_db)
 ):
-    """Crée une nouvelle demande de prestation avec localisation et trouve automatiquement le garage le plus proche"""
+    """Crée une nouvelle demande de prestation avec localisation et lui assigne automatiquement un garage proche"""
     try:
         # Vérifier que le client existe
         client = db.query(Client).filter(Client.id == demande_data.client_id).first()
@@ -245,8 +350,8 @@ def create_demande_prestation(
         if not service:
             raise HTTPException(status_code=404, detail="Service non trouvé")
         
-        # Trouver le garage le plus proche
-        nearest_garage = find_nearest_garage(
+        # Choisir le garage (le plus proche, ou le moins chargé parmi les plus proches)
+        nearest_garage = select_garage_for_demande(
             demande_data.client_latitude,
             demande_data.client_longitude,
             db
@@ -269,6 +374,7 @@ def create_demande_prestation(
         db.add(nouvelle_demande)
         db.commit()
         db.refresh(nouvelle_demande)
+        garage_load.transition(None, None, nouvelle_demande.garage_id, nouvelle_demande.statut)
         
         return {
             "success": True,
@@ -292,6 +398,149 @@ def create_demande_prestation(
         )
 
 
+@router.get("/proches")
+def get_demandes_proches(
+    garage_id: int = Query(...),
+    radius_km: float = Query(10, gt=0, le=500),
+    statut: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """Récupère les demandes de prestations localisées autour d'un garage, triées par distance"""
+    try:
+        garage = db.query(Garage).filter(Garage.id == garage_id).first()
+        if not garage:
+            raise HTTPException(status_code=404, detail="Garage non trouvé")
+        if garage.latitude is None or garage.longitude is None:
+            raise HTTPException(status_code=400, detail="Le garage n'a pas de localisation")
+        
+        garage_lat = float(garage.latitude)
+        garage_lon = float(garage.longitude)
+        
+        # Balayage des préfixes geohash couvrant le cercle (index sur client_geohash)
+        query = db.query(
+            DemandePrestation.id,
+            DemandePrestation.client_id,
+            DemandePrestation.service_id,
+            DemandePrestation.garage_id,
+            DemandePrestation.statut,
+            DemandePrestation.date_demande,
+            DemandePrestation.client_latitude,
+            DemandePrestation.client_longitude
+        ).filter(
+            prefix_filter(DemandePrestation.client_geohash, covering_prefixes(garage_lat, garage_lon, radius_km))
+        )
+        if statut:
+            query = query.filter(DemandePrestation.statut == statut)
+        
+        rows = [row for row in query.all() if row.client_latitude is not None and row.client_longitude is not None]
+        if not rows:
+            return []
+        
+        # Distances de tous les candidats en une passe vectorisée, puis filtre du rayon et
+        # tri (distance arrondie, id) : seules les `limit` premières lignes sont converties
+        arrays = CoordinateArrays(
+            (row.id for row in rows),
+            (float(row.client_latitude) for row in rows),
+            (float(row.client_longitude) for row in rows)
+        )
+        distances = arrays.distances_from(garage_lat, garage_lon)
+        inside = np.flatnonzero(distances <= radius_km)
+        rounded = np.round(distances, 3)
+        order = inside[np.lexsort((arrays.ids[inside], rounded[inside]))][:limit]
+        
+        demandes = []
+        for position in order.tolist():
+            row = rows[position]
+            demandes.append({
+                "id": row.id,
+                "client_id": row.client_id,
+                "service_id": row.service_id,
+                "garage_id": row.garage_id,
+                "statut": row.statut or 'en_attente',
+                "date_demande": str(row.date_demande) if row.date_demande else None,
+                "client_latitude": arrays.latitudes[position].item(),
+                "client_longitude": arrays.longitudes[position].item(),
+                "distance_km": rounded[position].item()
+            })
+        return demandes
+    except HTTPException:
+        raise
+    except Exception as e:
+        import traceback
+        error_str = str(e)
+        print(f"Erreur lors de la recherche des demandes proches: {error_str}")
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la recherche des demandes proches: {error_str}"
+        )
+
+
+@router.get("/heatmap")
+def get_demandes_heatmap(
+    precision: int = Query(5, ge=1, le=8),
+    statut: Optional[str] = Query(None),
+    service_id: Optional[int] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """Agrège les demandes de prestations par cellule geohash (carte de chaleur), par statut et par service"""
+    try:
+        # Un seul GROUP BY sur le préfixe geohash, servi par l'index couvrant
+        # idx_demandes_geohash_statut_service
+        cell = func.substr(DemandePrestation.client_geohash, 1, precision).label("cell")
+        query = db.query(
+            cell,
+            DemandePrestation.statut,
+            DemandePrestation.service_id,
+            func.count().label("total")
+        ).filter(DemandePrestation.client_geohash.isnot(None))
+        if statut is not None:
+            query = query.filter(DemandePrestation.statut == statut)
+        if service_id is not None:
+            query = query.filter(DemandePrestation.service_id == service_id)
+        rows = query.group_by(cell, DemandePrestation.statut, DemandePrestation.service_id).all()
+        
+        cells = {}
+        for cell_hash, cell_statut, cell_service_id, total in rows:
+            entry = cells.get(cell_hash)
+            if entry is None:
+                lat_min, lat_max, lon_min, lon_max = decode_bbox(cell_hash)
+                entry = {
+                    "geohash": cell_hash,
+                    "latitude": (lat_min + lat_max) / 2,
+                    "longitude": (lon_min + lon_max) / 2,
+                    "lat_min": lat_min,
+                    "lat_max": lat_max,
+                    "lon_min": lon_min,
+                    "lon_max": lon_max,
+                    "total": 0,
+                    "par_statut": {},
+                    "par_service": {}
+                }
+                cells[cell_hash] = entry
+            cell_statut = cell_statut or 'en_attente'
+            entry["total"] += total
+            entry["par_statut"][cell_statut] = entry["par_statut"].get(cell_statut, 0) + total
+            service_key = str(cell_service_id)
+            entry["par_service"][service_key] = entry["par_service"].get(service_key, 0) + total
+        
+        return {
+            "precision": precision,
+            "total": sum(entry["total"] for entry in cells.values()),
+            "cells": sorted(cells.values(), key=lambda entry: entry["total"], reverse=True)
+        }
+    except Exception as e:
+        import traceback
+        error_str = str(e)
+        print(f"Erreur lors du calcul de la carte des demandes: {error_str}")
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors du calcul de la carte des demandes: {error_str}"
+        )
+
+
 @router.get("/{demande_id}")
 def get_demande_prestation(demande_id: int, db: Session = Depends(get_db)):
     """Récupère une demande de prestation par son ID"""
@@ -404,6 +653,7 @@ def accept_demande_prestation(
             raise HTTPException(status_code=404, detail="Garage non trouvé")
         
         # Mettre à jour la demande
+        old_garage_id, old_statut = demande.garage_id, demande.statut
         demande.garage_id = accept_data.garage_id
         demande.statut = 'acceptee'
         if accept_data.prix_estime is not None:
@@ -413,6 +663,7 @@ def accept_demande_prestation(
         
         db.commit()
         db.refresh(demande)
+        garage_load.transition(old_garage_id, old_statut, demande.garage_id, demande.statut)
         
         return {
             "success": True,
@@ -455,9 +706,11 @@ def update_statut_demande(
                 detail=f"Statut invalide. Statuts valides: {', '.join(statuts_valides)}"
             )
         
+        old_statut = demande.statut
         demande.statut = update_data.statut
         db.commit()
         db.refresh(demande)
+        garage_load.transition(demande.garage_id, old_statut, demande.garage_id, demande.statut)
         
         return {
             "success": True,
@@ -487,8 +740,10 @@ def delete_demande_prestation(demande_id: int, db: Session = Depends(get_db)):
         if not demande:
             raise HTTPException(status_code=404, detail="Demande de prestation non trouvée")
         
+        old_garage_id, old_statut = demande.garage_id, demande.statut
         db.delete(demande)
         db.commit()
+        garage_load.transition(old_garage_id, old_statut, None, None)
         
         return {
             "success": True,
@@ -1,13 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
-from models import Garage
-from schemas import Garage as GarageSchema, GarageCreate, GarageUpdate
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from database import get_db, get_async_db
+from models import Garage, StatutGarageEnum
+from schemas import Garage as GarageSchema, GarageCreate, GarageUpdate, GarageNearby
+from garage_index import garage_index
+from nearest_cache import nearest_garage_cache
+from user_roles import reconcile_user_roles
 
 router = APIRouter(prefix="/garages", tags=["garages"])
 
 
+def _on_garage_changed(garage: Garage):
+    """Répercute la création/modification d'un garage sur l'index spatial et le cache du plus proche"""
+    garage_index.sync_garage(garage)
+    nearest_garage_cache.invalidate_garage(
+        garage.id,
+        garage.latitude,
+        garage.longitude,
+        garage.statut == StatutGarageEnum.actif
+    )
+
+
 @router.post("/", response_model=GarageSchema, status_code=201)
 def create_garage(garage_data: GarageCreate, db: Session = Depends(get_db)):
     """Crée un nouveau garage"""
@@ -20,29 +36,80 @@ def create_garage(garage_data: GarageCreate, db: Session = Depends(get_db)):
         email=garage_data.email,
         siret=garage_data.siret,
         specialites=garage_data.specialites,
-        statut=garage_data.statut or "en_attente"
+        statut=garage_data.statut or "en_attente",
+        latitude=garage_data.latitude,
+        longitude=garage_data.longitude
     )
     db.add(new_garage)
+    db.flush()
+    # Les utilisateurs ayant l'email du garage deviennent des comptes garage (même transaction)
+    reconcile_user_roles(db, email=new_garage.email)
     db.commit()
     db.refresh(new_garage)
+    
+    # Mettre à jour l'index spatial et le cache utilisés pour la recherche du garage le plus proche
+    _on_garage_changed(new_garage)
     return new_garage
 
 
 @router.get("/", response_model=List[GarageSchema])
-def get_garages(
+async def get_garages(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Récupère la liste des garages"""
-    garages = db.query(Garage).offset(skip).limit(limit).all()
-    return garages
+    result = await db.execute(select(Garage).offset(skip).limit(limit))
+    return result.scalars().all()
+
+
+@router.get("/nearby", response_model=List[GarageNearby])
+def get_nearby_garages(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: Optional[float] = Query(None, gt=0),
+    k: int = Query(10, ge=1, le=100),
+    skip: int = Query(0, ge=0, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Récupère les k garages actifs les plus proches d'une position, triés par distance croissante"""
+    garage_index.ensure_loaded(db)
+    
+    while True:
+        # Page demandée parmi les plus proches voisins (seuls ces garages sont chargés depuis la base)
+        nearest = garage_index.nearest(lat, lon, k=skip + k, max_distance_km=radius_km)[skip:]
+        if not nearest:
+            return []
+        
+        garages = db.query(Garage).filter(Garage.id.in_([garage_id for _, garage_id in nearest])).all()
+        garages_by_id = {garage.id: garage for garage in garages}
+        
+        # Si l'index était en retard sur la base pour l'un des garages, il vient d'être
+        # corrigé et la page est recalculée
+        stale = False
+        for _, garage_id in nearest:
+            garage = garages_by_id.get(garage_id)
+            if garage is None:
+                garage_index.remove(garage_id)
+                stale = True
+            elif not garage_index.sync_garage(garage):
+                stale = True
+        if stale:
+            continue
+        
+        return [
+            GarageNearby(
+                **GarageSchema.model_validate(garages_by_id[garage_id]).model_dump(),
+                distance_km=round(distance, 3)
+            )
+            for distance, garage_id in nearest
+        ]
 
 
 @router.get("/{garage_id}", response_model=GarageSchema)
-def get_garage(garage_id: int, db: Session = Depends(get_db)):
+async def get_garage(garage_id: int, db: AsyncSession = Depends(get_async_db)):
     """Récupère un garage par son ID"""
-    garage = db.query(Garage).filter(Garage.id == garage_id).first()
+    garage = await db.get(Garage, garage_id)
     if not garage:
         raise HTTPException(status_code=404, detail="Garage non trouvé")
     return garage
@@ -64,7 +131,12 @@ def update_garage(
     for field, value in update_data.items():
         setattr(garage, field, value)
     
+    db.flush()
+    reconcile_user_roles(db, email=garage.email)
     db.commit()
     db.refresh(garage)
+    
+    # Mettre à jour l'index spatial et le cache (statut ou localisation modifiés)
+    _on_garage_changed(garage)
     return garage
 
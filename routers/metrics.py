@@ -0,0 +1,63 @@
+from fastapi import APIRouter
+from nearest_cache import nearest_garage_cache
+from password_pool import password_pool
+from token_cache import token_claims_cache
+from user_cache import current_user_cache
+from login_throttle import login_throttle
+from token_revocation import token_revocation
+from database import replica_pool, read_your_writes
+from pool_metrics import pool_monitors
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/nearest-garage-cache")
+def get_nearest_garage_cache_metrics():
+    """Compteurs du cache du garage le plus proche (succès, échecs, invalidations) pour ce worker"""
+    return nearest_garage_cache.stats()
+
+
+@router.get("/password-pool")
+def get_password_pool_metrics():
+    """Profondeur de file et temps d'attente du pool bcrypt de ce worker"""
+    return password_pool.stats()
+
+
+@router.get("/token-cache")
+def get_token_cache_metrics():
+    """Compteurs du cache des tokens JWT vérifiés pour ce worker"""
+    return token_claims_cache.stats()
+
+
+@router.get("/user-cache")
+def get_user_cache_metrics():
+    """Compteurs du cache des utilisateurs authentifiés pour ce worker"""
+    return current_user_cache.stats()
+
+
+@router.get("/login-throttle")
+def get_login_throttle_metrics():
+    """Clés suivies et tentatives de connexion refusées par ce worker"""
+    return login_throttle.stats()
+
+
+@router.get("/token-revocation")
+def get_token_revocation_metrics():
+    """Révocations connues de ce worker et taille du filtre de Bloom"""
+    return token_revocation.stats()
+
+
+@router.get("/replicas")
+def get_replica_metrics():
+    """État des réplicas en lecture et clients lisant sur le primaire après une écriture (ce worker)"""
+    return {
+        **replica_pool.stats(),
+        "read_your_writes_seconds": read_your_writes.window_seconds,
+        "recent_writers": read_your_writes.size()
+    }
+
+
+@router.get("/db-pool")
+def get_db_pool_metrics():
+    """Attente, connexions empruntées, débordement et âge des connexions de chaque pool (ce worker)"""
+    return {name: monitor.stats() for name, monitor in pool_monitors.items()}
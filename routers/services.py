@@ -1,48 +1,49 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from database import get_db
+from database import get_db, get_async_db
 from models import Service
 from schemas import ServiceCreate, ServiceUpdate, Service as ServiceSchema
-from sqlalchemy import or_
+from sqlalchemy import or_, select
 
 router = APIRouter(prefix="/services", tags=["services"])
 
 
 @router.get("/", response_model=List[ServiceSchema])
-def get_services(
+async def get_services(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     categorie: Optional[str] = Query(None),
     statut: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Récupère la liste des services avec pagination et filtres"""
-    query = db.query(Service)
+    query = select(Service)
     
     if categorie:
-        query = query.filter(Service.categorie == categorie)
+        query = query.where(Service.categorie == categorie)
     
     if statut:
-        query = query.filter(Service.statut == statut)
+        query = query.where(Service.statut == statut)
     
     if search:
-        query = query.filter(
+        query = query.where(
             or_(
                 Service.nom.ilike(f"%{search}%"),
                 Service.description.ilike(f"%{search}%")
             )
         )
     
-    services = query.offset(skip).limit(limit).all()
-    return services
+    result = await db.execute(query.offset(skip).limit(limit))
+    return result.scalars().all()
 
 
 @router.get("/{service_id}", response_model=ServiceSchema)
-def get_service(service_id: int, db: Session = Depends(get_db)):
+async def get_service(service_id: int, db: AsyncSession = Depends(get_async_db)):
     """Récupère un service par son ID"""
-    service = db.query(Service).filter(Service.id == service_id).first()
+    service = await db.get(Service, service_id)
     if not service:
         raise HTTPException(status_code=404, detail="Service non trouvé")
     return service
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from database import get_db
+from database import get_db, get_read_db
 from models import Vehicule, Client, DemandePrestation
 from schemas import VehiculeCreate, VehiculeUpdate, Vehicule as VehiculeSchema
 from sqlalchemy import or_, text
@@ -181,7 +181,7 @@ def delete_vehicule(vehicule_id: int, db: Session = Depends(get_db)):
 @router.get("/garage/{garage_id}")
 def get_vehicules_by_garage(
     garage_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Récupère les véhicules d'un garage basés sur les demandes acceptées/en cours (pas terminées)"""
     try:
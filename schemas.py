@@ -324,6 +324,8 @@ class GarageBase(BaseModel):
     siret: Optional[str] = Field(None, max_length=14)
     specialites: Optional[str] = None
     statut: Optional[str] = "en_attente"
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 
 class GarageCreate(GarageBase):
@@ -340,6 +342,8 @@ class GarageUpdate(BaseModel):
     siret: Optional[str] = Field(None, max_length=14)
     specialites: Optional[str] = None
     statut: Optional[str] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 
 class Garage(GarageBase):
@@ -350,3 +354,6 @@ class Garage(GarageBase):
     class Config:
         from_attributes = True
 
+
+class GarageNearby(Garage):
+    distance_km: float
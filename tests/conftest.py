@@ -0,0 +1,139 @@
+"""
+Configuration commune des tests (py -m pytest)
+
+Les tests tournent sur une base SQLite temporaire (DATABASE_URL), sans serveur MySQL :
+les variables d'environnement sont fixées avant le premier import de config.
+"""
+import os
+import tempfile
+
+_DB_DIR = tempfile.mkdtemp(prefix="garage-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'garage_test.db')}"
+os.environ["DB_STARTUP_MODE"] = "skip"
+os.environ["DB_POOL_WARMUP"] = "False"
+os.environ["BCRYPT_CALIBRATE"] = "False"
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["BCRYPT_MIN_ROUNDS"] = "4"
+os.environ["PASSWORD_POOL_WORKERS"] = "2"
+
+import pytest
+from datetime import timedelta
+from fastapi.testclient import TestClient
+
+import database
+import models  # noqa: F401 - enregistre les tables métier sur Base.metadata
+import models_auth  # noqa: F401 - enregistre les tables d'authentification sur Base.metadata
+from database import Base, SessionLocal
+from models import Client, Garage, Service, Vehicule
+from models_auth import Utilisateur, RoleEnum
+from password_pool import get_password_hash, password_pool
+
+
+def reset_worker_state():
+    """Vide les index, caches et compteurs en mémoire du worker (partagés entre les tests)"""
+    from garage_index import garage_index
+    from garage_load import garage_load
+    from nearest_cache import nearest_garage_cache
+    from token_cache import token_claims_cache
+    from token_revocation import token_revocation
+    from user_cache import current_user_cache
+    from login_throttle import login_throttle, TokenBucketLimiter
+
+    garage_index.invalidate()
+    garage_load.invalidate()
+    # Caches recréés avec leurs réglages : contenu et compteurs (hits, misses...) remis à zéro
+    nearest_garage_cache.__init__(nearest_garage_cache.max_size, nearest_garage_cache.precision,
+                                  nearest_garage_cache.ttl_seconds)
+    token_claims_cache.__init__(token_claims_cache.max_size, token_claims_cache.ttl_seconds)
+    token_revocation.__init__(token_revocation.sync_seconds, token_revocation._bloom.capacity)
+    current_user_cache.__init__(
+        current_user_cache.max_size,
+        current_user_cache.ttl_seconds,
+        current_user_cache.version_check_seconds
+    )
+    for name in ("ip_limiter", "email_limiter"):
+        limiter = getattr(login_throttle, name)
+        setattr(login_throttle, name, TokenBucketLimiter(
+            burst=limiter.burst,
+            per_minute=limiter.rate * 60,
+            shards=len(limiter._shards),
+            max_keys=limiter.max_keys_per_shard * len(limiter._shards)
+        ))
+
+
+@pytest.fixture
+def clean_db():
+    """Tables recréées (vides) sur le moteur de l'application, état en mémoire remis à zéro"""
+    Base.metadata.drop_all(bind=database.engine)
+    Base.metadata.create_all(bind=database.engine)
+    reset_worker_state()
+    yield
+    database.engine.dispose()
+    if database.async_engine is not None:
+        database.async_engine.sync_engine.dispose()
+
+
+@pytest.fixture
+def db(clean_db):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(clean_db):
+    """Client HTTP de l'application complète (sans la phase de démarrage)"""
+    from main import app
+    return TestClient(app)
+
+
+def make_user(db, email="admin@example.com", password="secret", role=RoleEnum.admin.value, **fields):
+    """Crée un utilisateur (mot de passe haché au coût courant) et le retourne"""
+    user = Utilisateur(
+        nom=fields.pop("nom", "Test"),
+        prenom=fields.pop("prenom", "Utilisateur"),
+        email=email,
+        mot_de_passe=get_password_hash(password, password_pool.rounds),
+        role=role,
+        **fields
+    )
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def auth_headers(user) -> dict:
+    """En-tête Authorization d'un token valide pour cet utilisateur"""
+    from routers.auth import create_access_token
+    token = create_access_token(
+        data={"sub": str(user.id), "email": user.email, "role": user.role},
+        expires_delta=timedelta(minutes=30)
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def admin_headers(db):
+    return auth_headers(make_user(db))
+
+
+def add_garage(db, latitude, longitude, statut="actif", **fields):
+    garage = Garage(nom_garage=fields.pop("nom_garage", "Garage"), statut=statut,
+                    latitude=latitude, longitude=longitude, **fields)
+    db.add(garage)
+    db.commit()
+    db.refresh(garage)
+    return garage
+
+
+@pytest.fixture
+def basic_data(db):
+    """Un client, un service et un véhicule (ids 1) pour créer des demandes"""
+    db.add(Client(nom="Client", telephone="0100000000"))
+    db.add(Service(nom="Vidange", prix=50))
+    db.commit()
+    db.add(Vehicule(client_id=1, marque="Renault", modele="Clio", immatriculation="AB-123-CD"))
+    db.commit()
@@ -0,0 +1,58 @@
+"""
+Routes de lecture sur AsyncSession (get_async_db) : garages, services, clients
+"""
+import asyncio
+
+import httpx
+
+import main
+from config import settings
+from conftest import add_garage
+from models import Client, Service
+
+
+def test_async_database_url():
+    assert settings.async_database_url.startswith("sqlite+aiosqlite:")
+
+
+def test_garage_routes(client, db):
+    first = add_garage(db, 5.0, -4.0, nom_garage="Garage A")
+    add_garage(db, 6.0, -4.0, nom_garage="Garage B")
+    garages = client.get("/garages/").json()
+    assert [garage["nom_garage"] for garage in garages] == ["Garage A", "Garage B"]
+    assert [garage["id"] for garage in client.get("/garages/", params={"skip": 1}).json()] == [garages[1]["id"]]
+    assert client.get(f"/garages/{first.id}").json()["nom_garage"] == "Garage A"
+    assert client.get("/garages/999").status_code == 404
+
+
+def test_service_and_client_routes(client, db, basic_data):
+    db.add_all([Service(nom="Freinage", description="Plaquettes", categorie="securite", prix=80, statut="inactif"),
+                Client(nom="Martin", prenom="Luc", telephone="0611111111", email="luc@example.com")])
+    db.commit()
+    assert [s["nom"] for s in client.get("/services/", params={"search": "plaq"}).json()] == ["Freinage"]
+    assert [s["nom"] for s in client.get("/services/", params={"statut": "inactif"}).json()] == ["Freinage"]
+    assert client.get("/services/1").json()["nom"] == "Vidange"
+    assert client.get("/services/999").status_code == 404
+
+    assert [c["nom"] for c in client.get("/clients/", params={"search": "luc@"}).json()] == ["Martin"]
+    assert len(client.get("/clients/").json()) == 2
+    assert client.get("/clients/999").status_code == 404
+    assert client.get("/clients/", params={"limit": 0}).status_code == 422
+
+
+def test_concurrent_reads_without_threadpool(db, monkeypatch):
+    add_garage(db, 5.0, -4.0)
+
+    async def scenario():
+        # Un seul thread : les routes asynchrones ne l'occupent pas pendant l'attente de la base
+        import anyio.to_thread
+        anyio.to_thread.current_default_thread_limiter().total_tokens = 1
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            responses = await asyncio.gather(*[http.get("/garages/") for _ in range(50)])
+        from database import async_engine
+        await async_engine.dispose()
+        return responses
+
+    responses = asyncio.run(scenario())
+    assert all(response.status_code == 200 and len(response.json()) == 1 for response in responses)
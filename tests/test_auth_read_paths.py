@@ -0,0 +1,79 @@
+"""
+Routes d'authentification en lecture seule et réconciliation des rôles (user_roles)
+"""
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+import database
+from conftest import add_garage, auth_headers, make_user
+from models_auth import Utilisateur
+from user_roles import reconcile_user_roles
+
+
+@contextmanager
+def recorded_writes():
+    """Requêtes INSERT/UPDATE/DELETE exécutées sur le moteur principal pendant le bloc"""
+    writes = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().split(" ", 1)[0].upper() in ("INSERT", "UPDATE", "DELETE"):
+            writes.append(statement)
+
+    event.listen(database.engine, "before_cursor_execute", record)
+    try:
+        yield writes
+    finally:
+        event.remove(database.engine, "before_cursor_execute", record)
+
+
+def test_login_and_me_do_not_write(client, db):
+    # Utilisateur déjà incohérent avec les garages : la lecture ne le corrige plus
+    user = make_user(db, email="garage@example.com", password="secret", role="client")
+    add_garage(db, 5.0, -4.0, email="garage@example.com")
+    with recorded_writes() as writes:
+        login = client.post("/auth/login", json={"email": "garage@example.com", "password": "secret"})
+        assert login.status_code == 200
+        me = client.get("/auth/me", headers={"Authorization": f"Bearer {login.json()['token']}"})
+        assert me.status_code == 200
+    assert writes == []
+    assert me.json()["role"] == "client" and me.json()["id"] == user.id
+
+
+def test_reconcile_single_email(db):
+    garage_user = make_user(db, email="Garage@Example.com", role="client")
+    other = make_user(db, email="autre@example.com", role="client")
+    garage = add_garage(db, 5.0, -4.0, email="garage@example.com")
+    assert reconcile_user_roles(db, email="GARAGE@example.com") == 1
+    db.commit()
+    db.expire_all()
+    assert (garage_user.role, garage_user.garage_id) == ("garage", garage.id)
+    assert other.role == "client"
+    assert reconcile_user_roles(db) == 0
+
+
+def test_garage_id_implies_garage_role(db):
+    user = make_user(db, email="mecano@example.com", role="client", garage_id=42)
+    assert reconcile_user_roles(db) == 1
+    db.commit()
+    db.expire_all()
+    assert user.role == "garage" and user.garage_id == 42
+
+
+def test_garage_creation_reconciles_its_email(client, db):
+    user = make_user(db, email="atelier@example.com", role="client")
+    headers = auth_headers(user)
+    assert client.get("/auth/me", headers=headers).json()["role"] == "client"
+    response = client.post("/garages/", json={"nom_garage": "Atelier", "email": "atelier@example.com", "statut": "actif"})
+    assert response.status_code == 201
+    me = client.get("/auth/me", headers=headers).json()
+    assert (me["role"], me["garage_id"]) == ("garage", response.json()["id"])
+
+
+def test_reconcile_endpoint(client, db, admin_headers):
+    make_user(db, email="a@example.com", role="client", garage_id=1)
+    make_user(db, email="b@example.com", role="client", garage_id=2)
+    response = client.post("/admin/utilisateurs/reconcile-roles", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json()["corrected_count"] == 2
+    assert db.query(Utilisateur).filter(Utilisateur.role == "garage").count() == 2
@@ -0,0 +1,81 @@
+"""
+Recherche SQL du garage le plus proche par rectangles successifs (GARAGE_SEARCH_MODE=bbox)
+"""
+import random
+
+import pytest
+
+from config import Settings, settings
+from conftest import add_garage
+from geo_distance import bounding_box, calculate_distance
+from models import Garage
+from routers import demandes_prestations
+from routers.demandes_prestations import find_nearest_garage_bbox, find_nearest_garage_index
+
+
+def _seed_garages(db, seed, count):
+    rnd = random.Random(seed)
+    for i in range(count):
+        if i % 2:
+            latitude, longitude = rnd.uniform(5, 5.6), rnd.uniform(-4.3, -3.6)
+        else:
+            latitude, longitude = rnd.uniform(-89.9, 89.9), rnd.uniform(-180, 180)
+        db.add(Garage(nom_garage=f"Garage {i}", statut="actif" if i % 4 else "inactif",
+                      latitude=round(latitude, 8), longitude=round(longitude, 8)))
+    db.commit()
+    return rnd
+
+
+def test_bbox_matches_index(db):
+    rnd = _seed_garages(db, 5, 600)
+    queries = [(rnd.uniform(-90, 90), rnd.uniform(-180, 180)) for _ in range(60)]
+    queries += [(rnd.uniform(5, 5.6), rnd.uniform(-4.3, -3.6)) for _ in range(40)]
+    queries += [(89.99, 179.9), (0.0, 179.999), (-89.99, -179.99)]
+    for latitude, longitude in queries:
+        assert find_nearest_garage_bbox(latitude, longitude, db).id == find_nearest_garage_index(latitude, longitude, db).id
+
+
+def test_corner_candidate_is_not_returned_blindly(db, monkeypatch):
+    monkeypatch.setattr(settings, "GARAGE_BBOX_INITIAL_RADIUS_KM", 10.0)
+    # Dans le coin du rectangle de 10 km (≈ 12.6 km), alors qu'un garage à 11 km est hors du rectangle
+    corner = add_garage(db, 5.0 + 0.0805, -4.0 + 0.0808)
+    closer = add_garage(db, 5.0 + 0.099, -4.0)
+    assert calculate_distance(5.0, -4.0, 5.099, -4.0) < calculate_distance(5.0, -4.0, 5.0805, -3.9192)
+    assert find_nearest_garage_bbox(5.0, -4.0, db).id == closer.id != corner.id
+
+
+def test_empty_table_terminates(db):
+    add_garage(db, 5.0, -4.0, statut="inactif")
+    assert find_nearest_garage_bbox(5.0, -4.0, db) is None
+
+
+def test_search_mode_setting(db, monkeypatch):
+    garage = add_garage(db, 48.85, 2.35)
+    monkeypatch.setattr(settings, "GARAGE_SEARCH_MODE", "bbox")
+    calls = []
+    monkeypatch.setattr(demandes_prestations, "find_nearest_garage_index", lambda *args: calls.append(args))
+    assert demandes_prestations.find_nearest_garage(48.8, 2.3, db).id == garage.id
+    assert calls == []
+
+
+@pytest.mark.parametrize("latitude, longitude, radius_km", [
+    (0.0, 179.95, 50), (0.0, -179.95, 50), (89.5, 10.0, 100), (-89.5, 10.0, 100), (45.0, 2.0, 300)
+])
+def test_bounding_box_contains_circle(latitude, longitude, radius_km):
+    lat_min, lat_max, lon_ranges = bounding_box(latitude, longitude, radius_km)
+    rnd = random.Random(7)
+    for _ in range(2000):
+        point_lat = latitude + rnd.uniform(-1, 1) * radius_km / 111
+        point_lon = ((longitude + rnd.uniform(-1, 1) * radius_km / 20) + 180) % 360 - 180
+        if not -90 <= point_lat <= 90 or calculate_distance(latitude, longitude, point_lat, point_lon) > radius_km:
+            continue
+        assert lat_min <= point_lat <= lat_max
+        assert any(lon_min <= point_lon <= lon_max for lon_min, lon_max in lon_ranges)
+
+
+def test_search_area_settings_are_bounded():
+    # Un rayon nul ou un facteur <= 1 n'élargirait jamais une zone vide
+    bounded = Settings(GARAGE_BBOX_INITIAL_RADIUS_KM=0, GARAGE_BBOX_GROWTH_FACTOR=1)
+    assert bounded.GARAGE_BBOX_INITIAL_RADIUS_KM == 0.1
+    assert bounded.GARAGE_BBOX_GROWTH_FACTOR == 1.5
+    assert Settings(GARAGE_BBOX_GROWTH_FACTOR=8).GARAGE_BBOX_GROWTH_FACTOR == 8
@@ -0,0 +1,85 @@
+"""
+Coût bcrypt partagé entre workers, recalcul des hashes trop faibles et calibration au démarrage
+"""
+import asyncio
+
+import main
+from conftest import make_user
+from models_auth import Utilisateur
+from password_pool import PasswordWorkerPool, get_password_hash, hash_rounds, password_pool, shared_rounds
+
+
+def test_first_calibrated_cost_wins(db):
+    assert shared_rounds(db) is None
+    assert shared_rounds(db, 6) == 6
+    # Un autre worker calibre plus tard : le coût déjà enregistré l'emporte
+    assert shared_rounds(db, 9) == 6
+    assert shared_rounds(db) == 6
+
+
+def test_needs_rehash_only_upward():
+    pool = PasswordWorkerPool(mode="thread", max_workers=1, rounds=5)
+    try:
+        assert pool.needs_rehash(get_password_hash("x", 4)) is True
+        assert pool.needs_rehash(get_password_hash("x", 5)) is False
+        assert pool.needs_rehash(get_password_hash("x", 6)) is False
+        assert pool.needs_rehash("pas-un-hash") is True
+    finally:
+        pool.shutdown()
+
+
+def test_login_rehashes_weaker_hash(client, db, monkeypatch):
+    monkeypatch.setattr(password_pool, "rounds", 5)
+    user = make_user(db, email="jean@example.com", password="secret")
+    user.mot_de_passe = get_password_hash("secret", 4)
+    db.commit()
+
+    response = client.post("/auth/login", json={"email": "jean@example.com", "password": "secret"})
+    assert response.status_code == 200
+    db.expire_all()
+    new_hash = db.get(Utilisateur, user.id).mot_de_passe
+    assert hash_rounds(new_hash) == 5
+    # Le nouveau hash reste valide, sans nouveau recalcul
+    assert client.post("/auth/login", json={"email": "jean@example.com", "password": "secret"}).status_code == 200
+    db.expire_all()
+    assert db.get(Utilisateur, user.id).mot_de_passe == new_hash
+
+
+def test_calibration_reuses_stored_cost(db, monkeypatch):
+    shared_rounds(db, 6)
+
+    async def calibrate(target_ms, min_rounds):
+        raise AssertionError("coût déjà enregistré : pas de calibration")
+
+    monkeypatch.setattr(password_pool, "calibrate", calibrate)
+    monkeypatch.setattr(password_pool, "rounds", 4)
+    asyncio.run(main._calibrate_bcrypt())
+    assert password_pool.rounds == 6
+
+
+def test_calibration_only_after_database_is_ready(monkeypatch):
+    calibrations = []
+
+    async def calibrate():
+        calibrations.append(True)
+
+    def scenario(prepared):
+        async def prepare(status):
+            return prepared
+
+        async def run():
+            async with main.lifespan(main.app):
+                if prepared:
+                    # Calibration lancée en arrière-plan une fois la base prête
+                    await main.app.state.bcrypt_calibration
+
+        monkeypatch.setattr(main, "_prepare_database", prepare)
+        asyncio.run(run())
+
+    monkeypatch.setattr(main, "_calibrate_bcrypt", calibrate)
+    monkeypatch.setattr(main.settings, "BCRYPT_CALIBRATE", True)
+    monkeypatch.setattr(main.settings, "DB_STARTUP_MODE", "blocking")
+    scenario(False)
+    assert calibrations == []
+    scenario(True)
+    assert calibrations == [True]
@@ -0,0 +1,56 @@
+"""
+Suite de benchmarks : outils de mesure, données synthétiques et exécution réduite de bench_dispatch
+"""
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.measure import measure_allocations, percentile, time_calls
+from benchmarks.synthetic import generate_clients, generate_garages
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_percentile_interpolates():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([10.0], 0.99) == 10.0
+    assert percentile([0.0, 10.0], 0.5) == 5.0
+    assert percentile([1.0, 2.0, 3.0, 4.0, 5.0], 0.95) == 4.8
+
+
+def test_time_calls_and_allocations():
+    calls = [(n,) for n in range(50)]
+    timings = time_calls(lambda n: sum(range(n)), calls)
+    assert timings["calls"] == 50
+    assert 0 <= timings["p50_us"] <= timings["p95_us"] <= timings["p99_us"]
+
+    allocations = measure_allocations(lambda n: [0] * 1000, calls)
+    assert allocations["peak_bytes_max"] >= 8000
+    assert allocations["net_bytes_per_call"] < 1000
+
+
+def test_synthetic_data_is_deterministic():
+    assert generate_garages(50) == generate_garages(50)
+    assert generate_clients(20) == generate_clients(20)
+    assert generate_clients(20) != generate_clients(20, seed=8)
+    statuts = {garage["statut"] for garage in generate_garages(500)}
+    assert statuts == {"actif", "inactif"}
+
+
+def test_dispatch_benchmark_runs_and_compares(tmp_path):
+    output = tmp_path / "results.json"
+    env = {**os.environ, "BENCH_DB_PATH": str(tmp_path / "bench.db")}
+    command = [sys.executable, "-m", "benchmarks.bench_dispatch", "--garages", "100", "--requests", "10",
+               "--modes", "index", "bbox", "--no-allocations"]
+    subprocess.run(command + ["--save-baseline", str(output)], cwd=ROOT, env=env, check=True, capture_output=True)
+
+    results = json.loads(output.read_text())
+    assert results["meta"]["requests"] == 10
+    metrics = results["results"]["100"]
+    for name in ("calculate_distance", "find_nearest_garage[index]", "find_nearest_garage[bbox]", "post_demande_http"):
+        assert metrics[name]["calls"] == 10
+
+    completed = subprocess.run(command + ["--compare", str(output)], cwd=ROOT, env=env, check=True,
+                               capture_output=True, text=True)
+    assert "Comparaison avec la référence" in completed.stdout
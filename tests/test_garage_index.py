@@ -0,0 +1,96 @@
+"""
+Index spatial des garages (garage_index) et recherche du garage le plus proche
+"""
+import random
+
+from conftest import add_garage
+from garage_index import GarageSpatialIndex
+from geo_distance import calculate_distance
+from models import Garage
+from routers.demandes_prestations import find_nearest_garage
+
+
+def _index(positions):
+    index = GarageSpatialIndex(ttl_seconds=0)
+    index._positions = dict(positions)
+    return index
+
+
+def _brute_force(positions, latitude, longitude):
+    """(distance, id) triés, à égalité le plus petit id (comme ORDER BY distance, id)"""
+    return sorted((calculate_distance(latitude, longitude, *position), garage_id)
+                  for garage_id, position in positions.items())
+
+
+def test_nearest_matches_brute_force():
+    rnd = random.Random(3)
+    positions = {i: (rnd.uniform(-80, 80), rnd.uniform(-180, 180)) for i in range(1, 2001)}
+    index = _index(positions)
+    for _ in range(200):
+        latitude, longitude = rnd.uniform(-90, 90), rnd.uniform(-180, 180)
+        expected = _brute_force(positions, latitude, longitude)
+        (distance, garage_id), = index.nearest(latitude, longitude)
+        assert garage_id == expected[0][1]
+        assert abs(distance - expected[0][0]) < 1e-6
+
+
+def test_k_nearest_within_radius():
+    rnd = random.Random(4)
+    positions = {i: (rnd.uniform(5, 6), rnd.uniform(-4, -3)) for i in range(1, 501)}
+    index = _index(positions)
+    for _ in range(50):
+        latitude, longitude = rnd.uniform(5, 6), rnd.uniform(-4, -3)
+        expected = [entry for entry in _brute_force(positions, latitude, longitude) if entry[0] <= 20][:5]
+        found = index.nearest(latitude, longitude, k=5, max_distance_km=20)
+        assert [garage_id for _, garage_id in found] == [garage_id for _, garage_id in expected]
+
+
+def test_antimeridian_and_poles():
+    positions = {1: (0.0, 179.9), 2: (0.0, -179.95), 3: (89.9, 0.0), 4: (-89.9, 90.0)}
+    index = _index(positions)
+    assert index.nearest(0.0, -179.99)[0][1] == 2
+    assert index.nearest(0.0, 179.99)[0][1] == 2
+    assert index.nearest(89.99, 170.0)[0][1] == 3
+    assert index.nearest(-89.99, -90.0)[0][1] == 4
+
+
+def test_ties_resolved_by_lowest_id():
+    # Garages symétriques par rapport à l'équateur, et garages à la même adresse : distances égales
+    positions = {10: (-0.25, 2.0), 3: (0.25, 2.0), 7: (0.0, 2.5)}
+    assert [garage_id for _, garage_id in _index(positions).nearest(0.0, 2.0, k=2)] == [3, 10]
+    positions = {5: (45.0, 2.0), 2: (45.0, 2.0), 8: (45.0, 2.0)}
+    assert [garage_id for _, garage_id in _index(positions).nearest(45.1, 2.1, k=3)] == [2, 5, 8]
+
+
+def test_empty_index():
+    assert _index({}).nearest(5.0, -4.0) == []
+    assert _index({1: (5.0, -4.0)}).nearest(5.0, -4.0, k=0) == []
+
+
+def test_upsert_and_remove():
+    index = _index({1: (5.0, -4.0)})
+    assert index.upsert(2, 5.001, -4.0, True) is False
+    assert index.nearest(5.001, -4.0)[0][1] == 2
+    assert index.upsert(2, 5.001, -4.0, True) is True
+    index.remove(2)
+    assert index.nearest(5.001, -4.0)[0][1] == 1
+    # Garage inactif : retiré de l'index
+    index.upsert(1, 5.0, -4.0, False)
+    assert index.nearest(5.0, -4.0) == []
+
+
+def test_find_nearest_garage_uses_database_state(db):
+    near = add_garage(db, 5.30, -4.00)
+    far = add_garage(db, 5.60, -4.00)
+    add_garage(db, 5.31, -4.00, statut="inactif")
+    add_garage(db, None, None)
+    assert find_nearest_garage(5.30, -4.00, db).id == near.id
+
+    # Garage désactivé sans passer par les routes (autre worker) : l'index se corrige
+    db.query(Garage).filter(Garage.id == near.id).update({"statut": "inactif"})
+    db.commit()
+    assert find_nearest_garage(5.30, -4.00, db).id == far.id
+
+
+def test_find_nearest_garage_without_garages(db):
+    assert find_nearest_garage(5.0, -4.0, db) is None
@@ -0,0 +1,67 @@
+"""
+GET /garages/nearby : k plus proches et recherche par rayon
+"""
+from conftest import add_garage
+from geo_distance import calculate_distance
+from models import Garage
+
+
+def _create_garages(client):
+    ids = []
+    for i in range(12):
+        response = client.post("/garages/", json={
+            "nom_garage": f"Garage {i}",
+            "statut": "actif" if i % 4 else "inactif",
+            "latitude": 5.0 + i * 0.01,
+            "longitude": -4.0
+        })
+        assert response.status_code == 201, response.text
+        ids.append(response.json()["id"])
+    return ids
+
+
+def test_k_nearest_sorted_by_distance(client):
+    ids = _create_garages(client)
+    response = client.get("/garages/nearby", params={"lat": 5.0, "lon": -4.0, "k": 3})
+    assert response.status_code == 200
+    found = response.json()
+    # Garages 0, 4 et 8 inactifs
+    assert [garage["id"] for garage in found] == [ids[1], ids[2], ids[3]]
+    assert found[0]["distance_km"] == round(calculate_distance(5.0, -4.0, 5.01, -4.0), 3)
+    assert [garage["distance_km"] for garage in found] == sorted(garage["distance_km"] for garage in found)
+
+
+def test_pagination_and_radius(client):
+    ids = _create_garages(client)
+    page = client.get("/garages/nearby", params={"lat": 5.0, "lon": -4.0, "k": 3, "skip": 3}).json()
+    assert [garage["id"] for garage in page] == [ids[5], ids[6], ids[7]]
+
+    # 0.035° de latitude ≈ 3.9 km : garages 1 à 3
+    within = client.get("/garages/nearby", params={"lat": 5.0, "lon": -4.0, "radius_km": 3.9}).json()
+    assert [garage["id"] for garage in within] == [ids[1], ids[2], ids[3]]
+    assert all(garage["distance_km"] <= 3.9 for garage in within)
+
+
+def test_follows_garage_updates(client):
+    ids = _create_garages(client)
+    assert client.put(f"/garages/{ids[1]}", json={"statut": "inactif"}).status_code == 200
+    nearest = client.get("/garages/nearby", params={"lat": 5.0, "lon": -4.0, "k": 1}).json()
+    assert nearest[0]["id"] == ids[2]
+
+
+def test_index_corrected_from_database(client, db):
+    near = add_garage(db, 5.0, -4.0)
+    far = add_garage(db, 5.5, -4.0)
+    assert client.get("/garages/nearby", params={"lat": 5.0, "lon": -4.0, "k": 1}).json()[0]["id"] == near.id
+
+    # Modification faite hors de ce worker : corrigée à la lecture de la page
+    db.query(Garage).filter(Garage.id == near.id).update({"statut": "inactif"})
+    db.commit()
+    assert [g["id"] for g in client.get("/garages/nearby", params={"lat": 5.0, "lon": -4.0}).json()] == [far.id]
+
+
+def test_invalid_parameters(client):
+    assert client.get("/garages/nearby", params={"lat": 95, "lon": 0}).status_code == 422
+    assert client.get("/garages/nearby", params={"lat": 0, "lon": 0, "k": 0}).status_code == 422
+    assert client.get("/garages/nearby", params={"lat": 0, "lon": 0, "radius_km": 0}).status_code == 422
+    assert client.get("/garages/nearby", params={"lat": 0, "lon": 0}).json() == []
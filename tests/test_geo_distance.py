@@ -0,0 +1,100 @@
+"""
+Distances vectorisées (geo_distance.CoordinateArrays) et recherches en masse de l'index
+"""
+import random
+
+import numpy as np
+
+import garage_index as garage_index_module
+from garage_index import GarageSpatialIndex
+from geo_distance import CoordinateArrays, calculate_distance
+
+
+def _random_arrays(rnd, count):
+    ids = list(range(1, count + 1))
+    latitudes = [rnd.uniform(-89, 89) for _ in ids]
+    longitudes = [rnd.uniform(-180, 180) for _ in ids]
+    return CoordinateArrays(ids, latitudes, longitudes), latitudes, longitudes
+
+
+def test_distances_from_matches_scalar_haversine():
+    rnd = random.Random(1)
+    arrays, latitudes, longitudes = _random_arrays(rnd, 500)
+    distances = arrays.distances_from(12.5, -3.25)
+    expected = [calculate_distance(12.5, -3.25, lat, lon) for lat, lon in zip(latitudes, longitudes)]
+    np.testing.assert_allclose(distances, expected, rtol=1e-12, atol=1e-9)
+    np.testing.assert_allclose(arrays.distances_from(12.5, -3.25, 100, 200), expected[100:200], rtol=1e-12, atol=1e-9)
+
+
+def test_distance_matrix_and_nearest_many():
+    rnd = random.Random(2)
+    arrays, latitudes, longitudes = _random_arrays(rnd, 300)
+    client_lats = [rnd.uniform(-90, 90) for _ in range(40)]
+    client_lons = [rnd.uniform(-180, 180) for _ in range(40)]
+
+    matrix = arrays.distance_matrix(client_lats, client_lons)
+    assert matrix.shape == (40, 300)
+    for row, (lat, lon) in enumerate(zip(client_lats, client_lons)):
+        np.testing.assert_allclose(matrix[row], arrays.distances_from(lat, lon))
+
+    positions, distances = arrays.nearest_many(client_lats, client_lons)
+    np.testing.assert_array_equal(positions, np.argmin(matrix, axis=1))
+    np.testing.assert_allclose(distances, matrix.min(axis=1))
+
+
+def test_nearest_many_without_garages():
+    positions, distances = CoordinateArrays([], [], []).nearest_many([1.0, 2.0], [3.0, 4.0])
+    assert positions.tolist() == [-1, -1]
+    assert np.isinf(distances).all()
+
+
+def test_take_reorders_all_arrays():
+    arrays = CoordinateArrays([7, 8, 9], [1.0, 2.0, 3.0], [4.0, 5.0, 6.0])
+    subset = arrays.take(np.array([2, 0]))
+    assert subset.ids.tolist() == [9, 7]
+    np.testing.assert_allclose(subset.distances_from(0.0, 0.0), arrays.distances_from(0.0, 0.0)[[2, 0]])
+
+
+def _spatial_index(positions):
+    index = GarageSpatialIndex(ttl_seconds=0)
+    index._positions = dict(positions)
+    return index
+
+
+def test_index_nearest_many_matches_tree_search(monkeypatch):
+    rnd = random.Random(3)
+    positions = {i: (rnd.uniform(-80, 80), rnd.uniform(-180, 180)) for i in range(1, 3001)}
+    client_lats = [rnd.uniform(-90, 90) for _ in range(200)]
+    client_lons = [rnd.uniform(-180, 180) for _ in range(200)]
+    index = _spatial_index(positions)
+
+    vectorized_ids, vectorized_distances = index.nearest_many(client_lats, client_lons)
+    monkeypatch.setattr(garage_index_module, "VECTORIZED_MAX_GARAGES", 0)
+    tree_ids, tree_distances = index.nearest_many(client_lats, client_lons)
+
+    np.testing.assert_array_equal(vectorized_ids, tree_ids)
+    np.testing.assert_allclose(vectorized_distances, tree_distances, atol=1e-6)
+    for lat, lon, garage_id in zip(client_lats, client_lons, tree_ids):
+        assert garage_id == min(positions, key=lambda g: (calculate_distance(lat, lon, *positions[g]), g))
+
+
+def test_index_nearest_many_ties_on_lowest_id(monkeypatch):
+    # Paires de garages symétriques par rapport à l'équateur (distances égales), l'ID le
+    # plus grand au sud : l'ordre des feuilles du k-d tree le place en premier
+    positions = {}
+    for k in range(100):
+        offset = (k + 1) / 64
+        positions[2 * k + 2] = (offset, 2.0)
+        positions[2 * k + 1001] = (-offset, 2.0)
+    index = _spatial_index(positions)
+
+    vectorized_ids, _ = index.nearest_many([0.0] * 5, [2.0] * 5)
+    monkeypatch.setattr(garage_index_module, "VECTORIZED_MAX_GARAGES", 0)
+    tree_ids, _ = index.nearest_many([0.0] * 5, [2.0] * 5)
+    assert vectorized_ids.tolist() == tree_ids.tolist() == [2] * 5
+
+
+def test_index_nearest_many_when_empty():
+    ids, distances = _spatial_index({}).nearest_many([5.0], [-4.0])
+    assert ids.tolist() == [-1]
+    assert np.isinf(distances).all()
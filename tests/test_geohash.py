@@ -0,0 +1,113 @@
+"""
+Colonnes geohash, couverture d'un cercle par préfixes et recherches par balayage de préfixes
+"""
+import random
+
+import pytest
+
+from conftest import add_garage
+from geo_distance import calculate_distance
+from geohash import covering_prefixes, decode_bbox, encode, encode_position
+from models import DemandePrestation, Garage
+from routers.demandes_prestations import find_nearest_garage_geohash, find_nearest_garage_index
+
+DEMANDE = {"client_id": 1, "vehicule_id": 1, "service_id": 1}
+
+
+def test_encode_reference_values():
+    assert encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert encode(48.8583, 2.2945, 5) == "u09tu"
+    lat_min, lat_max, lon_min, lon_max = decode_bbox("u4pruydqqvj")
+    assert lat_min <= 57.64911 <= lat_max and lon_min <= 10.40744 <= lon_max
+
+
+def test_encode_position_invalid_values():
+    assert encode_position(None, 2.0) is None
+    assert encode_position("abc", 2.0) is None
+    assert encode_position(91.0, 2.0) is None
+    assert encode_position("48.8583", "2.2945") == encode(48.8583, 2.2945)
+
+
+def test_covering_prefixes_contain_every_point_of_the_circle():
+    rnd = random.Random(9)
+    for _ in range(1500):
+        latitude, longitude = rnd.uniform(-85, 85), rnd.uniform(-180, 180)
+        radius_km = 10 ** rnd.uniform(-2, 3.5)
+        prefixes = covering_prefixes(latitude, longitude, radius_km)
+        if prefixes == [""]:
+            continue
+        assert len(prefixes) <= 18
+        for _ in range(5):
+            point_lat = latitude + rnd.uniform(-1, 1) * radius_km / 111
+            point_lon = (longitude + rnd.uniform(-1, 1) * radius_km / 20 + 180) % 360 - 180
+            if not -90 < point_lat < 90 or calculate_distance(latitude, longitude, point_lat, point_lon) > radius_km:
+                continue
+            assert any(encode(point_lat, point_lon).startswith(prefix) for prefix in prefixes)
+
+
+def test_covering_prefixes_without_filter():
+    assert covering_prefixes(89.99, 0.0, 50) == [""]
+    assert covering_prefixes(0.0, 0.0, 15000) == [""]
+
+
+def test_columns_follow_positions(db):
+    garage = add_garage(db, 48.8583, 2.2945)
+    assert garage.geohash == encode(48.8583, 2.2945)
+    garage.latitude, garage.longitude = None, None
+    db.commit()
+    assert db.get(Garage, garage.id).geohash is None
+
+
+def test_geohash_search_matches_index(db):
+    rnd = random.Random(9)
+    for i in range(600):
+        if i % 2:
+            latitude, longitude = rnd.uniform(5, 5.6), rnd.uniform(-4.3, -3.6)
+        else:
+            latitude, longitude = rnd.uniform(-89.9, 89.9), rnd.uniform(-180, 180)
+        db.add(Garage(nom_garage=f"Garage {i}", statut="actif" if i % 4 else "inactif",
+                      latitude=round(latitude, 8), longitude=round(longitude, 8)))
+    db.commit()
+    queries = [(rnd.uniform(-90, 90), rnd.uniform(-180, 180)) for _ in range(60)]
+    queries += [(rnd.uniform(5, 5.6), rnd.uniform(-4.3, -3.6)) for _ in range(40)]
+    queries += [(89.99, 179.9), (0.0, 179.999), (-89.99, -179.99), (0.0, -179.9999)]
+    for latitude, longitude in queries:
+        assert find_nearest_garage_geohash(latitude, longitude, db).id == find_nearest_garage_index(latitude, longitude, db).id
+
+
+def test_geohash_search_without_garages(db):
+    assert find_nearest_garage_geohash(5.0, -4.0, db) is None
+
+
+def test_demandes_proches(client, db, basic_data):
+    garage = add_garage(db, 5.0, -4.0)
+    for i in range(20):
+        response = client.post("/prestations/demandes/", json={
+            **DEMANDE, "client_latitude": 5.0 + i * 0.01, "client_longitude": -4.0
+        })
+        assert response.status_code == 200
+    demande = db.get(DemandePrestation, 1)
+    assert demande.client_geohash == encode(5.0, -4.0)
+
+    found = client.get("/prestations/demandes/proches", params={"garage_id": garage.id, "radius_km": 5}).json()
+    # 0.04° de latitude ≈ 4.45 km, 0.05° ≈ 5.56 km
+    assert [demande["id"] for demande in found] == [1, 2, 3, 4, 5]
+    assert found[1]["distance_km"] == round(calculate_distance(5.0, -4.0, 5.01, -4.0), 3)
+
+    limited = client.get("/prestations/demandes/proches",
+                         params={"garage_id": garage.id, "radius_km": 50, "limit": 3}).json()
+    assert [demande["id"] for demande in limited] == [1, 2, 3]
+
+
+@pytest.mark.parametrize("params, status_code", [
+    ({"garage_id": 99}, 404),
+    ({"garage_id": 1, "radius_km": 0}, 422),
+])
+def test_demandes_proches_errors(client, db, params, status_code):
+    add_garage(db, 5.0, -4.0)
+    assert client.get("/prestations/demandes/proches", params=params).status_code == status_code
+
+
+def test_demandes_proches_garage_without_position(client, db):
+    garage = add_garage(db, None, None)
+    assert client.get("/prestations/demandes/proches", params={"garage_id": garage.id}).status_code == 400
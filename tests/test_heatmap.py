@@ -0,0 +1,55 @@
+"""
+GET /prestations/demandes/heatmap : demandes agrégées par cellule geohash
+"""
+from datetime import datetime
+
+from geohash import decode_bbox, encode
+from models import DemandePrestation, Service
+
+URL = "/prestations/demandes/heatmap"
+
+
+def _seed(db):
+    db.add(Service(nom="Freins", prix=120))
+    positions = [
+        (48.8583, 2.2945, "en_attente", 1),
+        (48.8584, 2.2946, "acceptee", 1),
+        (48.8585, 2.2947, "en_attente", 2),
+        (45.7640, 4.8357, "en_attente", 1),
+        (None, None, "en_attente", 1),
+    ]
+    for latitude, longitude, statut, service_id in positions:
+        db.add(DemandePrestation(client_id=1, vehicule_id=1, service_id=service_id, statut=statut,
+                                 date_demande=datetime.now(), client_latitude=latitude, client_longitude=longitude))
+    db.commit()
+
+
+def test_cells_counted_by_statut_and_service(client, db, basic_data):
+    _seed(db)
+    heatmap = client.get(URL, params={"precision": 5}).json()
+    assert heatmap["precision"] == 5
+    assert heatmap["total"] == 4
+
+    paris, lyon = heatmap["cells"]
+    assert paris["geohash"] == encode(48.8583, 2.2945, 5)
+    assert paris["total"] == 3
+    assert paris["par_statut"] == {"en_attente": 2, "acceptee": 1}
+    assert paris["par_service"] == {"1": 2, "2": 1}
+    lat_min, lat_max, lon_min, lon_max = decode_bbox(paris["geohash"])
+    assert (paris["lat_min"], paris["lat_max"], paris["lon_min"], paris["lon_max"]) == (lat_min, lat_max, lon_min, lon_max)
+    assert lat_min <= paris["latitude"] <= lat_max
+    assert lyon["geohash"] == encode(45.7640, 4.8357, 5) and lyon["total"] == 1
+
+
+def test_filters(client, db, basic_data):
+    _seed(db)
+    assert client.get(URL, params={"statut": "acceptee"}).json()["total"] == 1
+    assert client.get(URL, params={"service_id": 2}).json()["total"] == 1
+    # Un identifiant 0 filtre aussi (aucune demande), il n'est pas ignoré
+    assert client.get(URL, params={"service_id": 0}).json() == {"precision": 5, "total": 0, "cells": []}
+
+
+def test_precision_bounds(client, db):
+    assert client.get(URL, params={"precision": 0}).status_code == 422
+    assert client.get(URL, params={"precision": 9}).status_code == 422
+    assert client.get(URL, params={"precision": 1}).json()["cells"] == []
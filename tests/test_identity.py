@@ -0,0 +1,81 @@
+"""
+Emails normalisés et résolution d'une identité par email en une requête (identity)
+"""
+from sqlalchemy import event
+
+import database
+from conftest import add_garage, make_user
+from emails import normalize_email
+from identity import resolve_email
+from models import Client
+
+
+def test_normalize_email():
+    assert normalize_email("  Jean.Dupont@Example.COM ") == "jean.dupont@example.com"
+    assert normalize_email("   ") is None
+    assert normalize_email(None) is None
+
+
+def test_columns_maintained_by_the_orm(db):
+    user = make_user(db, email=" Mixed@Example.com")
+    client = Client(nom="Client", telephone="0100000000", email="CLIENT@example.com")
+    db.add(client)
+    db.commit()
+    garage = add_garage(db, 5.0, -4.0, email="Garage@Example.com")
+    assert user.email_normalise == "mixed@example.com"
+    assert client.email_normalise == "client@example.com"
+    assert garage.email_normalise == "garage@example.com"
+
+    client.email = "Nouveau@Example.com"
+    db.commit()
+    assert client.email_normalise == "nouveau@example.com"
+
+
+def test_resolve_user_client_and_garage_in_one_query(db):
+    make_user(db, email="old@example.com")
+    newest = make_user(db, email="PERSONNE@example.com", role="client")
+    db.add_all([Client(nom="A", telephone="1", email="personne@example.com"),
+                Client(nom="B", telephone="2", email="Personne@Example.com")])
+    db.commit()
+    first_garage = add_garage(db, 5.0, -4.0, email="personne@example.com")
+    add_garage(db, 5.0, -4.0, email="PERSONNE@EXAMPLE.COM")
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(database.engine, "before_cursor_execute", record)
+    try:
+        identity = resolve_email(db, "  personne@EXAMPLE.com ")
+    finally:
+        event.remove(database.engine, "before_cursor_execute", record)
+
+    assert len(statements) == 1
+    assert identity.email == "personne@example.com"
+    assert identity.user.id == newest.id and identity.user.role == "client"
+    assert identity.client_id == 1  # le client le plus ancien
+    assert identity.garage_id == first_garage.id
+
+
+def test_resolve_without_user(db):
+    add_garage(db, 5.0, -4.0, email="garage@example.com")
+    identity = resolve_email(db, "garage@example.com")
+    assert identity.user is None and identity.client_id is None and identity.garage_id is not None
+    assert resolve_email(db, "inconnu@example.com").garage_id is None
+    assert resolve_email(db, " ").email is None
+
+
+def test_login_is_case_insensitive(client, db):
+    make_user(db, email="Jean@Example.com", password="secret")
+    response = client.post("/auth/login", json={"email": "jean@EXAMPLE.com", "password": "secret"})
+    assert response.status_code == 200
+    assert response.json()["email"] == "Jean@Example.com"
+
+
+def test_register_rejects_existing_email_in_any_case(client, db):
+    make_user(db, email="jean@example.com")
+    response = client.post("/auth/register", json={
+        "nom_complet": "Jean Dupont", "email": "JEAN@example.com", "password": "secret", "role": "client"
+    })
+    assert response.status_code == 400
@@ -0,0 +1,72 @@
+"""
+Attribution des demandes selon la distance et la charge des garages (DISPATCH_STRATEGY=load_aware)
+"""
+import pytest
+
+from config import settings
+from conftest import add_garage
+from garage_load import GarageLoadCounters, garage_load
+
+DEMANDE = {"client_id": 1, "vehicule_id": 1, "service_id": 1, "client_latitude": 5.0, "client_longitude": -4.0}
+
+
+@pytest.fixture
+def load_aware(monkeypatch):
+    monkeypatch.setattr(settings, "DISPATCH_STRATEGY", "load_aware")
+    monkeypatch.setattr(settings, "DISPATCH_LOAD_PENALTY_KM", 2.0)
+
+
+def _counts_from_database(db):
+    counters = GarageLoadCounters(resync_seconds=0)
+    counters.reload(db)
+    return counters._counts
+
+
+def test_load_spreads_demandes(client, db, basic_data, load_aware):
+    near = add_garage(db, 5.0, -4.0)
+    other = add_garage(db, 5.02, -4.0)  # ≈ 2.2 km
+
+    assigned = [client.post("/prestations/demandes/", json=DEMANDE).json()["garage_id"] for _ in range(4)]
+    # Pénalité de 2 km par demande ouverte : le second garage passe devant à la troisième demande
+    assert assigned == [near.id, near.id, other.id, near.id]
+    assert garage_load._counts == {near.id: 3, other.id: 1}
+
+
+def test_counters_follow_demande_changes(client, db, basic_data, load_aware):
+    near = add_garage(db, 5.0, -4.0)
+    other = add_garage(db, 5.02, -4.0)
+    for _ in range(4):
+        client.post("/prestations/demandes/", json=DEMANDE)
+
+    assert client.patch("/prestations/demandes/1/statut", json={"statut": "terminee"}).status_code == 200
+    assert garage_load._counts == _counts_from_database(db) == {near.id: 2, other.id: 1}
+
+    assert client.patch("/prestations/demandes/2/accept", json={"garage_id": other.id}).status_code == 200
+    assert garage_load._counts == _counts_from_database(db) == {near.id: 1, other.id: 2}
+
+    assert client.delete("/prestations/demandes/3").status_code == 200
+    assert garage_load._counts == _counts_from_database(db) == {near.id: 1, other.id: 1}
+
+
+def test_nearest_strategy_ignores_load(client, db, basic_data):
+    near = add_garage(db, 5.0, -4.0)
+    add_garage(db, 5.02, -4.0)
+    assigned = {client.post("/prestations/demandes/", json=DEMANDE).json()["garage_id"] for _ in range(4)}
+    assert assigned == {near.id}
+
+
+def test_transition_rules():
+    counters = GarageLoadCounters(resync_seconds=0)
+    counters.transition(None, None, 1, "en_attente")
+    assert counters.get(1) == 0  # pas encore chargés : rien à tenir à jour
+
+    counters._counts = {}
+    counters.transition(None, None, 1, "en_attente")
+    counters.transition(1, "en_attente", 1, "acceptee")
+    counters.transition(None, None, 2, "en_cours")
+    assert counters._counts == {1: 1, 2: 1}
+    counters.transition(1, "acceptee", 2, "acceptee")
+    counters.transition(2, "en_cours", 2, "annulee")
+    assert counters._counts == {2: 1}
+    counters.transition(2, "acceptee", None, None)
+    assert counters._counts == {} and counters.get(2) == 0
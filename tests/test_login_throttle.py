@@ -0,0 +1,78 @@
+"""
+Limitation des tentatives de connexion par seaux à jetons (login_throttle)
+"""
+import threading
+
+from conftest import make_user
+from login_throttle import LoginThrottle, TokenBucketLimiter, login_throttle
+
+
+def test_burst_then_refill(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("login_throttle.time.monotonic", lambda: now[0])
+    limiter = TokenBucketLimiter(burst=3, per_minute=6, shards=4)
+    assert [limiter.acquire("a")[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = limiter.acquire("a")
+    assert not allowed and retry_after == 10.0
+    # Les autres clés ont leur propre seau
+    assert limiter.acquire("b")[0] is True
+
+    now[0] += 10
+    assert limiter.acquire("a")[0] is True
+    assert limiter.acquire("a")[0] is False
+    assert limiter.rejected == 2
+
+
+def test_idle_buckets_are_pruned_and_bounded(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("login_throttle.time.monotonic", lambda: now[0])
+    limiter = TokenBucketLimiter(burst=2, per_minute=60, shards=1, max_keys=3)
+    for key in "abcde":
+        limiter.acquire(key)
+    assert limiter.size() == 3
+    # Au-delà de burst / rate (2 s) sans tentative, les seaux pleins sont oubliés
+    now[0] += 2
+    limiter.acquire("f")
+    assert limiter.size() == 1
+
+
+def test_concurrent_rejections_are_counted_exactly():
+    limiter = TokenBucketLimiter(burst=5, per_minute=0.001, shards=2)
+    barrier = threading.Barrier(8)
+    allowed = []
+
+    def worker():
+        barrier.wait()
+        for _ in range(500):
+            allowed.append(limiter.acquire("victime@example.com")[0])
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert allowed.count(True) == 5
+    assert limiter.rejected == 8 * 500 - 5
+
+
+def test_disabled_throttle():
+    throttle = LoginThrottle(False, TokenBucketLimiter(1, 1), TokenBucketLimiter(1, 1))
+    assert all(throttle.check("1.2.3.4", "a@example.com") is None for _ in range(5))
+
+
+def test_login_rejected_with_retry_after(client, db):
+    make_user(db, email="jean@example.com", password="secret")
+    burst = login_throttle.email_limiter.burst
+    for _ in range(burst):
+        assert client.post("/auth/login", json={"email": "jean@example.com", "password": "faux"}).status_code == 401
+
+    # Le bon mot de passe est refusé aussi, avant toute vérification bcrypt
+    response = client.post("/auth/login", json={"email": "JEAN@example.com", "password": "secret"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    # Un autre email n'est pas concerné
+    assert client.post("/auth/login", json={"email": "autre@example.com", "password": "x"}).status_code == 401
+
+    stats = client.get("/metrics/login-throttle").json()
+    assert stats["email_rejected"] == 1 and stats["ip_rejected"] == 0
+    assert stats["email_keys"] == 2
@@ -0,0 +1,75 @@
+"""
+Cache LRU du garage le plus proche par position arrondie (nearest_cache)
+"""
+from conftest import add_garage
+from models import Garage
+from nearest_cache import NearestGarageCache, nearest_garage_cache
+from routers.demandes_prestations import find_nearest_garage
+
+
+def test_positions_share_a_rounded_key():
+    cache = NearestGarageCache(max_size=10, precision=3, ttl_seconds=0)
+    cache.put(5.00012, -4.00049, 7, 5.1, -4.0)
+    assert cache.get(5.00004, -3.99951) == 7
+    assert cache.get(5.0012, -4.0) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_bounded_lru():
+    cache = NearestGarageCache(max_size=2, precision=3, ttl_seconds=0)
+    cache.put(1.0, 1.0, 1, 1.0, 1.0)
+    cache.put(2.0, 2.0, 2, 2.0, 2.0)
+    assert cache.get(1.0, 1.0) == 1
+    cache.put(3.0, 3.0, 3, 3.0, 3.0)
+    assert cache.get(2.0, 2.0) is None
+    assert cache.get(1.0, 1.0) == 1 and cache.get(3.0, 3.0) == 3
+
+
+def test_expired_entries(monkeypatch):
+    cache = NearestGarageCache(max_size=10, precision=3, ttl_seconds=60)
+    now = [1000.0]
+    monkeypatch.setattr("nearest_cache.time.monotonic", lambda: now[0])
+    cache.put(1.0, 1.0, 1, 1.0, 1.0)
+    now[0] += 59
+    assert cache.get(1.0, 1.0) == 1
+    now[0] += 1
+    assert cache.get(1.0, 1.0) is None
+
+
+def test_disabled_cache():
+    cache = NearestGarageCache(max_size=0)
+    cache.put(1.0, 1.0, 1, 1.0, 1.0)
+    assert cache.get(1.0, 1.0) is None
+
+
+def test_invalidate_only_affected_entries():
+    cache = NearestGarageCache(max_size=10, precision=3, ttl_seconds=0)
+    cache.put(5.0, -4.0, 1, 5.1, -4.0)      # garage à ≈ 11 km
+    cache.put(45.0, 2.0, 2, 45.01, 2.0)     # loin des modifications
+    cache.invalidate_garage(3, 5.05, -4.0, actif=True)  # nouveau garage plus proche de la première entrée
+    assert cache.get(5.0, -4.0) is None and cache.get(45.0, 2.0) == 2
+
+    cache.put(5.0, -4.0, 1, 5.1, -4.0)
+    cache.invalidate_garage(3, 5.2, -4.0, actif=True)   # plus loin que le garage en cache
+    assert cache.get(5.0, -4.0) == 1
+    cache.invalidate_garage(1, actif=False)             # garage en cache désactivé
+    assert cache.get(5.0, -4.0) is None
+    assert cache.invalidations == 2
+
+
+def test_nearest_search_uses_cache(client, db):
+    first = add_garage(db, 5.1, -4.0)
+    assert find_nearest_garage(5.0, -4.0, db).id == first.id
+    assert find_nearest_garage(5.0001, -4.0001, db).id == first.id
+    assert nearest_garage_cache.hits == 1
+
+    # Un garage plus proche créé par l'API retire l'entrée
+    response = client.post("/garages/", json={"nom_garage": "Proche", "statut": "actif", "latitude": 5.01, "longitude": -4.0})
+    assert find_nearest_garage(5.0, -4.0, db).id == response.json()["id"]
+
+    # Garage en cache désactivé hors de ce worker : vérifié à la lecture du cache
+    db.expire_all()
+    closer = db.get(Garage, response.json()["id"])
+    closer.statut = "inactif"
+    db.commit()
+    assert find_nearest_garage(5.0, -4.0, db).id == first.id
@@ -0,0 +1,98 @@
+"""
+Hachage et vérification bcrypt dans un pool de workers borné (password_pool)
+"""
+import asyncio
+import time
+
+import pytest
+
+from password_pool import PasswordWorkerPool, get_password_hash, hash_rounds, verify_password
+
+
+@pytest.mark.parametrize("mode", ["thread", "process"])
+def test_hash_and_verify(mode):
+    pool = PasswordWorkerPool(mode=mode, max_workers=2, rounds=4)
+
+    async def scenario():
+        hashed = await pool.hash("motdepasse")
+        return hashed, await pool.verify("motdepasse", hashed), await pool.verify("autre", hashed)
+
+    try:
+        hashed, valid, invalid = asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+    assert hash_rounds(hashed) == 4
+    assert valid is True and invalid is False
+    assert pool.stats()["completed"] == 3
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        PasswordWorkerPool(mode="fiber")
+
+
+def test_event_loop_stays_responsive():
+    pool = PasswordWorkerPool(mode="thread", max_workers=2, rounds=11)
+
+    async def scenario():
+        ticks = []
+
+        async def ticker():
+            # Pas de tick manqué pendant les hachages : la boucle n'est pas bloquée
+            while True:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.005)
+
+        task = asyncio.create_task(ticker())
+        await asyncio.gather(*[pool.hash(f"motdepasse{i}") for i in range(4)])
+        task.cancel()
+        return ticks
+
+    try:
+        ticks = asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+    gaps = [later - earlier for earlier, later in zip(ticks, ticks[1:])]
+    assert len(ticks) > 5
+    assert max(gaps) < 0.1
+
+
+def test_bounded_concurrency_and_stats():
+    pool = PasswordWorkerPool(mode="thread", max_workers=2, rounds=4)
+
+    async def scenario():
+        return await pool.hash_many([f"motdepasse{i}" for i in range(7)], rounds=4)
+
+    try:
+        hashes = asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+    assert len(hashes) == 7 and all(verify_password(f"motdepasse{i}", h) for i, h in enumerate(hashes))
+    stats = pool.stats()
+    # Lots de max_workers : jamais plus de 2 hachages soumis à la fois
+    assert stats["max_in_flight"] <= 2
+    assert stats["completed"] == 7
+    assert stats["queue_depth"] == 0
+    assert set(stats["run_ms"]) == {"mean", "p50", "p95", "max"}
+
+
+def test_verify_password_invalid_hashes():
+    assert verify_password("x", "") is False
+    assert verify_password("x", "court") is False
+    assert verify_password("x", "pas-un-hash-bcrypt-valide") is False
+    # Mots de passe de plus de 72 octets tronqués comme par bcrypt
+    hashed = get_password_hash("a" * 80, 4)
+    assert verify_password("a" * 72, hashed) is True
+
+
+def test_register_and_login_use_pool(client):
+    response = client.post("/auth/register", json={
+        "nom_complet": "Jean Dupont", "email": "jean@example.com", "password": "secret", "role": "client"
+    })
+    assert response.status_code == 201, response.text
+    assert response.json()["token"]
+
+    completed = client.get("/metrics/password-pool").json()["completed"]
+    assert client.post("/auth/login", json={"email": "jean@example.com", "password": "secret"}).status_code == 200
+    assert client.post("/auth/login", json={"email": "jean@example.com", "password": "faux"}).status_code == 401
+    assert client.get("/metrics/password-pool").json()["completed"] == completed + 2
@@ -0,0 +1,85 @@
+"""
+Mesures des pools de connexions (pool_metrics) et GET /metrics/db-pool
+"""
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from pool_metrics import TimedQueuePool, monitor_engine, pool_monitors
+
+
+@pytest.fixture
+def small_engine():
+    """Moteur mesuré d'une seule connexion, sans débordement"""
+    path = os.path.join(tempfile.mkdtemp(), "pool.db")
+    engine = create_engine(f"sqlite:///{path}", poolclass=TimedQueuePool, pool_size=1, max_overflow=0,
+                           pool_timeout=0.2)
+    monitor = monitor_engine(engine, "test", warn_wait_ms=50)
+    yield engine, monitor
+    pool_monitors.pop("test", None)
+    engine.dispose()
+
+
+def test_checkouts_and_connection_counts(small_engine):
+    engine, monitor = small_engine
+    for _ in range(3):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    stats = monitor.stats()
+    assert (stats["checkouts"], stats["connections_opened"]) == (3, 1)
+    assert (stats["pool_size"], stats["max_overflow"], stats["max_checked_out"]) == (1, 0, 1)
+    assert stats["checked_out"] == 0 and stats["checked_in"] == 1
+    assert stats["wait_ms"]["max"] < 50 and stats["slow_checkouts"] == 0
+    assert stats["connection_age_seconds"] is not None
+
+
+def test_slow_checkout_is_measured_and_logged(small_engine, capsys):
+    engine, monitor = small_engine
+    held = engine.connect()
+
+    def release():
+        time.sleep(0.1)
+        held.close()
+
+    releaser = threading.Thread(target=release)
+    releaser.start()
+    with engine.connect():
+        pass
+    releaser.join()
+
+    stats = monitor.stats()
+    assert stats["slow_checkouts"] == 1 and stats["timeouts"] == 0
+    assert stats["wait_ms"]["max"] >= 90
+    assert "Pool de connexions 'test'" in capsys.readouterr().out
+
+
+def test_timeout_is_counted(small_engine):
+    engine, monitor = small_engine
+    with engine.connect():
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+    assert monitor.stats()["timeouts"] == 1
+
+
+def test_monitor_survives_dispose(small_engine):
+    engine, monitor = small_engine
+    with engine.connect():
+        pass
+    engine.dispose()
+    assert engine.pool.monitor is monitor and monitor.pool is engine.pool
+    with engine.connect():
+        pass
+    stats = monitor.stats()
+    assert stats["checkouts"] == 2 and stats["connections_closed"] == 1
+
+
+def test_db_pool_endpoint(client, db):
+    stats = client.get("/metrics/db-pool").json()
+    assert {"primary", "async"} <= set(stats)
+    assert stats["primary"]["checkouts"] >= 1
+    assert set(stats["primary"]["wait_ms"]) == {"mean", "p50", "p95", "p99", "max"}
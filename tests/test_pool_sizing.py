@@ -0,0 +1,72 @@
+"""
+Dimensionnement des pools de connexions (config.Settings) et préchauffage (database.warm_up_pool)
+"""
+import itertools
+import os
+import tempfile
+
+from sqlalchemy import create_engine
+
+from config import Settings
+from database import warm_up_pool
+from pool_metrics import TimedQueuePool
+
+
+def sizing(settings):
+    return (settings.pool_size, settings.max_overflow, settings.async_pool_size, settings.async_max_overflow)
+
+
+def test_single_worker_defaults():
+    settings = Settings(WEB_CONCURRENCY=1, THREADPOOL_SIZE=40, DB_MAX_CONNECTIONS=150, DB_ASYNC_POOL_SHARE=0.25)
+    # Une connexion synchrone par thread, un quart du budget pour le moteur asynchrone
+    assert settings.pool_capacity == 40 and settings.async_pool_capacity == 37
+    assert sizing(settings) == (10, 30, 9, 28)
+
+
+def test_workers_share_the_server_budget():
+    settings = Settings(WEB_CONCURRENCY=4, THREADPOOL_SIZE=40, DB_MAX_CONNECTIONS=150, DB_ASYNC_POOL_SHARE=0.25)
+    assert settings.worker_connections == 37
+    assert sizing(settings) == (7, 21, 2, 7)
+
+
+def test_tiny_budget_keeps_one_connection_per_engine():
+    settings = Settings(WEB_CONCURRENCY=8, THREADPOOL_SIZE=40, DB_MAX_CONNECTIONS=20)
+    assert settings.worker_connections == 2
+    assert sizing(settings) == (1, 0, 1, 0)
+
+
+def test_unlimited_server_and_explicit_values():
+    settings = Settings(WEB_CONCURRENCY=4, THREADPOOL_SIZE=40, DB_MAX_CONNECTIONS=0, DB_ASYNC_POOL_SHARE=0.25)
+    assert settings.worker_connections is None
+    assert (settings.pool_capacity, settings.async_pool_capacity) == (40, 10)
+    explicit = Settings(DB_POOL_SIZE=5, DB_MAX_OVERFLOW=2)
+    assert (explicit.pool_size, explicit.max_overflow) == (5, 2)
+
+
+def test_workers_never_exceed_max_connections():
+    for workers, threads, max_connections, share in itertools.product(
+        [1, 2, 3, 4, 8, 16], [1, 10, 40, 100], [10, 50, 150, 500], [0.0, 0.25, 0.5, 1.0]
+    ):
+        settings = Settings(WEB_CONCURRENCY=workers, THREADPOOL_SIZE=threads, DB_MAX_CONNECTIONS=max_connections,
+                            DB_ASYNC_POOL_SHARE=share)
+        per_worker = sum(sizing(settings))
+        # Au moins une connexion par moteur et par worker, même au-delà du budget
+        assert workers * per_worker <= max(max_connections, 2 * workers), (workers, threads, max_connections, share)
+        assert settings.pool_size + settings.max_overflow <= threads
+
+
+def test_warm_up_pool_opens_connections_in_parallel():
+    path = os.path.join(tempfile.mkdtemp(), "warmup.db")
+    engine = create_engine(f"sqlite:///{path}", poolclass=TimedQueuePool, pool_size=3, max_overflow=0)
+    try:
+        assert warm_up_pool(engine, 3) == 3
+        # Connexions rendues au pool, prêtes pour les premières requêtes
+        assert (engine.pool.checkedin(), engine.pool.checkedout()) == (3, 0)
+    finally:
+        engine.dispose()
+
+
+def test_warm_up_pool_tolerates_unreachable_server(capsys):
+    engine = create_engine("sqlite:////repertoire-inexistant/warmup.db")
+    assert warm_up_pool(engine, 2) == 0
+    assert "Préchauffage du pool" in capsys.readouterr().out
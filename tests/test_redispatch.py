@@ -0,0 +1,125 @@
+"""
+POST /admin/demandes/redispatch : réassignation en masse des demandes en attente
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import garage_index as garage_index_module
+from conftest import add_garage, auth_headers, make_user
+from database import SessionLocal
+from garage_index import garage_index
+from garage_load import GarageLoadCounters, garage_load
+from models import DemandePrestation
+
+URL = "/admin/demandes/redispatch"
+
+
+def _add_demande(db, latitude, longitude, garage_id=None, statut="en_attente", age_hours=0):
+    created = datetime.now() - timedelta(hours=age_hours)
+    demande = DemandePrestation(client_id=1, vehicule_id=1, service_id=1, garage_id=garage_id, statut=statut,
+                                date_demande=created, updated_at=created,
+                                client_latitude=latitude, client_longitude=longitude)
+    db.add(demande)
+    db.commit()
+    return demande.id
+
+
+def _garages_of(db):
+    db.expire_all()
+    return {demande.id: demande.garage_id for demande in db.query(DemandePrestation)}
+
+
+def _assert_counters_match_database(db):
+    counters = GarageLoadCounters(resync_seconds=0)
+    counters.reload(db)
+    assert garage_load._counts == counters._counts
+
+
+@pytest.fixture(params=[2000, 0], ids=["vectorized", "tree"])
+def search_path(request, monkeypatch):
+    monkeypatch.setattr(garage_index_module, "VECTORIZED_MAX_GARAGES", request.param)
+
+
+def test_assigns_pending_demandes_without_active_garage(client, db, basic_data, admin_headers, search_path):
+    near = add_garage(db, 5.0, -4.0)
+    other = add_garage(db, 5.5, -4.0)
+    closed = add_garage(db, 5.0, -4.0, statut="inactif")
+    unassigned = _add_demande(db, 5.01, -4.0)
+    on_closed = _add_demande(db, 5.49, -4.0, garage_id=closed.id)
+    accepted = _add_demande(db, 5.01, -4.0, statut="acceptee")
+    on_active = _add_demande(db, 5.49, -4.0, garage_id=near.id)
+    without_position = _add_demande(db, None, None)
+    garage_load.ensure_loaded(db)
+
+    response = client.post(URL, params={"chunk_size": 2}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["examined_count"] == 2
+    assert result["assigned_count"] == 2
+    assert result["unassignable_count"] == 0
+    assert _garages_of(db) == {
+        unassigned: near.id, on_closed: other.id, accepted: None, on_active: near.id, without_position: None
+    }
+    _assert_counters_match_database(db)
+
+    # Rien à refaire
+    assert client.post(URL, headers=admin_headers).json()["assigned_count"] == 0
+
+
+def test_without_active_garage(client, db, basic_data, admin_headers):
+    add_garage(db, 5.0, -4.0, statut="inactif")
+    _add_demande(db, 5.0, -4.0)
+    result = client.post(URL, headers=admin_headers).json()
+    assert result["assigned_count"] == 0
+    assert result["unassignable_count"] == 1
+
+
+def test_stale_demandes_move_forward_once(client, db, basic_data, admin_headers):
+    garages = [add_garage(db, 5.0 + i * 0.1, -4.0) for i in range(3)]
+    stale = _add_demande(db, 5.0, -4.0, garage_id=garages[0].id, age_hours=48)
+    recent = _add_demande(db, 5.0, -4.0, garage_id=garages[0].id)
+
+    assert client.post(URL, params={"stale_hours": 24}, headers=admin_headers).json()["assigned_count"] == 1
+    assert _garages_of(db) == {stale: garages[1].id, recent: garages[0].id}
+
+    # La réassignation relance le délai : pas de second saut immédiat
+    assert client.post(URL, params={"stale_hours": 24}, headers=admin_headers).json()["assigned_count"] == 0
+
+    # Toujours sans réponse : garage suivant, puis reste sur le plus éloigné
+    for expected in (garages[2].id, garages[2].id):
+        db.query(DemandePrestation).filter(DemandePrestation.id == stale).update(
+            {"updated_at": datetime.now() - timedelta(hours=48)})
+        db.commit()
+        client.post(URL, params={"stale_hours": 24}, headers=admin_headers)
+        assert _garages_of(db)[stale] == expected
+
+
+def test_rows_changed_during_the_run_are_left_alone(client, db, basic_data, admin_headers, monkeypatch):
+    garage = add_garage(db, 5.0, -4.0)
+    other = add_garage(db, 5.2, -4.0)
+    ids = [_add_demande(db, 5.0 + i * 0.01, -4.0) for i in range(10)]
+    garage_load.ensure_loaded(db)
+
+    search = garage_index.nearest_many
+
+    def racing_search(*args):
+        # Une autre requête accepte une demande et en assigne une autre pendant le calcul
+        other_session = SessionLocal()
+        other_session.query(DemandePrestation).filter(DemandePrestation.id == ids[0]).update({"statut": "acceptee"})
+        other_session.query(DemandePrestation).filter(DemandePrestation.id == ids[1]).update({"garage_id": other.id})
+        other_session.commit()
+        other_session.close()
+        return search(*args)
+
+    monkeypatch.setattr(garage_index, "nearest_many", racing_search)
+    assert client.post(URL, headers=admin_headers).json()["assigned_count"] == 8
+    garages = _garages_of(db)
+    assert garages[ids[0]] is None and garages[ids[1]] == other.id
+    assert all(garages[demande_id] == garage.id for demande_id in ids[2:])
+
+
+def test_requires_admin(client, db):
+    assert client.post(URL).status_code == 401
+    user = make_user(db, email="client@example.com", role="client")
+    assert client.post(URL, headers=auth_headers(user)).status_code == 403
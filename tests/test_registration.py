@@ -0,0 +1,84 @@
+"""
+Inscription de l'utilisateur et de son client en une seule transaction
+"""
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import database
+from conftest import add_garage, make_user
+from models import Client
+from models_auth import Utilisateur
+
+
+def register(client, email, role="client", **fields):
+    return client.post("/auth/register", json={
+        "nom_complet": "Jean Dupont", "email": email, "password": "secret", "role": role, **fields
+    })
+
+
+def test_user_and_client_created_together(client, db):
+    inserts, commits = [], []
+
+    def record_insert(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("INSERT"):
+            inserts.append(statement)
+
+    def record_commit(conn):
+        commits.append(True)
+
+    event.listen(database.engine, "before_cursor_execute", record_insert)
+    event.listen(database.engine, "commit", record_commit)
+    try:
+        response = register(client, "jean@example.com", telephone="0601020304")
+    finally:
+        event.remove(database.engine, "before_cursor_execute", record_insert)
+        event.remove(database.engine, "commit", record_commit)
+
+    assert response.status_code == 201, response.text
+    # INSERT utilisateur + INSERT client, un seul commit
+    assert len(inserts) == 2 and len(commits) == 1
+    user = db.query(Utilisateur).filter(Utilisateur.email == "jean@example.com").one()
+    assert (user.nom, user.prenom) == ("Jean", "Dupont")
+    client_row = db.query(Client).filter(Client.email == "jean@example.com").one()
+    assert client_row.telephone == "0601020304"
+    assert response.json()["id"] == user.id
+
+
+def test_existing_client_is_reused(client, db):
+    db.add(Client(nom="Dupont", telephone="0100000000", email="Jean@Example.com"))
+    db.commit()
+    assert register(client, "jean@example.com").status_code == 201
+    assert db.query(Client).count() == 1
+
+
+def test_garage_email_gives_garage_account(client, db):
+    garage = add_garage(db, 5.0, -4.0, email="atelier@example.com")
+    response = register(client, "atelier@example.com")
+    assert response.status_code == 201
+    assert (response.json()["role"], response.json()["garage_id"]) == ("garage", garage.id)
+    assert db.query(Client).count() == 0
+
+
+def test_duplicate_email_rejected(client, db):
+    make_user(db, email="jean@example.com")
+    assert register(client, "jean@example.com").status_code == 400
+    assert db.query(Utilisateur).count() == 1
+
+
+def test_failure_leaves_nothing_behind(client, db, monkeypatch):
+    def failing_flush(self, *args, **kwargs):
+        # Échec à l'insertion du client, après celle de l'utilisateur
+        if any(isinstance(obj, Client) for obj in self.new):
+            raise RuntimeError("insertion du client impossible")
+        return original_flush(self, *args, **kwargs)
+
+    original_flush = Session.flush
+    monkeypatch.setattr(Session, "flush", failing_flush)
+    with pytest.raises(RuntimeError):
+        register(client, "jean@example.com")
+    monkeypatch.undo()
+
+    db.expire_all()
+    assert db.query(Utilisateur).count() == 0
+    assert db.query(Client).count() == 0
@@ -0,0 +1,124 @@
+"""
+Lectures sur réplicas (replicas) : RoutingSession, ReplicaPool et lecture de ses propres écritures
+"""
+import os
+import tempfile
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, select, text
+
+import database
+from conftest import auth_headers, make_user
+from models import Client, DemandePrestation
+from replicas import ReadYourWrites, ReplicaPool, RoutingSession, client_key
+
+
+@pytest.fixture
+def replica_engine():
+    """Réplica SQLite vide (schéma seul) : une lecture qui y passe ne voit pas les données du primaire"""
+    path = os.path.join(tempfile.mkdtemp(), "replica.db")
+    engine = create_engine(f"sqlite:///{path}")
+    database.Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def api_replica(replica_engine):
+    """Le réplica branché sur get_read_db le temps du test"""
+    database.replica_pool.__init__([replica_engine], health_check_seconds=60)
+    database.read_your_writes.__init__(window_seconds=5)
+    yield replica_engine
+    database.replica_pool.__init__([], health_check_seconds=database.replica_pool.health_check_seconds)
+    database.read_your_writes.__init__(window_seconds=database.read_your_writes.window_seconds)
+
+
+def routing_session(replicas):
+    return RoutingSession(bind=database.engine, info={"replicas": replicas})
+
+
+def test_reads_go_to_replica_writes_to_primary(db, replica_engine):
+    db.add(Client(nom="Primaire", telephone="0100000000"))
+    db.commit()
+    session = routing_session(ReplicaPool([replica_engine]))
+    try:
+        assert session.execute(select(Client)).scalars().all() == []
+        assert session.execute(text("SELECT COUNT(*) FROM clients")).scalar() == 0
+        # SELECT ... FOR UPDATE : primaire
+        assert len(session.execute(select(Client).with_for_update()).scalars().all()) == 1
+
+        session.add(Client(nom="Nouveau", telephone="0200000000"))
+        session.flush()
+        # Après une écriture, la session lit ses propres écritures sur le primaire
+        assert session.execute(select(Client.nom).order_by(Client.id)).scalars().all() == ["Primaire", "Nouveau"]
+        session.rollback()
+    finally:
+        session.close()
+
+
+def test_round_robin_and_failover(replica_engine, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("replicas.time.monotonic", lambda: now[0])
+    broken = create_engine("sqlite:////repertoire-inexistant/replica.db")
+    replicas = ReplicaPool([replica_engine, broken], health_check_seconds=10)
+
+    assert [replicas.choose() for _ in range(3)] == [replica_engine, replica_engine, replica_engine]
+    stats = replicas.stats()
+    assert stats["failovers"] == 1
+    assert [r["healthy"] for r in stats["replicas"]] == [True, False]
+    # Réplica écarté jusqu'au test suivant
+    replicas.mark_down(replica_engine)
+    assert replicas.choose() is None
+    now[0] += 10
+    assert replicas.choose() is replica_engine
+
+
+def test_no_replica_reads_primary(db):
+    db.add(Client(nom="Primaire", telephone="0100000000"))
+    db.commit()
+    session = routing_session(ReplicaPool([]))
+    try:
+        assert len(session.execute(select(Client)).scalars().all()) == 1
+    finally:
+        session.close()
+
+
+def test_read_your_writes_window(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("replicas.time.monotonic", lambda: now[0])
+    writes = ReadYourWrites(window_seconds=5, max_keys=2)
+    writes.record("a")
+    assert writes.is_recent("a") and not writes.is_recent("b")
+    now[0] += 5
+    assert not writes.is_recent("a")
+    for key in "bcd":
+        writes.record(key)
+    assert writes.size() == 2
+
+
+def test_client_key_prefers_token():
+    class FakeRequest:
+        def __init__(self, headers, host):
+            self.headers = headers
+            self.client = type("Address", (), {"host": host})()
+
+    assert client_key(FakeRequest({}, "10.0.0.1")) == "10.0.0.1"
+    keyed = client_key(FakeRequest({"authorization": "Bearer abc"}, "10.0.0.1"))
+    assert keyed != "10.0.0.1" and "abc" not in keyed
+
+
+def test_writer_reads_primary_others_replica(client, db, basic_data, api_replica):
+    db.add(DemandePrestation(client_id=1, vehicule_id=1, service_id=1, statut="en_attente", date_demande=datetime.now()))
+    db.commit()
+    writer = auth_headers(make_user(db, email="a@example.com", role="client"))
+    other = auth_headers(make_user(db, email="b@example.com", role="client"))
+
+    assert client.get("/prestations/demandes/", headers=writer).json() == []
+    response = client.post("/clients/", json={"nom": "Nouveau", "telephone": "0200000000"}, headers=writer)
+    assert response.status_code == 201
+
+    assert len(client.get("/prestations/demandes/", headers=writer).json()) == 1
+    assert client.get("/prestations/demandes/", headers=other).json() == []
+    stats = client.get("/metrics/replicas").json()
+    assert stats["recent_writers"] == 1 and stats["replicas"][0]["sessions"] >= 2
@@ -0,0 +1,105 @@
+"""
+Démarrage de l'API (main.lifespan, DB_STARTUP_MODE) : aucun accès à la base à l'import
+"""
+import asyncio
+import os
+import subprocess
+import sys
+
+from sqlalchemy import event
+
+import database
+import main
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_lifespan(during=None):
+    """Démarre puis arrête l'application ; `during` (coroutine) s'exécute pendant qu'elle sert"""
+    async def scenario():
+        async with main.lifespan(main.app):
+            if during is not None:
+                await during()
+    asyncio.run(scenario())
+    return main.app.state.startup
+
+
+def test_import_does_not_touch_the_database(tmp_path):
+    path = tmp_path / "api.db"
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{path}"}
+    subprocess.run([sys.executable, "-c", "import main"], cwd=ROOT, env=env, check=True, capture_output=True)
+    # SQLite crée le fichier à la première connexion
+    assert not path.exists()
+
+
+def test_skip_mode(monkeypatch):
+    monkeypatch.setattr(main.settings, "DB_STARTUP_MODE", "skip")
+    connections = []
+
+    def record(*args):
+        connections.append(True)
+
+    event.listen(database.engine, "engine_connect", record)
+    try:
+        assert run_lifespan() == {"mode": "skip", "database": "skipped"}
+    finally:
+        event.remove(database.engine, "engine_connect", record)
+    assert connections == []
+
+
+def test_blocking_mode_prepares_before_serving(db, monkeypatch):
+    monkeypatch.setattr(main.settings, "DB_STARTUP_MODE", "blocking")
+    monkeypatch.setattr(main.settings, "DB_SCHEMA_CHECK", "verify")
+    monkeypatch.setattr(main.settings, "DB_POOL_WARMUP", True)
+    states = []
+
+    async def during():
+        states.append(dict(main.app.state.startup))
+
+    run_lifespan(during)
+    assert states[0]["database"] == "ready" and states[0]["missing_tables"] == []
+    assert states[0]["ready_seconds"] >= 0
+
+
+def test_missing_tables_are_created(clean_db, monkeypatch):
+    database.Base.metadata.drop_all(bind=database.engine, tables=[database.Base.metadata.tables["services"]])
+    monkeypatch.setattr(main.settings, "DB_STARTUP_MODE", "blocking")
+    monkeypatch.setattr(main.settings, "DB_SCHEMA_CHECK", "create")
+    assert run_lifespan()["missing_tables"] == ["services"]
+    assert database.ensure_schema(create=False) == []
+
+
+def test_background_mode_serves_immediately(db, monkeypatch):
+    monkeypatch.setattr(main.settings, "DB_STARTUP_MODE", "background")
+    monkeypatch.setattr(main.settings, "DB_SCHEMA_CHECK", "verify")
+
+    async def during():
+        # L'API sert pendant que la base se prépare
+        assert main.app.state.startup["database"] in ("skipped", "connecting")
+        await main.app.state.database_startup
+        assert main.app.state.startup["database"] == "ready"
+
+    run_lifespan(during)
+
+
+def test_unreachable_database(monkeypatch):
+    calibrations = []
+
+    async def calibrate():
+        calibrations.append(True)
+
+    monkeypatch.setattr(main.settings, "DB_STARTUP_MODE", "blocking")
+    monkeypatch.setattr(main.settings, "BCRYPT_CALIBRATE", True)
+    monkeypatch.setattr(main, "_calibrate_bcrypt", calibrate)
+    monkeypatch.setattr(database, "test_connection", lambda retries, delay: False)
+    assert run_lifespan()["database"] == "unavailable"
+    # Sans base, BCRYPT_ROUNDS est gardé : pas de calibration
+    assert calibrations == []
+
+
+def test_health_reports_startup(client, monkeypatch):
+    monkeypatch.setattr(main.settings, "DB_STARTUP_MODE", "skip")
+    run_lifespan()
+    body = client.get("/health").json()
+    assert body["status"] == "healthy"
+    assert body["startup"] == {"mode": "skip", "database": "skipped"}
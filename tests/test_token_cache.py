@@ -0,0 +1,56 @@
+"""
+Cache des claims JWT vérifiés (token_cache) et décodage des tokens
+"""
+import time
+
+import pytest
+from jose import JWTError
+
+from conftest import auth_headers, make_user
+from routers.auth import decode_token
+from token_cache import TokenClaimsCache, token_claims_cache
+
+
+def test_claims_keyed_by_token_digest():
+    cache = TokenClaimsCache(max_size=10, ttl_seconds=60)
+    cache.put("token-a", {"sub": "1"})
+    assert cache.get("token-a") == {"sub": "1"}
+    assert cache.get("token-b") is None
+    assert all(isinstance(key, bytes) and b"token-a" not in key for key in cache._entries)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entries_end_at_token_expiry():
+    cache = TokenClaimsCache(max_size=10, ttl_seconds=3600)
+    cache.put("expired", {"sub": "1", "exp": time.time() - 1})
+    cache.put("valid", {"sub": "1", "exp": time.time() + 60})
+    assert cache.get("expired") is None
+    assert cache.get("valid") is not None
+
+
+def test_bounded_and_disabled():
+    cache = TokenClaimsCache(max_size=2, ttl_seconds=60)
+    for token in ("a", "b", "c"):
+        cache.put(token, {"sub": token})
+    assert cache.get("a") is None and cache.get("c") == {"sub": "c"}
+    disabled = TokenClaimsCache(max_size=10, ttl_seconds=0)
+    disabled.put("a", {"sub": "a"})
+    assert disabled.get("a") is None and not disabled.enabled
+
+
+def test_decode_token_verifies_once(db):
+    token = auth_headers(make_user(db))["Authorization"].split()[1]
+    first = decode_token(token)
+    assert decode_token(token) == first
+    assert (token_claims_cache.misses, token_claims_cache.hits) == (1, 1)
+    with pytest.raises(JWTError):
+        decode_token(token[:-2] + ("AA" if not token.endswith("AA") else "BB"))
+
+
+def test_authenticated_requests_hit_the_cache(client, db):
+    headers = auth_headers(make_user(db))
+    for _ in range(3):
+        assert client.get("/auth/me", headers=headers).status_code == 200
+    stats = client.get("/metrics/token-cache").json()
+    assert stats["misses"] == 1 and stats["hits"] == 2
+    assert client.get("/auth/me", headers={"Authorization": "Bearer invalide"}).status_code == 401
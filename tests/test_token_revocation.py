@@ -0,0 +1,104 @@
+"""
+Liste de révocation des tokens JWT (token_revocation) : déconnexion et révocation par un administrateur
+"""
+import time
+
+from conftest import auth_headers, make_user
+from models_auth import TokenRevoque
+from token_revocation import BloomFilter, TokenRevocationList, token_revocation
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000)
+    items = [f"jti-{i}" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    false_positives = sum(f"autre-{i}" in bloom for i in range(10000))
+    assert false_positives < 500
+
+
+def test_bloom_filter_grows_with_revocations(db):
+    revocations = TokenRevocationList(sync_seconds=60, capacity=4)
+    expires_at = int(time.time()) + 60
+    for i in range(10):
+        revocations.revoke_token(db, f"jti-{i}", expires_at)
+    assert revocations.stats()["bloom_capacity"] >= 10
+    assert all(revocations.is_revoked({"jti": f"jti-{i}"}) for i in range(10))
+    assert not revocations.is_revoked({"jti": "jti-10"})
+
+
+def test_logout_revokes_the_token(client, db):
+    user = make_user(db)
+    headers = auth_headers(user)
+    other_session = auth_headers(user)
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    assert client.post("/auth/logout", headers=headers).status_code == 200
+    assert client.get("/auth/me", headers=headers).status_code == 401
+    # Les autres sessions du même utilisateur restent valides
+    assert client.get("/auth/me", headers=other_session).status_code == 200
+
+
+def test_admin_revokes_all_tokens_of_a_user(client, db, admin_headers):
+    user = make_user(db, email="client@example.com", role="client")
+    headers = auth_headers(user)
+    assert client.get("/auth/me", headers=headers).status_code == 200
+
+    response = client.post("/admin/tokens/revoke", params={"user_id": user.id}, headers=admin_headers)
+    assert response.status_code == 200
+    assert client.get("/auth/me", headers=headers).status_code == 401
+    # Un token émis juste après la révocation (même seconde) est valide
+    assert client.get("/auth/me", headers=auth_headers(user)).status_code == 200
+    assert client.get("/auth/me", headers=admin_headers).status_code == 200
+
+
+def test_revoke_endpoint_requirements(client, db, admin_headers):
+    user = make_user(db, email="client@example.com", role="client")
+    assert client.post("/admin/tokens/revoke", params={"user_id": 1}, headers=auth_headers(user)).status_code == 403
+    assert client.post("/admin/tokens/revoke", headers=admin_headers).status_code == 400
+
+
+def test_other_worker_learns_revocations_on_sync(db, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("token_revocation.time.monotonic", lambda: now[0])
+    worker_a = TokenRevocationList(sync_seconds=5)
+    worker_b = TokenRevocationList(sync_seconds=5)
+    worker_b.ensure_synced(db)
+
+    expires_at = int(time.time()) + 60
+    worker_a.revoke_token(db, "jti-a", expires_at, user_id=7)
+    worker_a.revoke_user_tokens(db, 8, 60)
+    db.commit()
+    claims = [{"jti": "jti-a", "sub": "7"}, {"jti": "autre", "sub": "8", "iat": time.time() - 1}]
+    assert all(worker_a.is_revoked(c) for c in claims)
+
+    # Relecture au plus toutes les sync_seconds
+    worker_b.ensure_synced(db)
+    assert not any(worker_b.is_revoked(c) for c in claims)
+    now[0] += 5
+    worker_b.ensure_synced(db)
+    assert all(worker_b.is_revoked(c) for c in claims)
+
+
+def test_expired_revocations_are_forgotten(db):
+    revocations = TokenRevocationList(sync_seconds=0)
+    past = int(time.time()) - 1
+    db.add_all([TokenRevoque(jti="expire", expires_at=past),
+                TokenRevoque(user_id=3, revoked_before=int(time.time() * 1000), expires_at=past)])
+    db.commit()
+    revocations.sync(db)
+    assert revocations.stats()["revoked_tokens"] == 0 and revocations.stats()["revoked_users"] == 0
+
+    # Les lignes expirées sont purgées à la révocation suivante
+    revocations.revoke_token(db, "actif", int(time.time()) + 60)
+    db.commit()
+    assert [row.jti for row in db.query(TokenRevoque).all()] == ["actif"]
+
+
+def test_metrics(client, db):
+    headers = auth_headers(make_user(db))
+    client.post("/auth/logout", headers=headers)
+    client.get("/auth/me", headers=headers)
+    stats = client.get("/metrics/token-revocation").json()
+    assert stats["revoked_tokens"] == 1 and stats["revoked_hits"] == 1
+    assert token_revocation.stats() == stats
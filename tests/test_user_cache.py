@@ -0,0 +1,75 @@
+"""
+Cache des utilisateurs authentifiés (get_current_user) et version partagée entre workers
+"""
+from conftest import add_garage, auth_headers, make_user
+from models_auth import Utilisateur
+from user_cache import USER_CACHE_VERSION_NAME, CurrentUserCache, bump_version, current_user_cache, read_version
+
+
+def test_version_bumped_twice_in_one_transaction(db):
+    assert read_version(db, USER_CACHE_VERSION_NAME) == 0
+    bump_version(db, USER_CACHE_VERSION_NAME)
+    bump_version(db, USER_CACHE_VERSION_NAME)
+    db.commit()
+    assert read_version(db, USER_CACHE_VERSION_NAME) == 2
+
+
+def test_cached_snapshot_and_ttl(db, monkeypatch):
+    user = make_user(db)
+    now = [1000.0]
+    monkeypatch.setattr("user_cache.time.monotonic", lambda: now[0])
+    cache = CurrentUserCache(max_size=10, ttl_seconds=30, version_check_seconds=1000)
+    assert cache.get(db, user.id) is None
+    snapshot = cache.put(user)
+    assert cache.get(db, user.id) is snapshot
+    assert snapshot.email == user.email and snapshot.role == "admin"
+    now[0] += 30
+    assert cache.get(db, user.id) is None
+
+
+def test_other_worker_changes_clear_the_cache(db, monkeypatch):
+    user = make_user(db)
+    now = [1000.0]
+    monkeypatch.setattr("user_cache.time.monotonic", lambda: now[0])
+    worker_a = CurrentUserCache(max_size=10, ttl_seconds=300, version_check_seconds=2)
+    worker_b = CurrentUserCache(max_size=10, ttl_seconds=300, version_check_seconds=2)
+    worker_a.get(db, user.id)
+    worker_a.put(user)
+
+    worker_b.invalidate(db, user.id)
+    db.commit()
+    # Version relue au plus toutes les 2 secondes
+    assert worker_a.get(db, user.id) is not None
+    now[0] += 2
+    assert worker_a.get(db, user.id) is None
+    assert worker_a.version_changes == 1
+
+
+def test_current_user_served_from_cache(client, db):
+    user = make_user(db)
+    headers = auth_headers(user)
+    for _ in range(3):
+        assert client.get("/auth/me", headers=headers).json()["email"] == user.email
+    stats = client.get("/metrics/user-cache").json()
+    assert (stats["misses"], stats["hits"]) == (1, 2)
+
+
+def test_user_changes_are_visible_immediately(client, db):
+    user = make_user(db, email="gerant@example.com", role="client")
+    headers = auth_headers(user)
+    garage = add_garage(db, 5.0, -4.0)
+    assert client.get("/auth/me", headers=headers).json()["garage_id"] is None
+
+    response = client.put("/auth/update-garage-id", params={"garage_id": garage.id}, headers=headers)
+    assert response.status_code == 200
+    assert client.get("/auth/me", headers=headers).json()["garage_id"] == garage.id
+
+
+def test_deleted_user_is_rejected(client, db):
+    user = make_user(db)
+    headers = auth_headers(user)
+    db.query(Utilisateur).filter(Utilisateur.id == user.id).delete()
+    db.commit()
+    current_user_cache.invalidate(db, user.id)
+    db.commit()
+    assert client.get("/auth/me", headers=headers).status_code == 401
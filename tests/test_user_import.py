@@ -0,0 +1,146 @@
+"""
+Import en masse d'utilisateurs (user_import) et endpoint /admin/utilisateurs/import
+"""
+import json
+
+from sqlalchemy.exc import DataError
+
+import database
+import user_import
+from conftest import add_garage, auth_headers, make_user
+from models import Client
+from models_auth import Utilisateur
+from password_pool import hash_rounds, verify_password
+from user_import import detect_format, import_users, read_rows
+
+CSV_CONTENT = (
+    "nom_complet;email;password;role;telephone\n"
+    "Jean Dupont;jean@example.com;secret1;client;0601020304\n"
+    "Marie Curie;Marie@Example.com;secret2;;\n"
+    "\n"
+    "Atelier Nord;atelier@example.com;secret3;client;\n"
+)
+
+
+def import_file(client, headers, name, content, **params):
+    return client.post("/admin/utilisateurs/import", files={"file": (name, content)}, params=params, headers=headers)
+
+
+def test_detect_format_and_read_rows():
+    assert detect_format("comptes.csv", "{") == "csv"
+    assert detect_format("comptes.jsonl", "nom") == "ndjson"
+    assert detect_format(None, ' {"email": "a@example.com"}') == "ndjson"
+    assert detect_format(None, "nom_complet,email") == "csv"
+
+    rows = read_rows("﻿" + CSV_CONTENT, "csv")
+    assert [line for line, _, _ in rows] == [2, 3, 5]
+    assert rows[1][1] == {"nom_complet": "Marie Curie", "email": "Marie@Example.com", "password": "secret2"}
+
+    rows = read_rows('{"email": "a@example.com"}\n\npas du json\n[1]\n', "ndjson")
+    assert [(line, error is None) for line, _, error in rows] == [(1, True), (3, False), (4, False)]
+
+
+def test_csv_import_endpoint(client, db, admin_headers):
+    garage = add_garage(db, 5.0, -4.0, email="atelier@example.com")
+    db.add(Client(nom="Curie", telephone="0100000000", email="marie@example.com"))
+    db.commit()
+
+    response = import_file(client, admin_headers, "comptes.csv", CSV_CONTENT)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["created"], body["skipped"], body["errors"]) == (3, 0, 0)
+    rows = {row["email"]: row for row in body["rows"]}
+
+    jean = db.get(Utilisateur, rows["jean@example.com"]["user_id"])
+    assert (jean.nom, jean.prenom, jean.email_normalise) == ("Jean", "Dupont", "jean@example.com")
+    assert verify_password("secret1", jean.mot_de_passe)
+    assert hash_rounds(jean.mot_de_passe) == 4
+    assert db.get(Client, rows["jean@example.com"]["client_id"]).telephone == "0601020304"
+    # Client existant rattaché, compte garage pour l'email d'un garage
+    assert rows["Marie@Example.com"]["client_id"] == 1
+    assert (rows["atelier@example.com"]["role"], db.get(Utilisateur, rows["atelier@example.com"]["user_id"]).garage_id) \
+        == ("garage", garage.id)
+    assert db.query(Client).count() == 2
+
+
+def test_ndjson_duplicates_and_invalid_rows(client, db, admin_headers):
+    make_user(db, email="existant@example.com")
+    lines = [
+        {"nom_complet": "A B", "email": "nouveau@example.com", "password": "x"},
+        {"nom_complet": "A B", "email": "NOUVEAU@example.com", "password": "x"},
+        {"nom_complet": "A B", "email": "existant@example.com", "password": "x"},
+        {"nom_complet": "A B", "email": "pas-un-email", "password": "x"},
+        {"nom_complet": "A B", "email": "role@example.com", "password": "x", "role": "superadmin"},
+        {"nom_complet": "N" * 101, "email": "long@example.com", "password": "x"},
+        {"nom_complet": "A B", "email": "tel@example.com", "password": "x", "telephone": "0" * 21},
+    ]
+    content = "\n".join(json.dumps(line) for line in lines)
+    body = import_file(client, admin_headers, "comptes.ndjson", content).json()
+    statuses = [row["status"] for row in body["rows"]]
+    assert statuses == ["created", "skipped", "skipped", "error", "error", "error", "error"]
+    assert "ligne 1" in body["rows"][1]["detail"]
+    assert "nom_complet" in body["rows"][5]["detail"] and "telephone" in body["rows"][6]["detail"]
+    # L'administrateur, le compte existant et le nouveau
+    assert db.query(Utilisateur).count() == 3
+
+
+def test_endpoint_requirements(client, db, admin_headers):
+    user = make_user(db, email="client@example.com", role="client")
+    assert import_file(client, auth_headers(user), "comptes.csv", CSV_CONTENT).status_code == 403
+    assert import_file(client, admin_headers, "comptes.csv", CSV_CONTENT, format="xml").status_code == 400
+    assert import_file(client, admin_headers, "comptes.csv", b"\xff\xfe\x00").status_code == 400
+
+
+def rows_for(emails):
+    return [(i + 1, {"nom_complet": "A B", "email": email, "password": "x"}, None) for i, email in enumerate(emails)]
+
+
+def plain_hashes(passwords, rounds):
+    return [f"hash-{password}" for password in passwords]
+
+
+def test_rejected_row_does_not_block_its_chunk(db, monkeypatch):
+    original = user_import._insert_chunk
+
+    def insert_chunk(session, entries):
+        if any(entry["email_normalise"] == "refuse@example.com" for entry in entries):
+            raise DataError("INSERT INTO utilisateurs ...", {}, Exception("Data too long"))
+        return original(session, entries)
+
+    monkeypatch.setattr(user_import, "_insert_chunk", insert_chunk)
+    report = import_users(db, rows_for(["a@example.com", "refuse@example.com", "b@example.com"]), 4,
+                          chunk_size=10, hash_func=plain_hashes)
+    assert [row["status"] for row in report["rows"]] == ["created", "error", "created"]
+    assert "Data too long" in report["rows"][1]["detail"]
+    assert report["rows"][1]["user_id"] is None
+    assert db.query(Utilisateur).count() == 2
+
+
+def test_email_created_concurrently_is_skipped(db, monkeypatch):
+    original = user_import._insert_chunk
+    raced = []
+
+    def insert_chunk(session, entries):
+        if not raced:
+            # Un autre import crée le même compte entre la recherche et l'INSERT
+            raced.append(True)
+            other = database.SessionLocal()
+            try:
+                make_user(other, email="course@example.com")
+            finally:
+                other.close()
+        return original(session, entries)
+
+    monkeypatch.setattr(user_import, "_insert_chunk", insert_chunk)
+    report = import_users(db, rows_for(["a@example.com", "course@example.com"]), 4,
+                          chunk_size=10, hash_func=plain_hashes)
+    assert [row["status"] for row in report["rows"]] == ["created", "skipped"]
+    assert (report["created"], report["skipped"]) == (1, 1)
+
+
+def test_commit_per_chunk(db):
+    emails = [f"user{i}@example.com" for i in range(7)]
+    report = import_users(db, rows_for(emails), 4, chunk_size=3, hash_func=plain_hashes)
+    assert report["created"] == 7
+    ids = {row["email"]: row["user_id"] for row in report["rows"]}
+    assert all(db.get(Utilisateur, ids[email]).email == email for email in emails)
@@ -0,0 +1,89 @@
+"""
+Cache des claims des tokens JWT déjà vérifiés
+
+L'application mobile appelle /auth/me sur presque chaque écran avec le même token :
+la vérification HMAC et le décodage des claims sont refaits à chaque requête. Les claims
+vérifiés sont gardés en mémoire, indexés par l'empreinte SHA-256 du token (le token
+lui-même n'est pas conservé), jusqu'à la fin du TTL et au plus tard jusqu'à leur `exp`.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from config import settings
+
+
+class TokenClaimsCache:
+    """Cache LRU borné : empreinte du token -> (claims, expiration)"""
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: int = 300):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        """Claims déjà vérifiés de ce token, ou None (à ne pas modifier : ils sont partagés)"""
+        if not self.enabled:
+            return None
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() >= entry[1]:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token: str, claims: dict) -> None:
+        """Mémorise les claims d'un token dont la signature vient d'être vérifiée"""
+        if not self.enabled:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, exp)
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None
+        }
+
+
+# Cache partagé par les routes du worker
+token_claims_cache = TokenClaimsCache(
+    max_size=settings.TOKEN_CACHE_SIZE,
+    ttl_seconds=settings.TOKEN_CACHE_TTL_SECONDS
+)
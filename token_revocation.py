@@ -0,0 +1,174 @@
+"""
+Liste de révocation des tokens JWT (déconnexion, révocation par un administrateur)
+
+Les tokens durent 30 jours : il faut pouvoir les révoquer sans ajouter de requête en
+base à chaque requête authentifiée. Chaque worker garde en mémoire les jti révoqués
+(un filtre de Bloom devant l'ensemble exact : le cas courant, un token non révoqué,
+s'arrête au filtre) et, par utilisateur, l'instant avant lequel tous ses tokens sont
+révoqués. Le contrôle est en temps constant.
+
+Les révocations sont écrites dans la table tokens_revoques ; chaque worker lit les
+nouvelles lignes (id croissant) au plus toutes les TOKEN_REVOCATION_SYNC_SECONDS.
+"""
+import math
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from config import settings
+from models_auth import TokenRevoque
+
+# Taux de faux positifs visé par le filtre de Bloom (un faux positif coûte une recherche dans l'ensemble)
+BLOOM_FALSE_POSITIVE_RATE = 0.01
+
+# Relecture des derniers id à chaque synchronisation : une ligne dont le commit arrive
+# après celui d'une ligne d'id supérieur (autre worker) n'est pas manquée
+SYNC_ID_OVERLAP = 1000
+
+
+class BloomFilter:
+    """Filtre de Bloom en mémoire (positions par double hachage de hash())"""
+
+    def __init__(self, capacity: int, false_positive_rate: float = BLOOM_FALSE_POSITIVE_RATE):
+        self.capacity = max(1, capacity)
+        self.size = max(8, int(math.ceil(-self.capacity * math.log(false_positive_rate) / math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        value = hash(item)
+        first = value & 0xFFFFFFFF
+        step = ((value >> 32) & 0xFFFFFFFF) | 1
+        for i in range(self.hash_count):
+            yield (first + i * step) % self.size
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        for position in self._positions(item):
+            if not self._bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class TokenRevocationList:
+    """Révocations connues de ce worker, synchronisées depuis tokens_revoques"""
+
+    def __init__(self, sync_seconds: float = 5, capacity: int = 100000):
+        self.sync_seconds = sync_seconds
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(capacity)
+        # jti -> fin de validité du token ; user_id (str, comme le claim sub) -> (revoked_before
+        # en ms, fin de validité des tokens concernés)
+        self._revoked: Dict[str, int] = {}
+        self._users_revoked_before: Dict[str, Tuple[int, int]] = {}
+        self._last_id = 0
+        self._synced_at: Optional[float] = None
+        self.revoked_hits = 0
+
+    def _add(self, jti: Optional[str], user_id: Optional[int], revoked_before: Optional[int], expires_at: int) -> None:
+        """Ajoute une révocation en mémoire (verrou déjà pris)"""
+        if jti:
+            self._revoked[jti] = expires_at
+            if len(self._revoked) > self._bloom.capacity:
+                # Filtre saturé : le reconstruire deux fois plus grand
+                self._bloom = BloomFilter(self._bloom.capacity * 2)
+                for known in self._revoked:
+                    self._bloom.add(known)
+            else:
+                self._bloom.add(jti)
+        elif user_id is not None and revoked_before is not None:
+            key = str(user_id)
+            known_before, known_expires_at = self._users_revoked_before.get(key, (0, 0))
+            self._users_revoked_before[key] = (max(known_before, revoked_before), max(known_expires_at, expires_at))
+
+    def ensure_synced(self, db: Session) -> None:
+        """Lit les nouvelles révocations si le délai de synchronisation est écoulé"""
+        synced_at = self._synced_at
+        if synced_at is not None and time.monotonic() - synced_at < self.sync_seconds:
+            return
+        self.sync(db)
+
+    def sync(self, db: Session) -> None:
+        """Charge les révocations ajoutées depuis la dernière lecture (par les autres workers aussi)"""
+        rows = db.execute(
+            select(TokenRevoque.id, TokenRevoque.jti, TokenRevoque.user_id, TokenRevoque.revoked_before, TokenRevoque.expires_at)
+            .where(TokenRevoque.id > self._last_id - SYNC_ID_OVERLAP)
+            .order_by(TokenRevoque.id)
+        ).all()
+        now = int(time.time())
+        with self._lock:
+            for row_id, jti, user_id, revoked_before, expires_at in rows:
+                if expires_at > now:
+                    self._add(jti, user_id, revoked_before, expires_at)
+                self._last_id = max(self._last_id, row_id)
+            # Oublier les révocations de tokens expirés (ils sont refusés par jwt.decode de toute façon)
+            expired = [jti for jti, expires_at in self._revoked.items() if expires_at <= now]
+            for jti in expired:
+                del self._revoked[jti]
+            expired = [key for key, (_, expires_at) in self._users_revoked_before.items() if expires_at <= now]
+            for key in expired:
+                del self._users_revoked_before[key]
+            self._synced_at = time.monotonic()
+
+    def is_revoked(self, claims: dict) -> bool:
+        """Contrôle en mémoire, sans accès à la base"""
+        jti = claims.get("jti")
+        if jti is not None and jti in self._bloom and jti in self._revoked:
+            self.revoked_hits += 1
+            return True
+        if self._users_revoked_before:
+            revocation = self._users_revoked_before.get(str(claims.get("sub")))
+            # iat en secondes, à la milliseconde près ; tokens sans iat (émis avant l'ajout du
+            # claim) : considérés comme anciens
+            if revocation is not None and claims.get("iat", 0) * 1000 < revocation[0]:
+                self.revoked_hits += 1
+                return True
+        return False
+
+    def revoke_token(self, db: Session, jti: str, expires_at: int, user_id: Optional[int] = None) -> None:
+        """Révoque un token (à committer par l'appelant) ; effet immédiat sur ce worker"""
+        db.add(TokenRevoque(jti=jti, user_id=user_id, expires_at=expires_at))
+        self._purge_expired(db)
+        with self._lock:
+            self._add(jti, user_id, None, expires_at)
+
+    def revoke_user_tokens(self, db: Session, user_id: int, token_lifetime_seconds: int) -> None:
+        """Révoque tous les tokens déjà émis pour un utilisateur (à committer par l'appelant)"""
+        # En millisecondes, comme l'iat des tokens : une connexion juste après la révocation
+        # (même seconde) donne un token valide. Les anciens tokens à iat entier, arrondi
+        # au-dessous, émis dans la même seconde sont révoqués.
+        now = time.time()
+        revoked_before = int(now * 1000) + 1
+        expires_at = int(now) + token_lifetime_seconds
+        db.add(TokenRevoque(user_id=user_id, revoked_before=revoked_before, expires_at=expires_at))
+        self._purge_expired(db)
+        with self._lock:
+            self._add(None, user_id, revoked_before, expires_at)
+
+    @staticmethod
+    def _purge_expired(db: Session) -> None:
+        """Supprime les révocations de tokens déjà expirés (table bornée)"""
+        db.execute(delete(TokenRevoque).where(TokenRevoque.expires_at <= int(time.time())))
+
+    def stats(self) -> dict:
+        return {
+            "revoked_tokens": len(self._revoked),
+            "revoked_users": len(self._users_revoked_before),
+            "bloom_capacity": self._bloom.capacity,
+            "bloom_bits": self._bloom.size,
+            "bloom_hashes": self._bloom.hash_count,
+            "last_id": self._last_id,
+            "sync_seconds": self.sync_seconds,
+            "revoked_hits": self.revoked_hits
+        }
+
+
+# Liste partagée par les routes du worker
+token_revocation = TokenRevocationList(
+    sync_seconds=settings.TOKEN_REVOCATION_SYNC_SECONDS,
+    capacity=settings.TOKEN_REVOCATION_CAPACITY
+)
@@ -0,0 +1,160 @@
+"""
+Cache des utilisateurs authentifiés (dépendance get_current_user)
+
+Chaque requête authentifiée relisait l'utilisateur par sa clé primaire. Les utilisateurs
+sont gardés en mémoire (instantané détaché de la session) pendant USER_CACHE_TTL_SECONDS.
+
+Avec plusieurs workers uvicorn, un cache local ne voit pas les écritures des autres :
+chaque modification d'utilisateur incrémente la version "utilisateurs" de la table
+cache_versions dans la même transaction. Chaque worker relit ce numéro au plus toutes
+les USER_CACHE_VERSION_CHECK_SECONDS secondes et vide son cache quand il a changé.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from config import settings
+from models_auth import CacheVersion
+
+USER_CACHE_VERSION_NAME = "utilisateurs"
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Instantané en lecture seule d'un utilisateur, indépendant de la session"""
+    id: int
+    nom: Optional[str]
+    prenom: Optional[str]
+    email: str
+    role: Optional[str]
+    telephone: Optional[str]
+    garage_id: Optional[int]
+
+    @classmethod
+    def from_model(cls, user) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            nom=user.nom,
+            prenom=user.prenom,
+            email=user.email,
+            role=str(user.role) if user.role else None,
+            telephone=user.telephone,
+            garage_id=user.garage_id
+        )
+
+
+def bump_version(db: Session, name: str) -> None:
+    """Incrémente la version d'un cache dans la transaction en cours (sans commit)"""
+    result = db.execute(
+        update(CacheVersion).where(CacheVersion.name == name).values(version=CacheVersion.version + 1)
+    )
+    if result.rowcount == 0:
+        db.add(CacheVersion(name=name, version=1))
+        # Écrite tout de suite : un second incrément dans la même transaction (sessions sans
+        # autoflush) met à jour cette ligne au lieu d'en insérer une autre
+        db.flush()
+
+
+def read_version(db: Session, name: str) -> int:
+    """Version courante d'un cache (0 si elle n'a jamais été incrémentée)"""
+    version = db.execute(select(CacheVersion.version).where(CacheVersion.name == name)).scalar()
+    return version or 0
+
+
+class CurrentUserCache:
+    """Cache LRU borné : id utilisateur -> (CurrentUser, heure de chargement)"""
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: int = 30, version_check_seconds: float = 2):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.version_check_seconds = version_check_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._version: Optional[int] = None
+        self._version_checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.version_changes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+
+    def _check_version(self, db: Session) -> None:
+        """Relit la version partagée si le délai est écoulé, et vide le cache si elle a changé"""
+        now = time.monotonic()
+        if self._version is not None and now - self._version_checked_at < self.version_check_seconds:
+            return
+        version = read_version(db, USER_CACHE_VERSION_NAME)
+        with self._lock:
+            if self._version is not None and version != self._version:
+                self._entries.clear()
+                self.version_changes += 1
+            self._version = version
+            self._version_checked_at = now
+
+    def get(self, db: Session, user_id: int) -> Optional[CurrentUser]:
+        """Utilisateur en cache, ou None (à charger depuis la base puis passer à put)"""
+        if not self.enabled:
+            return None
+        self._check_version(db)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and time.monotonic() - entry[1] >= self.ttl_seconds:
+                del self._entries[user_id]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, user) -> CurrentUser:
+        """Mémorise un utilisateur lu en base après get() et retourne son instantané"""
+        current_user = CurrentUser.from_model(user)
+        if self.enabled:
+            with self._lock:
+                self._entries[current_user.id] = (current_user, time.monotonic())
+                self._entries.move_to_end(current_user.id)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return current_user
+
+    def invalidate(self, db: Session, user_id: Optional[int] = None) -> None:
+        """À appeler avant le commit d'une modification d'utilisateur(s)
+
+        Retire l'entrée locale (ou tout le cache si user_id est None) et incrémente la
+        version partagée pour que les autres workers vident le leur.
+        """
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+        bump_version(db, USER_CACHE_VERSION_NAME)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "version": self._version,
+            "version_changes": self.version_changes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None
+        }
+
+
+# Cache partagé par les routes du worker
+current_user_cache = CurrentUserCache(
+    max_size=settings.USER_CACHE_SIZE,
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+    version_check_seconds=settings.USER_CACHE_VERSION_CHECK_SECONDS
+)
@@ -0,0 +1,306 @@
+"""
+Import en masse d'utilisateurs (ouverture d'une chaîne de garages)
+
+Créer des centaines de comptes par /auth/register coûte un hachage bcrypt et plusieurs
+allers-retours par compte, les uns après les autres. L'import procède par phases :
+1. lecture du fichier (CSV ou NDJSON) et validation de chaque ligne ;
+2. recherche des utilisateurs, clients et garages existants, par paquets d'emails
+   (index email_normalise) ;
+3. hachage des mots de passe des seules lignes à créer : sur le pool borné de l'API
+   (password_pool) pour l'endpoint, sur un pool de processus propre à l'appel pour le CLI ;
+4. INSERT multi-lignes des utilisateurs puis des clients, un commit par paquet.
+
+Les règles sont celles de l'inscription : un email porté par un garage donne un compte
+garage (user_roles), un compte client est rattaché au client existant de son email ou
+en crée un. Le résultat est un rapport ligne par ligne.
+
+Colonnes attendues (comme /auth/register) : nom_complet, email, password, role
+(client par défaut), telephone.
+"""
+import csv
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Callable, Dict, List, Optional, Tuple
+from pydantic import BaseModel, EmailStr, Field, ValidationError, field_validator
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.orm import Session
+from emails import normalize_email
+from models import Client, Garage
+from models_auth import Utilisateur, RoleEnum
+from password_pool import get_password_hash
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+
+def _split_name(nom_complet: str) -> Tuple[str, Optional[str]]:
+    """Sépare nom et prénom comme /auth/register"""
+    nom_parts = nom_complet.split(" ", 1)
+    return nom_parts[0], nom_parts[1] if len(nom_parts) > 1 else None
+
+
+class ImportedUser(BaseModel):
+    """Ligne d'import (mêmes champs que /auth/register), aux longueurs des colonnes
+
+    nom et prénom (tirés de nom_complet) : String(100) ; telephone : String(20) de Client.
+    """
+    nom_complet: str = Field(..., min_length=1)
+    email: EmailStr = Field(..., max_length=150)
+    password: str = Field(..., min_length=1)
+    role: Optional[str] = Field("client", max_length=50)
+    telephone: Optional[str] = Field(None, max_length=20)
+
+    @field_validator("nom_complet")
+    @classmethod
+    def _name_lengths(cls, value: str) -> str:
+        nom, prenom = _split_name(value)
+        if len(nom) > 100 or len(prenom or "") > 100:
+            raise ValueError("nom et prénom limités à 100 caractères chacun")
+        return value
+
+
+def detect_format(filename: Optional[str], content: str) -> str:
+    """Format d'après l'extension du fichier, sinon d'après le premier caractère"""
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension in (".ndjson", ".jsonl"):
+        return "ndjson"
+    if extension == ".csv":
+        return "csv"
+    return "ndjson" if content.lstrip().startswith("{") else "csv"
+
+
+def read_rows(content, fmt: str) -> List[Tuple[int, Optional[dict], Optional[str]]]:
+    """Lit le fichier : liste de (numéro de ligne, champs, erreur de lecture)"""
+    if isinstance(content, bytes):
+        content = content.decode("utf-8-sig")
+    elif content.startswith("\ufeff"):
+        content = content[1:]
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Format d'import inconnu: {fmt} (csv ou ndjson)")
+
+    rows = []
+    if fmt == "ndjson":
+        for line_number, line in enumerate(content.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                fields = json.loads(line)
+            except json.JSONDecodeError as e:
+                rows.append((line_number, None, f"JSON invalide: {e.msg}"))
+                continue
+            if not isinstance(fields, dict):
+                rows.append((line_number, None, "Chaque ligne doit être un objet JSON"))
+                continue
+            rows.append((line_number, fields, None))
+        return rows
+
+    # CSV : séparateur virgule, point-virgule (export Excel français) ou tabulation
+    first_line = content.split("\n", 1)[0]
+    try:
+        dialect = csv.Sniffer().sniff(first_line, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.DictReader(io.StringIO(content), dialect=dialect)
+    for fields in reader:
+        # Ignorer les lignes vides ; valeurs vides = champs absents
+        values = {key.strip(): value.strip() for key, value in fields.items()
+                  if key and isinstance(value, str) and value.strip()}
+        if values:
+            rows.append((reader.line_num, values, None))
+    return rows
+
+
+def hash_passwords(passwords: List[str], rounds: int, max_workers: int = 0) -> List[str]:
+    """Hache les mots de passe sur un pool de processus (un cœur par processus)"""
+    workers = max_workers if max_workers > 0 else (os.cpu_count() or 2)
+    workers = min(workers, len(passwords))
+    if workers <= 1:
+        return [get_password_hash(password, rounds) for password in passwords]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Plusieurs mots de passe par envoi : moins d'échanges entre processus
+        chunksize = max(1, len(passwords) // (workers * 4))
+        return list(executor.map(get_password_hash, passwords, repeat(rounds), chunksize=chunksize))
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _existing_by_email(db: Session, emails: List[str], chunk_size: int):
+    """Emails d'utilisateurs existants, client et garage (les plus anciens) de chaque email"""
+    users, clients, garages = set(), {}, {}
+    for chunk in _chunks(emails, chunk_size):
+        users.update(db.execute(
+            select(Utilisateur.email_normalise).where(Utilisateur.email_normalise.in_(chunk))
+        ).scalars())
+        clients.update(db.execute(
+            select(Client.email_normalise, func.min(Client.id))
+            .where(Client.email_normalise.in_(chunk))
+            .group_by(Client.email_normalise)
+        ).all())
+        garages.update(db.execute(
+            select(Garage.email_normalise, func.min(Garage.id))
+            .where(Garage.email_normalise.in_(chunk))
+            .group_by(Garage.email_normalise)
+        ).all())
+    return users, clients, garages
+
+
+def _insert_chunk(db: Session, entries: List[dict]) -> None:
+    """Insère un paquet (un INSERT multi-lignes par table) et complète les entrées du rapport
+
+    Les événements ORM ne s'appliquent pas à un INSERT multi-lignes : email_normalise est
+    fourni ici. Les identifiants sont relus par email_normalise (MySQL n'a pas RETURNING).
+    """
+    emails = [entry["email_normalise"] for entry in entries]
+    db.execute(insert(Utilisateur).values([entry["user"] for entry in entries]))
+    user_ids = dict(db.execute(
+        select(Utilisateur.email_normalise, func.max(Utilisateur.id))
+        .where(Utilisateur.email_normalise.in_(emails))
+        .group_by(Utilisateur.email_normalise)
+    ).all())
+
+    new_clients = [entry["client"] for entry in entries if entry["client"] is not None]
+    client_ids = {}
+    if new_clients:
+        db.execute(insert(Client).values(new_clients))
+        client_ids = dict(db.execute(
+            select(Client.email_normalise, func.min(Client.id))
+            .where(Client.email_normalise.in_([client["email_normalise"] for client in new_clients]))
+            .group_by(Client.email_normalise)
+        ).all())
+
+    for entry in entries:
+        report = entry["report"]
+        report["user_id"] = user_ids.get(entry["email_normalise"])
+        if entry["client"] is not None:
+            report["client_id"] = client_ids.get(entry["email_normalise"])
+
+
+def import_users(
+    db: Session,
+    rows: List[Tuple[int, Optional[dict], Optional[str]]],
+    rounds: int,
+    max_workers: int = 0,
+    chunk_size: int = 500,
+    hash_func: Optional[Callable[[List[str], int], List[str]]] = None
+) -> dict:
+    """Importe les lignes lues par read_rows ; commit par paquet de chunk_size utilisateurs
+
+    hash_func(mots de passe, coût) hache les mots de passe ; par défaut hash_passwords
+    sur max_workers processus (CLI).
+    Retourne {"created", "skipped", "errors", "rows": rapport ligne par ligne}.
+    """
+    reports: List[dict] = []
+    entries: List[dict] = []
+    first_line_by_email: Dict[str, int] = {}
+
+    # 1. Validation
+    for line_number, fields, read_error in rows:
+        report = {"line": line_number, "email": (fields or {}).get("email"), "status": "error",
+                  "role": None, "user_id": None, "client_id": None, "detail": read_error}
+        reports.append(report)
+        if read_error:
+            continue
+        try:
+            user_data = ImportedUser(**fields)
+        except ValidationError as e:
+            report["detail"] = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            )
+            continue
+        if user_data.role not in [r.value for r in RoleEnum]:
+            report["detail"] = f"Rôle invalide: {user_data.role}"
+            continue
+
+        email_normalise = normalize_email(user_data.email)
+        if email_normalise in first_line_by_email:
+            report["status"] = "skipped"
+            report["detail"] = f"Email en double dans le fichier (ligne {first_line_by_email[email_normalise]})"
+            continue
+        first_line_by_email[email_normalise] = line_number
+        entries.append({"data": user_data, "email_normalise": email_normalise, "report": report})
+
+    # 2. Comptes existants, clients et garages des emails
+    users, clients, garages = _existing_by_email(db, list(first_line_by_email), chunk_size)
+    to_create = []
+    for entry in entries:
+        if entry["email_normalise"] in users:
+            entry["report"].update(status="skipped", detail="Un utilisateur avec cet email existe déjà")
+        else:
+            to_create.append(entry)
+
+    # 3. Hachage des seuls mots de passe à créer
+    passwords = [entry["data"].password for entry in to_create]
+    if hash_func is not None:
+        hashes = hash_func(passwords, rounds)
+    else:
+        hashes = hash_passwords(passwords, rounds, max_workers)
+
+    for entry, hashed_password in zip(to_create, hashes):
+        user_data, email_normalise = entry["data"], entry["email_normalise"]
+        nom, prenom = _split_name(user_data.nom_complet)
+        role, garage_id = user_data.role, None
+        # Un garage existe déjà avec cet email : le compte est un compte garage (règle de user_roles)
+        if email_normalise in garages:
+            role, garage_id = RoleEnum.garage.value, garages[email_normalise]
+        entry["user"] = {
+            "nom": nom,
+            "prenom": prenom,
+            "email": user_data.email,
+            "email_normalise": email_normalise,
+            "mot_de_passe": hashed_password,
+            "role": role,
+            "telephone": user_data.telephone,
+            "garage_id": garage_id
+        }
+        entry["client"] = None
+        if role == RoleEnum.client.value:
+            if email_normalise in clients:
+                entry["report"]["client_id"] = clients[email_normalise]
+            else:
+                entry["client"] = {
+                    "nom": nom,
+                    "prenom": prenom,
+                    "email": user_data.email,
+                    "email_normalise": email_normalise,
+                    "telephone": user_data.telephone or "0000000000"  # Téléphone obligatoire dans Client
+                }
+        entry["report"]["role"] = role
+
+    # 4. INSERT multi-lignes, un commit par paquet
+    for chunk in _chunks(to_create, chunk_size):
+        try:
+            _insert_chunk(db, chunk)
+            db.commit()
+            for entry in chunk:
+                entry["report"].update(status="created", detail=None)
+        except DBAPIError:
+            # Un email du paquet créé entre-temps, ou une valeur refusée par la base (DataError
+            # d'un backend strict) : reprendre le paquet ligne par ligne, chaque ligne en
+            # erreur est signalée dans le rapport et les autres sont insérées
+            db.rollback()
+            for entry in chunk:
+                try:
+                    _insert_chunk(db, [entry])
+                    db.commit()
+                    entry["report"].update(status="created", detail=None)
+                except IntegrityError:
+                    db.rollback()
+                    entry["report"].update(status="skipped", user_id=None, client_id=None,
+                                           detail="Un utilisateur avec cet email existe déjà")
+                except DBAPIError as e:
+                    db.rollback()
+                    entry["report"].update(status="error", user_id=None, client_id=None,
+                                           detail=f"Refusé par la base de données: {e.orig}")
+
+    return {
+        "created": sum(1 for report in reports if report["status"] == "created"),
+        "skipped": sum(1 for report in reports if report["status"] == "skipped"),
+        "errors": sum(1 for report in reports if report["status"] == "error"),
+        "rows": reports
+    }
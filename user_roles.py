@@ -0,0 +1,64 @@
+"""
+Réconciliation du rôle et du garage_id des utilisateurs avec la table garages
+
+Règles (reprises de l'ancienne correction faite à chaque /auth/login et /auth/me) :
+- si un garage a l'email de l'utilisateur (colonnes email_normalise indexées),
+  l'utilisateur est un garage et son garage_id est celui de ce garage (le plus ancien
+  en cas de doublons) ;
+- un utilisateur qui a un garage_id a le rôle garage.
+
+La correction est faite ici en deux UPDATE ensemblistes : par le job de réconciliation
+(POST /admin/utilisateurs/reconcile-roles, fix_user_role_from_garage.py) pour toute la
+table, et pour un seul email à chaque création/modification de garage. Les routes
+d'authentification n'ont donc plus qu'à lire l'utilisateur.
+"""
+from typing import Optional
+from sqlalchemy import select, update, exists, func, or_
+from sqlalchemy.orm import Session
+from models import Garage
+from models_auth import Utilisateur
+from user_cache import current_user_cache
+from emails import normalize_email
+
+
+def reconcile_user_roles(db: Session, email: Optional[str] = None) -> int:
+    """Corrige les utilisateurs incohérents (tous, ou ceux d'un email) dans la transaction en cours
+
+    Ne fait pas de commit. Retourne le nombre d'utilisateurs corrigés.
+    """
+    garage_id_for_email = (
+        select(func.min(Garage.id))
+        .where(Garage.email_normalise == Utilisateur.email_normalise)
+        .scalar_subquery()
+    )
+    not_garage_role = or_(Utilisateur.role.is_(None), Utilisateur.role != 'garage')
+
+    # 1. Un garage porte l'email de l'utilisateur : rôle garage et garage_id de ce garage
+    by_garage_email = update(Utilisateur).where(
+        exists().where(Garage.email_normalise == Utilisateur.email_normalise),
+        or_(
+            not_garage_role,
+            Utilisateur.garage_id.is_(None),
+            Utilisateur.garage_id != garage_id_for_email
+        )
+    ).values(role='garage', garage_id=garage_id_for_email)
+
+    # 2. L'utilisateur a un garage_id : rôle garage
+    by_garage_id = update(Utilisateur).where(
+        Utilisateur.garage_id.isnot(None),
+        not_garage_role
+    ).values(role='garage')
+
+    if email is not None:
+        normalized = normalize_email(email)
+        by_garage_email = by_garage_email.where(Utilisateur.email_normalise == normalized)
+        by_garage_id = by_garage_id.where(Utilisateur.email_normalise == normalized)
+
+    corrected = 0
+    for statement in (by_garage_email, by_garage_id):
+        result = db.execute(statement.execution_options(synchronize_session=False))
+        corrected += result.rowcount or 0
+
+    if corrected:
+        current_user_cache.invalidate(db)
+    return corrected